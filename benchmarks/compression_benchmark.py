@@ -0,0 +1,141 @@
+"""Compares websocket connection settings on end-to-end tick latency against a local server.
+
+Run from the repository root with `python benchmarks/compression_benchmark.py [--bandwidth MBIT_S] [REPLAY_FILES...]`.
+A local server sends `gameTick` frames, taken from the given recorded replays or from generated 30x30 frames, and
+waits for the command of each tick. The latency is measured on the server from sending a tick to receiving its command,
+so it covers compression, transfer, decompression and parsing on both ends. The loopback link has practically unlimited
+bandwidth, so with `--bandwidth` the client also sleeps for the time its received bytes would take on a link of that
+speed. The settings are passed to the client through the same config keys the bots use.
+"""
+import os
+import sys
+import tempfile
+from threading import Thread
+from time import perf_counter, sleep
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from websockets.sync.client import connect  # noqa: E402
+from websockets.sync.server import serve  # noqa: E402
+
+from apiwrapper.compression import CompressionStats, get_connect_options  # noqa: E402
+from apiwrapper.json_codec import get_codec  # noqa: E402
+from apiwrapper.latency import get_percentile  # noqa: E402
+from apiwrapper.replay import ReplayReader, ReplayRecorder  # noqa: E402
+from apiwrapper.websocket_wrapper import parse_message  # noqa: E402
+
+_PORT = 8765
+_REPEATS = 3
+_SETTINGS = {
+    "none": {"websocket_compression": "none"},
+    "deflate": {"websocket_compression": "deflate"},
+    "deflate level 1": {"websocket_compression": "deflate", "websocket_compression_level": "1"},
+    "deflate window 9": {"websocket_compression": "deflate", "websocket_max_window_bits": "9"},
+    "deflate window 12": {"websocket_compression": "deflate", "websocket_max_window_bits": "12"},
+}
+_COMMAND = {"eventType": "gameAction", "data": {"action": "move", "payload": {"distance": 1}}}
+
+
+def _record_generated_replay(path: str, ticks: int = 200, size: int = 30):
+    recorder = ReplayRecorder(path, {"tickLength": 500, "turnRate": 2}, "ship:own")
+    for turn_number in range(ticks):
+        game_map = [[{"type": "outOfVision" if abs(x - y) > 10 else "empty", "data": {}} for x in range(size)]
+                    for y in range(size)]
+        x = turn_number % size
+        game_map[x][x] = {"type": "ship", "data": {"id": "ship:own", "position": {"x": x, "y": x}, "direction": "se",
+                                                   "health": 100, "heat": turn_number % 10}}
+        recorder.record_tick({"turnNumber": turn_number, "gameMap": game_map}, {"action": "move",
+                                                                                "payload": {"distance": 1}})
+    recorder.close()
+
+
+def _load_frames(paths: list[str]) -> list[str]:
+    frames = []
+    codec = get_codec("stdlib")
+    for path in paths:
+        with ReplayReader(path) as reader:
+            frames.extend(codec.encode_text({"eventType": "gameTick", "data": reader.read_raw_tick(position)["data"]})
+                          for position in range(len(reader)))
+    return frames
+
+
+def _serve_ticks(frames: list[str], latencies_ms: list[float]):
+    def handler(websocket):
+        for frame in frames:
+            sent_at = perf_counter()
+            websocket.send(frame)
+            websocket.recv()
+            latencies_ms.append((perf_counter() - sent_at) * 1000)
+        websocket.close()
+
+    return serve(handler, "localhost", _PORT)
+
+
+def _run_client(settings: dict[str, str], bandwidth_bytes_s: float | None) -> CompressionStats:
+    previous = {name: os.environ.get(name) for name in settings}
+    os.environ.update(settings)
+    try:
+        stats = CompressionStats()
+        options = get_connect_options(stats)
+    finally:
+        for name, value in previous.items():
+            if value is None:
+                del os.environ[name]
+            else:
+                os.environ[name] = value
+    codec = get_codec()
+    with connect(f"ws://localhost:{_PORT}", **options) as websocket:
+        for raw_message in websocket:
+            received_bytes = stats.wire_bytes_in
+            parse_message(raw_message)
+            stats.ticks += 1
+            if bandwidth_bytes_s is not None:
+                # Frames are counted as raw bytes when there is no compression extension to count them
+                wire_bytes = stats.wire_bytes_in - received_bytes if options.get("extensions") else len(raw_message)
+                sleep(wire_bytes / bandwidth_bytes_s)
+            websocket.send(codec.encode_text(_COMMAND))
+    return stats
+
+
+def _benchmark(frames: list[str], settings: dict[str, str],
+               bandwidth_bytes_s: float | None) -> tuple[list[float], CompressionStats]:
+    latencies_ms: list[float] = []
+    server = _serve_ticks(frames, latencies_ms)
+    thread = Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        stats = _run_client(settings, bandwidth_bytes_s)
+    finally:
+        server.shutdown()
+        thread.join()
+    return latencies_ms, stats
+
+
+def main():
+    arguments = sys.argv[1:]
+    bandwidth_bytes_s = None
+    if arguments[:1] == ["--bandwidth"]:
+        bandwidth_bytes_s = float(arguments[1]) * 1e6 / 8
+        arguments = arguments[2:]
+    with tempfile.TemporaryDirectory() as directory:
+        if not arguments:
+            arguments = [os.path.join(directory, "generated.jsonl")]
+            _record_generated_replay(arguments[0])
+        frames = _load_frames(arguments)
+    mean_size = sum(len(frame.encode("utf-8")) for frame in frames) / len(frames)
+    print(f"{len(frames)} frames, mean {mean_size / 1024:.1f} KiB" +
+          (f", simulated {bandwidth_bytes_s * 8 / 1e6:g} Mbit/s" if bandwidth_bytes_s is not None else ""))
+    for name, settings in _SETTINGS.items():
+        latencies_ms: list[float] = []
+        for _ in range(_REPEATS):
+            repeat_latencies_ms, stats = _benchmark(frames, settings, bandwidth_bytes_s)
+            latencies_ms.extend(repeat_latencies_ms)
+        ticks = max(stats.ticks, 1)
+        wire_bytes = stats.wire_bytes_in / ticks if stats.frames_in else mean_size
+        print(f"{name:<18} mean {sum(latencies_ms) / len(latencies_ms):7.3f} ms   "
+              f"p95 {get_percentile(latencies_ms, 95):7.3f} ms   received {wire_bytes / 1024:6.1f} KiB/tick   "
+              f"decompress {stats.decompress_ms / ticks:6.3f} ms/tick")
+
+
+if __name__ == '__main__':
+    main()
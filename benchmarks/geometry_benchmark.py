@@ -0,0 +1,46 @@
+"""Compares the precomputed geometry lookup tables in `helpers` against computing the same results directly.
+
+Run from the repository root with `python benchmarks/geometry_benchmark.py`.
+"""
+import os
+import sys
+from timeit import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from apiwrapper.models import CompassDirection, Coordinates  # noqa: E402
+from helpers import get_approximate_direction, get_approximate_directions, get_partial_turn, \
+    _compute_approximate_direction, _compute_partial_turn  # noqa: E402
+
+_MAP_SIZE = 30
+_REPEATS = 20
+
+
+def _report(name: str, baseline_seconds: float, table_seconds: float, operations: int):
+    print(f"{name:<32} direct {baseline_seconds / operations * 1e9:8.1f} ns/op   "
+          f"table {table_seconds / operations * 1e9:8.1f} ns/op   speedup {baseline_seconds / table_seconds:5.2f}x")
+
+
+def main():
+    vectors = [Coordinates(x, y) for x in range(-_MAP_SIZE + 1, _MAP_SIZE) for y in range(-_MAP_SIZE + 1, _MAP_SIZE)]
+    operations = len(vectors) * _REPEATS
+
+    direct = timeit(lambda: [_compute_approximate_direction(vector.x, vector.y) for vector in vectors],
+                    number=_REPEATS)
+    table = timeit(lambda: [get_approximate_direction(vector) for vector in vectors], number=_REPEATS)
+    batched = timeit(lambda: get_approximate_directions(vectors), number=_REPEATS)
+    _report("get_approximate_direction", direct, table, operations)
+    _report("get_approximate_directions", direct, batched, operations)
+
+    turns = [(start, target, turn_rate) for start in CompassDirection for target in CompassDirection
+             for turn_rate in range(1, 5)] * 100
+    operations = len(turns) * _REPEATS
+    direct = timeit(lambda: [_compute_partial_turn(start.value, target.value, turn_rate)
+                             for start, target, turn_rate in turns], number=_REPEATS)
+    table = timeit(lambda: [get_partial_turn(start, target, turn_rate) for start, target, turn_rate in turns],
+                   number=_REPEATS)
+    _report("get_partial_turn", direct, table, operations)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""Compares the installed JSON backends on decoding `gameTick` frames and encoding commands.
+
+Run from the repository root with `python benchmarks/json_codec_benchmark.py [REPLAY_FILES...]`. The frames are taken
+from the given recorded replays, or from a replay recorded of generated 30x30 frames if none are given.
+"""
+import os
+import sys
+import tempfile
+from timeit import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from apiwrapper.json_codec import get_available_codecs, get_codec  # noqa: E402
+from apiwrapper.replay import ReplayReader, ReplayRecorder  # noqa: E402
+
+_REPEATS = 20
+_COMMAND = {"eventType": "gameAction", "data": {"action": "move", "payload": {"distance": 2}}}
+
+
+def _record_generated_replay(path: str, ticks: int = 100, size: int = 30):
+    recorder = ReplayRecorder(path, {"tickLength": 500, "turnRate": 2}, "ship:own")
+    for turn_number in range(ticks):
+        game_map = [[{"type": "outOfVision" if abs(x - y) > 10 else "empty", "data": {}} for x in range(size)]
+                    for y in range(size)]
+        x = turn_number % size
+        game_map[x][x] = {"type": "ship", "data": {"id": "ship:own", "position": {"x": x, "y": x}, "direction": "se",
+                                                   "health": 100, "heat": turn_number % 10}}
+        recorder.record_tick({"turnNumber": turn_number, "gameMap": game_map}, {"action": "move",
+                                                                                "payload": {"distance": 1}})
+    recorder.close()
+
+
+def _load_frames(paths: list[str]) -> list[str]:
+    frames = []
+    codec = get_codec("stdlib")
+    for path in paths:
+        with ReplayReader(path) as reader:
+            # The server sends the game state in a gameTick event, so the frames are rebuilt from the records
+            frames.extend(codec.encode_text({"eventType": "gameTick", "data": reader.read_raw_tick(position)["data"]})
+                          for position in range(len(reader)))
+    return frames
+
+
+def main():
+    paths = sys.argv[1:]
+    with tempfile.TemporaryDirectory() as directory:
+        if not paths:
+            paths = [os.path.join(directory, "generated.jsonl")]
+            _record_generated_replay(paths[0])
+        frames = _load_frames(paths)
+    frame_bytes = [frame.encode("utf-8") for frame in frames]
+    mean_size = sum(len(frame) for frame in frame_bytes) / len(frame_bytes)
+    print(f"{len(frames)} frames, mean {mean_size / 1024:.1f} KiB")
+    baseline = None
+    for name in reversed(get_available_codecs()):
+        codec = get_codec(name)
+        decode_text = timeit(lambda: [codec.decode(frame) for frame in frames], number=_REPEATS)
+        decode_bytes = timeit(lambda: [codec.decode(frame) for frame in frame_bytes], number=_REPEATS)
+        encode_text = timeit(lambda: codec.encode_text(_COMMAND), number=_REPEATS * 1000)
+        encode_bytes = timeit(lambda: codec.encode(_COMMAND), number=_REPEATS * 1000)
+        operations = len(frames) * _REPEATS
+        baseline = baseline or decode_text
+        print(f"{name:<8} decode str {decode_text / operations * 1e6:8.1f} us/frame   "
+              f"decode bytes {decode_bytes / operations * 1e6:8.1f} us/frame   "
+              f"encode str {encode_text / _REPEATS / 1000 * 1e9:7.1f} ns   "
+              f"encode bytes {encode_bytes / _REPEATS / 1000 * 1e9:7.1f} ns   "
+              f"decode speedup {baseline / decode_text:5.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+"""Measures how long opening the opponent store at the start of a match takes as the amount of opponents grows.
+
+Run from the repository root with `python benchmarks/opponent_store_benchmark.py`.
+"""
+import os
+import sys
+import tempfile
+from timeit import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from apiwrapper.opponent_store import OpponentStore  # noqa: E402
+
+_REPEATS = 200
+_OPPONENT_COUNTS = [10, 100, 1000, 5000]
+
+
+def _opponent_value(opponent: int) -> dict:
+    return {"matches": opponent % 20, "wins": opponent % 7, "preferred_shots": {"2:1": 5, "4:1": 12, "1:3": 2},
+            "turn_habits": [opponent % 8, (opponent + 3) % 8, 1, 0, 2, 5, 7, 3], "mean_heat": 11.5}
+
+
+def _write_store(path: str, opponents: int):
+    store = OpponentStore(path)
+    for opponent in range(opponents):
+        store.put(f"ship:team{opponent}:bot", _opponent_value(opponent))
+    store.flush()
+    store.close()
+
+
+def _open_and_read(path: str):
+    store = OpponentStore(path)
+    store.get("ship:team1:bot")
+    store.close()
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        for opponents in _OPPONENT_COUNTS:
+            path = os.path.join(directory, f"opponents-{opponents}.log")
+            _write_store(path, opponents)
+            open_s = timeit(lambda: _open_and_read(path), number=_REPEATS)
+            print(f"{opponents:>5} opponents, {os.path.getsize(path) / 1024:7.1f} KiB   "
+                  f"open and read one {open_s / _REPEATS * 1000:7.3f} ms")
+
+
+if __name__ == '__main__':
+    main()
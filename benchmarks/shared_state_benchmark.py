@@ -0,0 +1,49 @@
+"""Compares handing a game state to another process by pickling it against writing it into a `SharedStateRing` and
+sending only the slot index and turn number.
+
+Run from the repository root with `python benchmarks/shared_state_benchmark.py`.
+"""
+import os
+import pickle
+import sys
+from timeit import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from apiwrapper.serialization import deserialize_game_state  # noqa: E402
+from apiwrapper.shared_state import SharedStateRing  # noqa: E402
+
+_REPEATS = 500
+
+
+def _raw_state(size: int) -> dict:
+    game_map = [[{"type": "outOfVision" if x > size // 2 else "empty", "data": {}} for x in range(size)]
+                for _ in range(size)]
+    game_map[1][1] = {"type": "ship", "data": {"id": "ship:own", "position": {"x": 1, "y": 1}, "direction": "e",
+                                               "health": 100, "heat": 0}}
+    game_map[3][2] = {"type": "projectile", "data": {"id": "projectile:1", "position": {"x": 2, "y": 3},
+                                                     "direction": "n", "speed": 2, "mass": 2}}
+    return {"turnNumber": 1, "gameMap": game_map}
+
+
+def main():
+    for size in (15, 30, 60):
+        state = deserialize_game_state(_raw_state(size))
+        pickled = timeit(lambda: pickle.loads(pickle.dumps(state)), number=_REPEATS)
+        with SharedStateRing() as ring:
+            def handoff():
+                # The message sent to the worker is the slot index and turn number, pickled like any queue message
+                slot, turn_number = pickle.loads(pickle.dumps((ring.write(state), state.turn_number)))
+                view = ring.read(slot, turn_number)
+                view.get_cell_type(1, 1)
+                view.release()
+
+            shared = timeit(handoff, number=_REPEATS)
+        message_bytes = len(pickle.dumps(state))
+        print(f"{size}x{size} map   pickle {pickled / _REPEATS * 1e6:8.1f} us ({message_bytes} bytes)   "
+              f"shared memory {shared / _REPEATS * 1e6:8.1f} us ({len(pickle.dumps((0, 1)))} bytes)   "
+              f"speedup {pickled / shared:5.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,314 @@
+import asyncio
+import os
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from dataclasses import dataclass, fields
+from logging import getLogger
+from time import perf_counter
+
+from websockets.client import connect
+from websockets.exceptions import ConnectionClosed, InvalidHandshake
+
+from helpers import get_config
+from apiwrapper.compression import get_connect_options
+from apiwrapper.latency import monitor_pings_async
+from apiwrapper.models import ClientContext, Command, GameState, TickDeadline
+from apiwrapper.websocket_wrapper import Client, ClientState, authorize_client, begin_tick_deadline, \
+    complete_game_tick, get_timeout_command, handle_disconnect, handle_event, parse_message, \
+    prepare_game_tick, process_tick_safely, shutdown_client
+
+_logger = getLogger("wrapper.async_runner")
+
+
+@dataclass
+class BotStats:
+    """Tick processing statistics of one bot in the current match
+
+    Attributes:
+        ticks (int): how many ticks the bot received
+        runs (int): how many ticks the team ai was run on
+        timeouts (int): how many ticks the team ai did not finish by the deadline
+        skipped (int): how many ticks the team ai was not run because the previous run of the bot was still going or
+            the deadline passed while the work was queued
+        total_queue_ms (float): the summed time the work of the bot waited for a free worker in milliseconds
+        max_queue_ms (float): the longest time the work of the bot waited for a free worker in milliseconds
+        total_processing_ms (float): the summed duration of the team ai runs in milliseconds
+        max_processing_ms (float): the longest duration of a team ai run in milliseconds
+    """
+    ticks: int = 0
+    runs: int = 0
+    timeouts: int = 0
+    skipped: int = 0
+    total_queue_ms: float = 0.0
+    max_queue_ms: float = 0.0
+    total_processing_ms: float = 0.0
+    max_processing_ms: float = 0.0
+
+
+def combine_stats(first: BotStats, second: BotStats) -> BotStats:
+    """Combine the statistics of two matches or runs of a bot
+
+    Arguments:
+        first (BotStats): the statistics of one match or run
+        second (BotStats): the statistics of the other match or run
+
+    Returns:
+        (BotStats): the summed counts and totals, and the larger maximums
+    """
+    combined = {}
+    for stats_field in fields(BotStats):
+        operation = max if stats_field.name.startswith("max_") else sum
+        combined[stats_field.name] = operation((getattr(first, stats_field.name), getattr(second, stats_field.name)))
+    return BotStats(**combined)
+
+
+class BufferedSocket:
+    """Collects the messages the synchronous event handlers send, so they can be sent on the asyncio connection
+    afterward"""
+
+    def __init__(self):
+        self.messages: list[str | bytes] = []
+
+    def send(self, message: str | bytes):
+        """Queue a message to be sent
+
+        Arguments:
+            message (str | bytes): the message to send
+        """
+        self.messages.append(message)
+
+    async def flush(self, websocket):
+        """Send the queued messages
+
+        Arguments:
+            websocket: the asyncio connection to send the messages on
+        """
+        messages, self.messages = self.messages, []
+        for message in messages:
+            await websocket.send(message)
+
+
+class Bot:
+    """One bot run by a `BotRunner`
+
+    Attributes:
+        token (str): the token of the bot
+        bot_name (str): the name of the bot
+        client (Client): the client state of the bot, with its own context
+        stats (BotStats): the tick processing statistics of the bot in the current match, reset at the end of the match
+        finished_stats (BotStats): the combined statistics of the finished matches of the bot
+    """
+
+    def __init__(self, token: str, bot_name: str, executor: Executor | None = None):
+        self.token = token
+        self.bot_name = bot_name
+        self.client = Client(ClientState.Unauthorized, executor=executor)
+        self.client.bot_name = bot_name
+        self.client.ship_id = f"ship:{token}:{bot_name}"
+        self.stats = BotStats()
+        self.finished_stats = BotStats()
+
+    def get_total_stats(self) -> BotStats:
+        """Get the statistics of all matches of the bot so far
+
+        Returns:
+            (BotStats): the finished matches and the current match combined
+        """
+        return combine_stats(self.finished_stats, self.stats)
+
+
+class BotRunner:
+    """Runs many bots in one process. The connections of all bots share one asyncio event loop, and the work of all bots
+    shares one bounded thread pool: the team ai or the strategies of a portfolio, and precomputing between ticks.
+    Deserializing the game states and handling the other messages, which open files at the start of a match, run on a
+    thread of their own, so they neither hold up the event loop nor queue behind team ai work.
+
+    The pool is shared fairly: each bot has at most one team ai run in the pool at a time, so a bot whose run misses the
+    deadline skips the team ai on its next ticks until the run returns, instead of crowding out the other bots. Work
+    that waited in the queue until its deadline passed is not run at all.
+
+    Attributes:
+        url (str): the websocket url of the server
+        bots (list[Bot]): the bots to run
+    """
+
+    def __init__(self, url: str, bots: list[tuple[str, str]], workers: int | None = None):
+        if not bots:
+            raise ValueError("The runner needs at least one bot")
+        self.url = url
+        self._pool = ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 1, thread_name_prefix="team-ai")
+        self._message_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="messages")
+        self.bots = [Bot(token, bot_name, self._pool) for token, bot_name in bots]
+        self._running: dict[Bot, Future] = {}
+
+    async def run(self):  # pragma: no cover -- main loop - runs forever
+        """Connect all bots and handle their messages until the connections close"""
+        try:
+            await asyncio.gather(*(self._run_bot(bot) for bot in self.bots))
+        finally:
+            self.shutdown()
+
+    async def handle_message(self, bot: Bot, message: dict, websocket):
+        """Handle one message received by a bot
+
+        Arguments:
+            bot (Bot): the bot that received the message
+            message (dict): the parsed message
+            websocket: the asyncio connection of the bot
+        """
+        client = bot.client
+        if client.precompute is not None:
+            client.precompute.cancel()
+        buffer = BufferedSocket()
+        if message["eventType"] == "gameTick":
+            await self._handle_game_tick(bot, message["data"], buffer)
+        else:
+            # The match start waits for the opponent store of the previous match to be written and opens it, and
+            # warming up after authorization builds the lookup tables of the team ai
+            await asyncio.get_running_loop().run_in_executor(self._message_pool, handle_event, client, message,
+                                                             buffer)
+            if message["eventType"] == "endGame":
+                log_stats(bot)
+                bot.finished_stats = combine_stats(bot.finished_stats, bot.stats)
+                bot.stats = BotStats()
+        await buffer.flush(websocket)
+
+    async def process_tick(self, bot: Bot, state: GameState) -> Command | None:
+        """Run the team ai of a bot on the shared pool and wait for it until the deadline of the tick
+
+        Arguments:
+            bot (Bot): the bot whose tick is processed
+            state (GameState): the state of the tick
+
+        Returns:
+            (Command | None): the command of the team ai, or the latest published command if it did not finish in time
+        """
+        context = bot.client.context
+        bot.stats.ticks += 1
+        deadline = begin_tick_deadline(bot.client)
+        if bot.client.portfolio is not None:
+            return await self._run_portfolio(bot, state, deadline)
+        running = self._running.get(bot, None)
+        if running is not None and not running.done():
+            bot.stats.skipped += 1
+            _logger.warning(f"Bot {bot.bot_name} skipped a tick, its previous tick is still being processed.")
+            return None
+        future = self._pool.submit(self._run_team_ai, bot, context, state, deadline, context.tick, perf_counter())
+        self._running[bot] = future
+        timeout = None if deadline.timestamp is None else max(deadline.remaining_ms(), 0) / 1000
+        try:
+            return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), timeout)
+        except asyncio.TimeoutError:
+            bot.stats.timeouts += 1
+            return get_timeout_command(context)
+
+    def shutdown(self):
+        """Stop the worker threads once the running team ai functions return"""
+        for bot in self.bots:
+            shutdown_client(bot.client)
+        self._pool.shutdown(wait=False)
+        self._message_pool.shutdown(wait=False)
+
+    async def _run_bot(self, bot: Bot):  # pragma: no cover -- main loop - runs forever
+        full_token = f"{self.url}?token={bot.token}&botName={bot.bot_name}"
+        while True:
+            _logger.debug(f"Connecting to web socket at {full_token}")
+            try:
+                async with connect(full_token, **get_connect_options(bot.client.compression, True)) as websocket:
+                    ping_monitor = asyncio.create_task(monitor_pings_async(websocket, bot.client.latency))
+                    try:
+                        buffer = BufferedSocket()
+                        authorize_client(buffer, bot.token, bot.bot_name)
+                        await buffer.flush(websocket)
+                        while True:
+                            await self.handle_message(bot, parse_message(await websocket.recv()), websocket)
+                    finally:
+                        ping_monitor.cancel()
+            except (ConnectionClosed, InvalidHandshake, OSError) as exception:
+                delay = handle_disconnect(bot.client)
+                _logger.warning(f"Bot {bot.bot_name} lost connection to the server ({exception}), reconnecting in "
+                                f"{delay:.2f} seconds")
+                await asyncio.sleep(delay)
+
+    async def _run_portfolio(self, bot: Bot, state: GameState, deadline: TickDeadline) -> Command | None:
+        # The strategies run on the shared pool like any other work, and are awaited in priority order so the event
+        # loop is not blocked while waiting for them
+        portfolio = bot.client.portfolio
+        futures = portfolio.start(bot.client.context, state, deadline)
+        bot.stats.runs += 1
+        for future in futures:
+            if future is None:
+                continue
+            timeout = None if deadline.timestamp is None else max(deadline.remaining_ms(), 0) / 1000
+            try:
+                if await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), timeout) is not None:
+                    break
+            except asyncio.TimeoutError:
+                bot.stats.timeouts += 1
+                break
+        return portfolio.select(futures, deadline)
+
+    async def _handle_game_tick(self, bot: Bot, raw_state: dict, buffer: BufferedSocket):
+        try:
+            # Deserializing a large game state would hold up the messages of all other bots on the event loop, and
+            # queued behind team ai work it would make the tick wait for stale work
+            state = await asyncio.get_running_loop().run_in_executor(self._message_pool, prepare_game_tick,
+                                                                     bot.client, raw_state, perf_counter())
+            action = await self.process_tick(bot, state)
+            complete_game_tick(bot.client, raw_state, state, action, buffer)
+        except Exception as exception:
+            if get_config("wrapper_verbose_exceptions") and get_config("wrapper_verbose_exceptions") != "false":
+                _logger.exception(f"Exception raised during tick handling of bot {bot.bot_name}! "
+                                  f"Exception: '{exception}'")
+            else:
+                _logger.error(f"Exception raised during tick handling of bot {bot.bot_name}! Exception: '{exception}'")
+
+    def _run_team_ai(self, bot: Bot, context: ClientContext, state: GameState, deadline: TickDeadline, tick: int,
+                     submit_time: float) -> Command | None:
+        start_time = perf_counter()
+        stats = bot.stats
+        if deadline.has_passed():
+            stats.skipped += 1
+            return None
+        queue_ms = (start_time - submit_time) * 1000
+        stats.runs += 1
+        stats.total_queue_ms += queue_ms
+        stats.max_queue_ms = max(stats.max_queue_ms, queue_ms)
+        command = process_tick_safely(context, state, tick)
+        processing_ms = (perf_counter() - start_time) * 1000
+        stats.total_processing_ms += processing_ms
+        stats.max_processing_ms = max(stats.max_processing_ms, processing_ms)
+        return command
+
+
+def parse_bots(bots: str) -> list[tuple[str, str]]:
+    """Parse the bots to run from a comma separated list
+
+    Arguments:
+        bots (str): the bots as `token:bot_name` pairs, for example `token1:first,token2:second`
+
+    Returns:
+        (list[tuple[str, str]]): the tokens and names of the bots
+    """
+    parsed = []
+    for bot in (bot.strip() for bot in bots.split(",")):
+        if not bot:
+            continue
+        token, separator, bot_name = bot.partition(":")
+        if not separator or not token or not bot_name:
+            raise ValueError(f"Bot '{bot}' is not of the form token:bot_name")
+        parsed.append((token, bot_name))
+    return parsed
+
+
+def log_stats(bot: Bot):
+    """Log the tick processing statistics of a bot in the current match
+
+    Arguments:
+        bot (Bot): the bot to log the statistics of
+    """
+    stats = bot.stats
+    mean_queue_ms = stats.total_queue_ms / stats.runs if stats.runs else 0.0
+    mean_processing_ms = stats.total_processing_ms / stats.runs if stats.runs else 0.0
+    _logger.info(f"Bot {bot.bot_name} match: {stats.ticks} ticks, {stats.timeouts} timed out, {stats.skipped} skipped, "
+                 f"queue mean {mean_queue_ms:.2f} ms max {stats.max_queue_ms:.2f} ms, processing mean "
+                 f"{mean_processing_ms:.2f} ms max {stats.max_processing_ms:.2f} ms")
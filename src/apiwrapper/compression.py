@@ -0,0 +1,150 @@
+from dataclasses import dataclass, fields
+from logging import getLogger
+from time import perf_counter
+from typing import Any, Optional, Sequence
+
+from websockets.extensions.base import Extension
+from websockets.extensions.permessage_deflate import ClientPerMessageDeflateFactory
+from websockets.frames import CTRL_OPCODES, Frame
+from websockets.typing import ExtensionParameter
+
+from helpers import get_optional_config
+
+_logger = getLogger("wrapper.compression")
+
+_DEFAULT_MEMORY_LEVEL = 5
+_COMPRESSION_OPTIONS = ["deflate", "none"]
+
+
+@dataclass
+class CompressionStats:
+    """Bytes and time spent on websocket message compression
+
+    Attributes:
+        ticks (int): how many ticks were received
+        frames_in (int): how many data frames were received
+        wire_bytes_in (int): the size of the received frames as received, compressed if compression is on
+        raw_bytes_in (int): the size of the received frames after decompression
+        decompress_ms (float): the time spent decompressing received frames in milliseconds
+        frames_out (int): how many data frames were sent
+        raw_bytes_out (int): the size of the sent frames before compression
+        wire_bytes_out (int): the size of the sent frames as sent, compressed if compression is on
+        compress_ms (float): the time spent compressing sent frames in milliseconds
+    """
+    ticks: int = 0
+    frames_in: int = 0
+    wire_bytes_in: int = 0
+    raw_bytes_in: int = 0
+    decompress_ms: float = 0.0
+    frames_out: int = 0
+    raw_bytes_out: int = 0
+    wire_bytes_out: int = 0
+    compress_ms: float = 0.0
+
+    def reset(self):
+        """Set all statistics back to zero, keeping the object the connection records to"""
+        for stat_field in fields(self):
+            setattr(self, stat_field.name, stat_field.default)
+
+
+class InstrumentedExtension(Extension):
+    """Wraps a negotiated websocket extension, recording the bytes before and after it and the time spent in it
+
+    Attributes:
+        extension (Extension): the wrapped extension
+        stats (CompressionStats): the statistics to record to
+    """
+
+    def __init__(self, extension: Extension, stats: CompressionStats):
+        self.extension = extension
+        self.stats = stats
+        self.name = extension.name
+
+    def decode(self, frame: Frame, *, max_size: Optional[int] = None) -> Frame:
+        if frame.opcode in CTRL_OPCODES:
+            return self.extension.decode(frame, max_size=max_size)
+        start_time = perf_counter()
+        decoded = self.extension.decode(frame, max_size=max_size)
+        stats = self.stats
+        stats.decompress_ms += (perf_counter() - start_time) * 1000
+        stats.frames_in += 1
+        stats.wire_bytes_in += len(frame.data)
+        stats.raw_bytes_in += len(decoded.data)
+        return decoded
+
+    def encode(self, frame: Frame) -> Frame:
+        if frame.opcode in CTRL_OPCODES:
+            return self.extension.encode(frame)
+        start_time = perf_counter()
+        encoded = self.extension.encode(frame)
+        stats = self.stats
+        stats.compress_ms += (perf_counter() - start_time) * 1000
+        stats.frames_out += 1
+        stats.raw_bytes_out += len(frame.data)
+        stats.wire_bytes_out += len(encoded.data)
+        return encoded
+
+
+class InstrumentedDeflateFactory(ClientPerMessageDeflateFactory):
+    """A permessage-deflate client extension factory whose negotiated extensions record `CompressionStats`"""
+
+    def __init__(self, stats: CompressionStats, **kwargs: Any):
+        super().__init__(**kwargs)
+        self.stats = stats
+
+    def process_response_params(self, params: Sequence[ExtensionParameter],
+                                accepted_extensions: Sequence[Extension]) -> Extension:
+        return InstrumentedExtension(super().process_response_params(params, accepted_extensions), self.stats)
+
+
+def get_connect_options(stats: CompressionStats, for_asyncio: bool = False) -> dict:
+    """Get the keyword arguments for `connect` from the websocket connection config
+
+    Arguments:
+        stats (CompressionStats): the statistics the compression extension records to
+        for_asyncio (bool): whether the options are for the asyncio client, which also has buffer size options
+
+    Returns:
+        (dict): the keyword arguments
+    """
+    compression = get_optional_config("websocket_compression", "deflate")
+    if compression not in _COMPRESSION_OPTIONS:
+        raise ValueError(f"Unknown websocket compression '{compression}', the options are "
+                         f"{', '.join(_COMPRESSION_OPTIONS)}")
+    options: dict[str, Any] = {"compression": None}
+    if compression == "deflate":
+        compress_settings = {"memLevel": _DEFAULT_MEMORY_LEVEL}
+        level = get_optional_config("websocket_compression_level")
+        if level is not None:
+            compress_settings["level"] = int(level)
+        window_bits = get_optional_config("websocket_max_window_bits")
+        factory_options: dict[str, Any] = {"compress_settings": compress_settings}
+        if window_bits is not None:
+            factory_options["client_max_window_bits"] = int(window_bits)
+            factory_options["server_max_window_bits"] = int(window_bits)
+        options["extensions"] = [InstrumentedDeflateFactory(stats, **factory_options)]
+    max_size = get_optional_config("websocket_max_size")
+    if max_size is not None:
+        options["max_size"] = int(max_size)
+    if for_asyncio:
+        for name in ("max_queue", "read_limit", "write_limit"):
+            value = get_optional_config(f"websocket_{name}")
+            if value is not None:
+                options[name] = int(value)
+    return options
+
+
+def log_compression_stats(stats: CompressionStats):
+    """Log the compression statistics per tick
+
+    Arguments:
+        stats (CompressionStats): the statistics
+    """
+    ticks = stats.ticks
+    if ticks <= 0 or stats.frames_in == 0:
+        return
+    ratio = stats.wire_bytes_in / stats.raw_bytes_in if stats.raw_bytes_in else 1.0
+    _logger.info(f"Compression per tick: received {stats.wire_bytes_in / ticks:.0f} bytes for "
+                 f"{stats.raw_bytes_in / ticks:.0f} raw bytes (ratio {ratio:.3f}), decompression "
+                 f"{stats.decompress_ms / ticks:.3f} ms, sent {stats.wire_bytes_out / ticks:.0f} bytes for "
+                 f"{stats.raw_bytes_out / ticks:.0f} raw bytes, compression {stats.compress_ms / ticks:.3f} ms")
@@ -0,0 +1,86 @@
+from concurrent.futures import Executor, Future
+from logging import getLogger
+from threading import Event, Thread
+from time import perf_counter
+from typing import Callable
+
+from helpers import get_config
+from apiwrapper.models import ClientContext, Command, GameState
+
+_logger = getLogger("wrapper.precompute")
+
+
+class IdlePrecompute:
+    """Runs a precompute function in a background thread in the idle time between sending a command and receiving the
+    next tick.
+
+    Python threads cannot be stopped from the outside, so the function is given an `Event` that is set when the next
+    message arrives, and it should return soon after it is set.
+
+    Attributes:
+        function (Callable[[ClientContext, GameState, Command | None, Event], None]): the precompute function
+        executor (Executor | None): the executor to run the function on, for example the pool shared by the bots of a
+            process. `None` runs each precompute in a thread of its own
+        runs (int): how many times the function has been started
+        cancelled_runs (int): how many runs were still going when they were cancelled
+    """
+
+    def __init__(self, function: Callable[[ClientContext, GameState, Command | None, Event], None],
+                 executor: Executor | None = None):
+        self.function = function
+        self.executor = executor
+        self.runs = 0
+        self.cancelled_runs = 0
+        self._running: Thread | Future | None = None
+        self._cancel = Event()
+
+    def start(self, context: ClientContext, state: GameState, command: Command | None):
+        """Start precomputing in the background, cancelling a run that is still going
+
+        Arguments:
+            context (ClientContext): the context of the current game
+            state (GameState): the state of the tick whose command was just sent
+            command (Command | None): the command that was sent, `None` if nothing was sent
+        """
+        self.cancel()
+        self._cancel = Event()
+        self.runs += 1
+        if self.executor is not None:
+            self._running = self.executor.submit(self._run, context, state, command, self._cancel)
+            return
+        thread = Thread(target=self._run, args=(context, state, command, self._cancel), name="idle-precompute",
+                        daemon=True)
+        self._running = thread
+        thread.start()
+
+    def cancel(self):
+        """Tell a running precompute to stop. Does not wait for it, so the caller is not blocked, for example the event
+        loop of `apiwrapper.async_runner.BotRunner`."""
+        running = self._running
+        if running is None:
+            return
+        self._running = None
+        if _is_finished(running):
+            return
+        self.cancelled_runs += 1
+        self._cancel.set()
+        if isinstance(running, Future):
+            # A run still queued behind other work is dropped, it would only start after the next tick arrived
+            running.cancel()
+
+    def _run(self, context: ClientContext, state: GameState, command: Command | None, cancel: Event):
+        start_time = perf_counter()
+        try:
+            self.function(context, state, command, cancel)
+        except Exception as exception:
+            if get_config("wrapper_verbose_exceptions") and get_config("wrapper_verbose_exceptions") != "false":
+                _logger.exception(f"Exception raised in team ai precompute code: {exception}")
+            else:
+                _logger.error(f"Exception raised in team ai precompute code: {exception}")
+            return
+        state_text = "cancelled" if cancel.is_set() else "finished"
+        _logger.debug(f"Precompute {state_text} after {((perf_counter() - start_time) * 1000):.2f} milliseconds")
+
+
+def _is_finished(running: Thread | Future) -> bool:
+    return running.done() if isinstance(running, Future) else not running.is_alive()
@@ -0,0 +1,110 @@
+import json
+from typing import Any, Callable
+
+from helpers import get_optional_config
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover -- depends on the installed packages
+    orjson = None
+
+_CODEC_PREFERENCE = ["orjson", "stdlib"]
+
+# json.dumps builds a new encoder on every call when given any options, so the compact encoder is built once
+_STDLIB_ENCODER = json.JSONEncoder(separators=(",", ":"))
+
+
+class JsonCodec:
+    """A JSON backend for the websocket transport and replay files
+
+    Attributes:
+        name (str): the name of the backend
+    """
+
+    def __init__(self, name: str, decode: Callable[[str | bytes], Any], encode: Callable[[Any], bytes],
+                 encode_text: Callable[[Any], str]):
+        self.name = name
+        self._decode = decode
+        self._encode = encode
+        self._encode_text = encode_text
+
+    def decode(self, data: str | bytes | memoryview) -> Any:
+        """Decode a JSON document
+
+        Arguments:
+            data (str | bytes | memoryview): the document as text or UTF-8 bytes
+
+        Returns:
+            (Any): the decoded value
+        """
+        return self._decode(data)
+
+    def encode(self, value: Any) -> bytes:
+        """Encode a value into a compact JSON document
+
+        Arguments:
+            value (Any): the value to encode
+
+        Returns:
+            (bytes): the document as UTF-8 bytes
+        """
+        return self._encode(value)
+
+    def encode_text(self, value: Any) -> str:
+        """Encode a value into a compact JSON document
+
+        Arguments:
+            value (Any): the value to encode
+
+        Returns:
+            (str): the document as text
+        """
+        return self._encode_text(value)
+
+
+def _decode_stdlib(data: str | bytes | memoryview) -> Any:
+    return json.loads(data.tobytes() if isinstance(data, memoryview) else data)
+
+
+def _encode_text_stdlib(value: Any) -> str:
+    return _STDLIB_ENCODER.encode(value)
+
+
+def _create_codec(name: str) -> JsonCodec | None:
+    if name == "stdlib":
+        return JsonCodec("stdlib", _decode_stdlib, lambda value: _encode_text_stdlib(value).encode("utf-8"),
+                         _encode_text_stdlib)
+    if name == "orjson" and orjson is not None:
+        return JsonCodec("orjson", orjson.loads, orjson.dumps, lambda value: orjson.dumps(value).decode("utf-8"))
+    return None
+
+
+def get_available_codecs() -> list[str]:
+    """Get the JSON backends that are installed
+
+    Returns:
+        (list[str]): the names of the installed backends, fastest first
+    """
+    return [name for name in _CODEC_PREFERENCE if _create_codec(name) is not None]
+
+
+def get_codec(name: str | None = None) -> JsonCodec:
+    """Get a JSON backend
+
+    Arguments:
+        name (str | None): the name of the backend, 'orjson' or 'stdlib'. If not given, the `json_codec` config is used,
+            and if that is not set either, the fastest installed backend
+
+    Returns:
+        (JsonCodec): the backend
+    """
+    if name is None:
+        name = get_optional_config("json_codec")
+    if name is None:
+        return _create_codec(get_available_codecs()[0])
+    if name not in _CODEC_PREFERENCE:
+        raise ValueError(f"Unknown JSON codec '{name}', the options are {', '.join(_CODEC_PREFERENCE)}")
+    codec = _create_codec(name)
+    if codec is None:
+        raise ValueError(f"JSON codec '{name}' is not installed")
+    return codec
@@ -0,0 +1,178 @@
+import asyncio
+import math
+from collections import deque
+from logging import getLogger
+from threading import Thread
+from time import perf_counter, sleep
+
+_logger = getLogger("wrapper.latency")
+
+DEFAULT_MARGIN_MS = 50.0
+"""The time reserved for the network per tick until enough round trips have been measured"""
+
+MIN_MARGIN_MS = 5.0
+"""The least time reserved for the network and the wrapper per tick, however fast the measurements are"""
+
+BUDGET_PERCENTILE = 95.0
+"""The percentile of the measurements the budget is computed from"""
+
+LATENCY_WINDOW = 200
+"""How many of the latest measurements of each kind are kept"""
+
+MIN_ROUND_TRIPS = 5
+"""How many round trips have to be measured before the budget is computed from measurements"""
+
+PING_INTERVAL_S = 1.0
+"""How often the round trip time to the server is measured with a ping"""
+
+PING_TIMEOUT_S = 5.0
+"""How long a ping waits for its pong before the round trip is left unmeasured"""
+
+
+def get_percentile(samples: list[float], percentile: float) -> float:
+    """Get a percentile of samples with the nearest rank method
+
+    Arguments:
+        samples (list[float]): the samples, in any order
+        percentile (float): the percentile between 0 and 100
+
+    Returns:
+        (float): the smallest sample that at least `percentile` percent of the samples are less than or equal to, 0 if
+        there are no samples
+    """
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[max(math.ceil(percentile / 100 * len(ordered)) - 1, 0)]
+
+
+class LatencyTracker:
+    """Measures the time the network and the wrapper take on each tick and computes how much of the tick is left for the
+    team ai.
+
+    The command of a tick has to reach the server before the tick ends, but the tick is received one network trip after
+    it started and the command arrives one trip after it is sent. The time reserved per tick is a high percentile of
+    the round trip time, plus a high percentile of the time taken to serialize and send a command and of how late ticks
+    arrive compared to the tick length.
+
+    Attributes:
+        round_trips_ms (deque[float]): the latest ping round trip times in milliseconds
+        send_overheads_ms (deque[float]): the latest times from the team ai returning to the command being sent in
+            milliseconds
+        tick_jitters_ms (deque[float]): the latest delays of tick arrivals compared to the tick length in milliseconds
+    """
+
+    def __init__(self):
+        self.round_trips_ms: deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self.send_overheads_ms: deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self.tick_jitters_ms: deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self._last_tick: tuple[int, float] | None = None
+
+    def record_round_trip(self, round_trip_ms: float):
+        """Record the round trip time of a ping
+
+        Arguments:
+            round_trip_ms (float): the time from sending the ping to receiving the pong in milliseconds
+        """
+        self.round_trips_ms.append(round_trip_ms)
+
+    def record_send_overhead(self, overhead_ms: float):
+        """Record the time taken to serialize and send a command
+
+        Arguments:
+            overhead_ms (float): the time from the team ai returning to the command being sent in milliseconds
+        """
+        self.send_overheads_ms.append(overhead_ms)
+
+    def record_tick_arrival(self, turn_number: int, tick_length_ms: int, received_at: float | None = None):
+        """Record the arrival of a tick, measuring how late it arrived compared to the previous tick
+
+        Arguments:
+            turn_number (int): the turn number of the tick
+            tick_length_ms (int): the length of a tick in milliseconds
+            received_at (float | None): the `time.perf_counter` timestamp of receiving the tick, now if not given
+        """
+        received_at = perf_counter() if received_at is None else received_at
+        if self._last_tick is not None and tick_length_ms > 0:
+            last_turn_number, last_received_at = self._last_tick
+            turns = turn_number - last_turn_number
+            if turns > 0:
+                expected_ms = turns * tick_length_ms
+                self.tick_jitters_ms.append(max((received_at - last_received_at) * 1000 - expected_ms, 0.0))
+        self._last_tick = (turn_number, received_at)
+
+    def reset_ticks(self):
+        """Forget the previous tick, so the first tick of the next match is not compared to the last tick of this one"""
+        self._last_tick = None
+
+    def get_margin_ms(self) -> float:
+        """Get the time reserved for the network and the wrapper per tick
+
+        Returns:
+            (float): the reserved time in milliseconds
+        """
+        if len(self.round_trips_ms) < MIN_ROUND_TRIPS:
+            return DEFAULT_MARGIN_MS
+        margin_ms = (get_percentile(list(self.round_trips_ms), BUDGET_PERCENTILE)
+                     + get_percentile(list(self.send_overheads_ms), BUDGET_PERCENTILE)
+                     + get_percentile(list(self.tick_jitters_ms), BUDGET_PERCENTILE))
+        return max(margin_ms, MIN_MARGIN_MS)
+
+    def get_budget_ms(self, tick_length_ms: int) -> float:
+        """Get the time the team ai has per tick
+
+        Arguments:
+            tick_length_ms (int): the length of a tick in milliseconds
+
+        Returns:
+            (float): the tick length minus the reserved time in milliseconds, at least 0
+        """
+        return max(tick_length_ms - self.get_margin_ms(), 0.0)
+
+
+def start_ping_monitor(websocket, tracker: LatencyTracker) -> Thread:
+    """Start measuring the round trip time to the server in a background thread, until the connection closes
+
+    Arguments:
+        websocket: the synchronous websocket connection
+        tracker (LatencyTracker): the tracker to record the round trips to
+
+    Returns:
+        (Thread): the monitor thread
+    """
+    thread = Thread(target=_monitor_pings, args=(websocket, tracker), name="ping-monitor", daemon=True)
+    thread.start()
+    return thread
+
+
+def _monitor_pings(websocket, tracker: LatencyTracker):  # pragma: no cover -- runs until the connection closes
+    try:
+        while True:
+            sent_at = perf_counter()
+            pong = websocket.ping()
+            if pong.wait(PING_TIMEOUT_S):
+                tracker.record_round_trip((perf_counter() - sent_at) * 1000)
+            sleep(PING_INTERVAL_S)
+    except Exception as exception:
+        _logger.debug(f"Ping monitor stopped: {exception}")
+
+
+async def monitor_pings_async(websocket, tracker: LatencyTracker):  # pragma: no cover -- runs until closed
+    """Measure the round trip time to the server on an asyncio connection until the connection closes
+
+    Arguments:
+        websocket: the asyncio websocket connection
+        tracker (LatencyTracker): the tracker to record the round trips to
+    """
+    try:
+        while True:
+            sent_at = perf_counter()
+            pong = await websocket.ping()
+            try:
+                await asyncio.wait_for(pong, PING_TIMEOUT_S)
+                tracker.record_round_trip((perf_counter() - sent_at) * 1000)
+            except asyncio.TimeoutError:
+                pass
+            await asyncio.sleep(PING_INTERVAL_S)
+    except Exception as exception:
+        _logger.debug(f"Ping monitor stopped: {exception}")
@@ -1,6 +1,43 @@
-from dataclasses import dataclass
+import math
+from dataclasses import dataclass, field
 from enum import Enum
-from typing import Optional
+from threading import Lock, local
+from time import perf_counter
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    from apiwrapper.opponent_store import OpponentStore
+    from feature_planes import FeaturePlanes
+
+
+class TickDeadline:
+    """The time limit of the tick that is being processed
+
+    Attributes:
+        timestamp (float | None): the `time.perf_counter` timestamp at which the wrapper stops waiting for the team AI
+            and sends the latest provisional command instead. `None` if the game has no tick time limit
+    """
+
+    def __init__(self, timestamp: float | None = None):
+        self.timestamp = timestamp
+
+    def remaining_ms(self) -> float:
+        """Get the time left until the deadline
+
+        Returns:
+            (float): milliseconds left until the deadline, negative if it has passed. Infinite if there is no deadline
+        """
+        if self.timestamp is None:
+            return math.inf
+        return (self.timestamp - perf_counter()) * 1000
+
+    def has_passed(self) -> bool:
+        """Check whether the deadline has passed
+
+        Returns:
+            (bool): `True` if the deadline has passed, otherwise `False`
+        """
+        return self.remaining_ms() <= 0
 
 
 class ClientContext:
@@ -12,11 +49,65 @@ class ClientContext:
     Attributes:
         tick_length_ms (int): The length of one game tick in milliseconds
         turn_rate (int): The maximum turn rate of a ship, given in 1/8ths of a circle
+        deadline (TickDeadline): The time limit of the tick that is being processed
+        tick_budget_ms (float): The time the team AI has for the tick that is being processed in milliseconds, the
+            tick length minus the time the wrapper reserves for the network based on measured latency
+        tick (int): A token of the tick that is being processed, increased by `begin_tick`
+        provisional_command (Command | None): The latest command published during the tick, see `publish_command`
+        opponent_store (OpponentStore | None): What has been learned about opponents over matches, if the
+            `opponent_store` config is set. Values put into it are saved at the end of the match.
     """
 
     def __init__(self, tick_length_ms: int, turn_rate: int):
         self.tick_length_ms = tick_length_ms
         self.turn_rate = turn_rate
+        self.deadline = TickDeadline()
+        self.tick_budget_ms: float = tick_length_ms
+        self.tick = 0
+        self.provisional_command: "Command | None" = None
+        self.opponent_store: "OpponentStore | None" = None
+        self._publish_lock = Lock()
+        self._bound_tick = local()
+
+    def publish_command(self, command: "Command", tick: int | None = None):
+        """Publish the best command found so far on this tick. If the tick processing times out, the wrapper sends
+        the latest published command instead of "move 0".
+
+        A command published for a tick that is already over is ignored, so a timed out tick processing that is still
+        running cannot publish the fallback command of a later tick.
+
+        Arguments:
+            command (Command): the command to send if the tick processing does not finish in time
+            tick (int | None): the `tick` token of the tick the command is for. Defaults to the tick the calling thread
+                was started for by the wrapper, pass it when publishing from threads of your own
+        """
+        if tick is None:
+            tick = getattr(self._bound_tick, "tick", None)
+        with self._publish_lock:
+            if tick is not None and tick != self.tick:
+                return
+            self.provisional_command = command
+
+    def begin_tick(self, deadline: TickDeadline):
+        """Start a new tick. Called by the wrapper before tick processing, clears the provisional command and
+        increases the tick token.
+
+        Arguments:
+            deadline (TickDeadline): the time limit of the new tick
+        """
+        with self._publish_lock:
+            self.tick += 1
+            self.deadline = deadline
+            self.provisional_command = None
+
+    def bind_tick(self, tick: int):
+        """Tie the commands the calling thread publishes without a token to a tick. Called by the wrapper in the thread
+        that processes the tick.
+
+        Arguments:
+            tick (int): the `tick` token of the tick the thread processes
+        """
+        self._bound_tick.tick = tick
 
 
 @dataclass
@@ -117,6 +208,27 @@ class Cell:
     data: dict | HitBoxData | ShipData | ProjectileData
 
 
+@dataclass
+class GameStateDelta:
+    """A dataclass representing the changes to the game map since the previous tick of the match
+
+    Attributes:
+        changed_cells (list[Coordinates]): the coordinates of the cells whose type or data changed, in row order
+        appeared (list[ShipData | ProjectileData]): the entities that are on the map but were not on the previous map
+        disappeared (list[ShipData | ProjectileData]): the entities that were on the previous map but are not anymore,
+            as they were on the previous map
+        moved (list[tuple[ShipData | ProjectileData, ShipData | ProjectileData]]): the entities on both maps whose
+            position changed, as (previous, current) pairs
+        updated (list[tuple[ShipData | ProjectileData, ShipData | ProjectileData]]): the entities on both maps that
+            stayed in place but whose other data (direction, health, heat) changed, as (previous, current) pairs
+    """
+    changed_cells: list[Coordinates]
+    appeared: list[ShipData | ProjectileData]
+    disappeared: list[ShipData | ProjectileData]
+    moved: list[tuple[ShipData | ProjectileData, ShipData | ProjectileData]]
+    updated: list[tuple[ShipData | ProjectileData, ShipData | ProjectileData]]
+
+
 @dataclass
 class GameState:
     """A dataclass representing the state of the game at the start of a tick
@@ -124,9 +236,26 @@ class GameState:
     Attributes:
         turn_number (int): the current turn number
         game_map (list[list[Cell]]): an array of arrays (matrix) of cells representing the whole map
+        raw_map (list[list[dict]] | None): the map as received from the server, `None` if the state was not
+            deserialized from a server message
+        delta (GameStateDelta | None): the changes since the previous tick of the match, `None` on the first tick or if
+            the state was not deserialized against a previous state
     """
     turn_number: int
     game_map: list[list[Cell]]
+    raw_map: list[list[dict]] | None = field(default=None, repr=False, compare=False)
+    delta: GameStateDelta | None = field(default=None, repr=False, compare=False)
+
+    def to_planes(self) -> "FeaturePlanes":
+        """Get the map as typed NumPy arrays for vectorized evaluation. Requires NumPy to be installed.
+
+        Returns:
+            (FeaturePlanes): the map as arrays, see `feature_planes.FeaturePlanes`
+        """
+        from feature_planes import planes_from_game_map, planes_from_raw_map
+        if self.raw_map is not None:
+            return planes_from_raw_map(self.raw_map)
+        return planes_from_game_map(self.game_map)
 
 
 class ActionType(Enum):
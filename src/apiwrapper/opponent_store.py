@@ -0,0 +1,199 @@
+import mmap
+import os
+from contextlib import contextmanager
+from logging import getLogger
+from threading import Thread
+from typing import Any, Iterator
+
+from apiwrapper.json_codec import get_codec
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover -- not available on Windows
+    fcntl = None
+
+COMPACTION_RATIO = 2
+"""The log is compacted when it holds more than this many records per stored key"""
+
+MIN_COMPACTION_RECORDS = 64
+"""The log is not compacted before it holds this many records, as rewriting a small log saves nothing"""
+
+LOCK_SUFFIX = ".lock"
+"""The suffix of the lock file next to the store file, which keeps bots in other threads and processes from writing at
+the same time"""
+
+_CODEC = get_codec()
+_logger = getLogger("wrapper.opponent_store")
+
+
+class OpponentStore:
+    """What the team ai has learned about opponents, kept over matches in a file.
+
+    The values are stored by key, for example the id of the enemy ship, and can be anything JSON can encode. The file is
+    an append log with one `key<TAB>value` line per write, where the last line of a key holds its current value, and it
+    is compacted to one line per key once it has grown long enough. Opening a store memory-maps the file and only finds
+    the line of each key, a value is decoded the first time it is read.
+
+    Values returned by `get` are shared, so change a copy and `put` it to store the change. Writes are kept in memory
+    until `flush`.
+
+    Attributes:
+        path (str): the path of the store file
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._pending: dict[str, Any] = {}
+        self._values: dict[str, Any] = {}
+        self._file = None
+        self._map: mmap.mmap | None = None
+        self._view = memoryview(b"")
+        self._index: dict[str, tuple[int, int]] = {}
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            self._file = open(path, "rb")
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._view = memoryview(self._map)
+            self._index = _index_records(self._map)[0]
+
+    def __len__(self) -> int:
+        return len(self.keys())
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._pending or key in self._values or key in self._index
+
+    def keys(self) -> set[str]:
+        """Get the stored keys
+
+        Returns:
+            (set[str]): the keys of the stored values, including the ones not flushed yet
+        """
+        return self._index.keys() | self._values.keys() | self._pending.keys()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Get a stored value
+
+        Arguments:
+            key (str): the key of the value
+            default (Any): the value to return if nothing is stored for the key
+
+        Returns:
+            (Any): the latest value stored for the key, or the default
+        """
+        if key in self._pending:
+            return self._pending[key]
+        if key in self._values:
+            return self._values[key]
+        location = self._index.get(key)
+        if location is None:
+            return default
+        offset, length = location
+        value = _CODEC.decode(self._view[offset:offset + length])
+        self._values[key] = value
+        return value
+
+    def put(self, key: str, value: Any):
+        """Store a value, written to the file on the next `flush`
+
+        Arguments:
+            key (str): the key of the value, must not contain tabs or line breaks
+            value (Any): the value, anything JSON can encode
+        """
+        if "\t" in key or "\n" in key or "\r" in key:
+            raise ValueError(f"Opponent store key '{key}' contains a tab or a line break")
+        self._pending[key] = value
+
+    def flush(self):
+        """Append the values stored since the last flush to the file, and compact the file if it has grown long enough
+        compared to the amount of keys"""
+        if not self._pending:
+            return
+        lines = b"".join(key.encode("utf-8") + b"\t" + _CODEC.encode(value) + b"\n"
+                         for key, value in self._pending.items())
+        with _lock(self.path):
+            with open(self.path, "ab+") as store_file:
+                store_file.seek(0)
+                data = store_file.read()
+                # A line cut short by a crash would otherwise run into the first appended line
+                complete_size = data.rfind(b"\n") + 1
+                if complete_size < len(data):
+                    store_file.truncate(complete_size)
+                store_file.write(lines)
+            _compact_if_needed(self.path, data[:complete_size] + lines)
+        self._values.update(self._pending)
+        self._pending.clear()
+
+    def close(self):
+        """Release the memory map and close the file. Values not flushed are lost."""
+        self._view.release()
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def flush_in_background(store: OpponentStore) -> Thread:
+    """Flush and close a store in a background thread
+
+    Arguments:
+        store (OpponentStore): the store, not to be used after this
+
+    Returns:
+        (Thread): the flushing thread, join it before opening the store file again to see the flushed values
+    """
+    thread = Thread(target=_flush_and_close, args=(store,), name="opponent-store-flush", daemon=True)
+    thread.start()
+    return thread
+
+
+def _flush_and_close(store: OpponentStore):
+    try:
+        store.flush()
+    except OSError as exception:
+        _logger.error(f"Could not write the opponent store {store.path}: {exception}")
+    finally:
+        store.close()
+
+
+def _index_records(data: mmap.mmap | bytes) -> tuple[dict[str, tuple[int, int]], int]:
+    # Later lines of a key replace the earlier ones in the index. A line cut short by a crash while appending has no
+    # line break and is left out.
+    index = {}
+    records = 0
+    start = 0
+    while True:
+        end = data.find(b"\n", start)
+        if end < 0:
+            return index, records
+        separator = data.find(b"\t", start, end)
+        if separator >= 0:
+            index[data[start:separator].decode("utf-8")] = (separator + 1, end - separator - 1)
+            records += 1
+        start = end + 1
+
+
+def _compact_if_needed(path: str, data: bytes):
+    index, records = _index_records(data)
+    if records < MIN_COMPACTION_RECORDS or records <= COMPACTION_RATIO * len(index):
+        return
+    temporary_path = path + ".tmp"
+    with open(temporary_path, "wb") as compacted_file:
+        compacted_file.write(b"".join(key.encode("utf-8") + b"\t" + data[offset:offset + length] + b"\n"
+                                      for key, (offset, length) in index.items()))
+    # Open stores keep reading the replaced file through their memory maps
+    os.replace(temporary_path, path)
+    _logger.debug(f"Compacted the opponent store {path} from {records} to {len(index)} records")
+
+
+@contextmanager
+def _lock(path: str) -> Iterator[None]:
+    if fcntl is None:  # pragma: no cover -- not available on Windows
+        yield
+        return
+    with open(path + LOCK_SUFFIX, "wb") as lock_file:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
@@ -0,0 +1,220 @@
+import copy
+import importlib
+from concurrent.futures import Executor, Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from dataclasses import dataclass
+from logging import getLogger
+from time import perf_counter
+from typing import Callable
+
+from helpers import get_config
+from apiwrapper.models import ClientContext, Command, GameState, TickDeadline
+
+_logger = getLogger("wrapper.portfolio")
+
+
+@dataclass
+class StrategyStats:
+    """Latency and selection statistics of one strategy
+
+    Attributes:
+        runs (int): how many ticks the strategy was started on
+        finished (int): how many runs returned before the deadline
+        selections (int): how many times the result of the strategy was sent
+        timeouts (int): how many runs returned after the deadline
+        errors (int): how many runs raised an exception
+        skipped (int): how many ticks the strategy was not started on because its previous run was still going
+        total_ms (float): the summed duration of the finished runs in milliseconds
+        max_ms (float): the longest duration of a finished run in milliseconds
+    """
+    runs: int = 0
+    finished: int = 0
+    selections: int = 0
+    timeouts: int = 0
+    errors: int = 0
+    skipped: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+
+    @property
+    def mean_ms(self) -> float:
+        """The mean duration of the finished runs in milliseconds, 0 if no run has finished"""
+        return self.total_ms / self.finished if self.finished else 0.0
+
+
+class Portfolio:
+    """Runs several strategies with the `process_tick` signature concurrently on a persistent thread pool and sends the
+    result of the highest priority strategy that finished by the deadline.
+
+    Each strategy gets its own copy of the match context, made at the start of the match, so strategies can keep data
+    between ticks without racing each other. The tick length, turn rate, tick budget and deadline are the same in every
+    copy.
+
+    The strategies run on a thread pool of the portfolio, or on the given executor, for example the pool shared by the
+    bots of a process.
+
+    Attributes:
+        strategies (list[tuple[str, Callable[[ClientContext, GameState], Command | None]]]): the names and functions of
+            the strategies, highest priority first
+        stats (dict[str, StrategyStats]): the statistics of each strategy by name
+    """
+
+    def __init__(self, strategies: list[tuple[str, Callable[[ClientContext, GameState], Command | None]]],
+                 executor: Executor | None = None):
+        if not strategies:
+            raise ValueError("A portfolio needs at least one strategy")
+        self.strategies = strategies
+        self.stats = {name: StrategyStats() for name, _ in strategies}
+        # A given executor belongs to the caller, so it is not shut down with the portfolio
+        self._owns_pool = executor is None
+        self._pool = executor if executor is not None else \
+            ThreadPoolExecutor(max_workers=len(strategies), thread_name_prefix="strategy")
+        self._contexts: list[ClientContext] = []
+        self._running: list[Future | None] = [None] * len(strategies)
+
+    def start_match(self, context: ClientContext):
+        """Give each strategy a fresh copy of the context of a new match
+
+        Arguments:
+            context (ClientContext): the context of the match
+        """
+        self._contexts = [copy.copy(context) for _ in self.strategies]
+
+    def run(self, context: ClientContext, state: GameState, deadline: TickDeadline) -> Command | None:
+        """Run all strategies on a tick and choose the command to send
+
+        Arguments:
+            context (ClientContext): the context of the match
+            state (GameState): the state of the tick
+            deadline (TickDeadline): the time limit of the tick
+
+        Returns:
+            (Command | None): the command of the highest priority strategy that returned one by the deadline. If none
+            did, the latest command published by the highest priority strategy that published one, otherwise `None`
+        """
+        return self.select(self.start(context, state, deadline), deadline)
+
+    def start(self, context: ClientContext, state: GameState, deadline: TickDeadline) -> list[Future | None]:
+        """Start all strategies on a tick without waiting for them, see `select`
+
+        Arguments:
+            context (ClientContext): the context of the match
+            state (GameState): the state of the tick
+            deadline (TickDeadline): the time limit of the tick
+
+        Returns:
+            (list[Future | None]): the runs of the strategies in priority order, `None` for a strategy whose previous
+            run was still going
+        """
+        if len(self._contexts) != len(self.strategies):
+            self.start_match(context)
+        futures = []
+        for index, (name, function) in enumerate(self.strategies):
+            stats = self.stats[name]
+            if self._running[index] is not None and not self._running[index].done():
+                stats.skipped += 1
+                futures.append(None)
+                continue
+            strategy_context = self._contexts[index]
+            # The budget is measured by the wrapper on each tick, the copies only got the one of the first tick
+            strategy_context.tick_budget_ms = context.tick_budget_ms
+            strategy_context.begin_tick(deadline)
+            stats.runs += 1
+            future = self._pool.submit(self._run_strategy, name, function, strategy_context, state, deadline,
+                                       strategy_context.tick)
+            self._running[index] = future
+            futures.append(future)
+        return futures
+
+    def select(self, futures: list[Future | None], deadline: TickDeadline) -> Command | None:
+        """Wait for the strategies started with `start` until the deadline and choose the command to send
+
+        Arguments:
+            futures (list[Future | None]): the runs returned by `start`
+            deadline (TickDeadline): the time limit of the tick
+
+        Returns:
+            (Command | None): the command to send, see `run`
+        """
+        for index, future in enumerate(futures):
+            if future is None:
+                continue
+            try:
+                timeout = None if deadline.timestamp is None else max(deadline.remaining_ms(), 0) / 1000
+                command = future.result(timeout=timeout)
+            except FutureTimeoutError:
+                break
+            if command is not None:
+                self.stats[self.strategies[index][0]].selections += 1
+                return command
+        # The deadline passed before a higher priority strategy finished, so take any lower priority result that is
+        # ready and fall back to published commands
+        for index, future in enumerate(futures):
+            if future is not None and future.done() and future.result() is not None:
+                self.stats[self.strategies[index][0]].selections += 1
+                return future.result()
+        for index, strategy_context in enumerate(self._contexts):
+            if futures[index] is not None and strategy_context.provisional_command is not None:
+                self.stats[self.strategies[index][0]].selections += 1
+                return strategy_context.provisional_command
+        return None
+
+    def shutdown(self):
+        """Stop the worker threads once the running strategies return, unless they belong to a given executor"""
+        if self._owns_pool:
+            self._pool.shutdown(wait=False)
+
+    def _run_strategy(self, name: str, function: Callable[[ClientContext, GameState], Command | None],
+                      context: ClientContext, state: GameState, deadline: TickDeadline, tick: int) -> Command | None:
+        context.bind_tick(tick)
+        stats = self.stats[name]
+        start_time = perf_counter()
+        try:
+            command = function(context, state)
+        except Exception as exception:
+            stats.errors += 1
+            if get_config("wrapper_verbose_exceptions") and get_config("wrapper_verbose_exceptions") != "false":
+                _logger.exception(f"Exception raised in strategy {name}: {exception}")
+            else:
+                _logger.error(f"Exception raised in strategy {name}: {exception}")
+            return None
+        elapsed_ms = (perf_counter() - start_time) * 1000
+        if deadline.has_passed():
+            stats.timeouts += 1
+            return command
+        stats.finished += 1
+        stats.total_ms += elapsed_ms
+        stats.max_ms = max(stats.max_ms, elapsed_ms)
+        return command
+
+
+def load_strategies(names: str) -> list[tuple[str, Callable[[ClientContext, GameState], Command | None]]]:
+    """Load strategy functions from a comma separated list of names
+
+    Arguments:
+        names (str): the strategies as `module.function` names, for example `team_ai.process_tick`, highest priority
+            first
+
+    Returns:
+        (list[tuple[str, Callable[[ClientContext, GameState], Command | None]]]): the names and functions
+    """
+    strategies = []
+    for name in (name.strip() for name in names.split(",")):
+        if not name:
+            continue
+        module_name, _, function_name = name.rpartition(".")
+        if not module_name:
+            raise ValueError(f"Strategy '{name}' is not of the form module.function")
+        strategies.append((name, getattr(importlib.import_module(module_name), function_name)))
+    return strategies
+
+
+def log_stats(portfolio: Portfolio):
+    """Log the statistics of each strategy of a portfolio
+
+    Arguments:
+        portfolio (Portfolio): the portfolio to log the statistics of
+    """
+    for name, stats in portfolio.stats.items():
+        _logger.info(f"Strategy {name}: {stats.runs} runs, {stats.selections} selected, {stats.timeouts} timed out, "
+                     f"{stats.errors} errors, {stats.skipped} skipped, mean {stats.mean_ms:.2f} ms, "
+                     f"max {stats.max_ms:.2f} ms")
@@ -0,0 +1,255 @@
+import mmap
+import os
+import re
+from array import array
+from datetime import datetime
+from typing import Iterator
+
+from apiwrapper.json_codec import get_codec
+from apiwrapper.models import GameState
+from apiwrapper.serialization import deserialize_game_state
+
+OUTCOME_LOSS = -1
+"""Replay outcome: our ship was destroyed"""
+OUTCOME_UNKNOWN = 0
+"""Replay outcome: the match ended without a known winner, or both ships were destroyed"""
+OUTCOME_WIN = 1
+"""Replay outcome: the enemy ship was destroyed"""
+
+INDEX_SUFFIX = ".idx"
+"""The suffix of the tick offset index file written next to each replay file"""
+
+DEFAULT_READ_AHEAD_BYTES = 4 * 1024 * 1024
+"""How many bytes ahead of the current tick are requested from the OS when iterating a replay sequentially"""
+
+_CODEC = get_codec()
+_INDEX_MAGIC = b"RPLIDX01"
+_TICK_RECORD_PREFIX = b'{"eventType":"gameTick"'
+_TURN_NUMBER_PATTERN = re.compile(rb'"turnNumber":\s*(-?\d+)')
+
+
+class ReplayRecorder:
+    """Records one match into a replay file.
+
+    A replay file has one JSON object per line. The first line is the `startGame` record with the game config and our
+    ship id, followed by one `gameTick` record per tick holding the raw game state as received from the server and the
+    serialized command we sent. A completed match ends with an `endGame` record holding the outcome, see `OUTCOME_WIN`,
+    `OUTCOME_LOSS` and `OUTCOME_UNKNOWN`.
+
+    Attributes:
+        path (str): the path of the replay file
+        own_ship_id (str): the id of our ship in the match
+    """
+
+    def __init__(self, path: str, game_config: dict, own_ship_id: str):
+        self.path = path
+        self.own_ship_id = own_ship_id
+        self._file = open(path, "wb")
+        self._index_file = open(path + INDEX_SUFFIX, "wb")
+        self._index_file.write(_INDEX_MAGIC)
+        self._offset = 0
+        self._last_state: dict | None = None
+        self._write({"eventType": "startGame", "data": game_config, "shipId": own_ship_id})
+
+    def record_tick(self, raw_state: dict, command: dict | None):
+        """Record a tick of the match
+
+        Arguments:
+            raw_state (dict): the game state as received from the server
+            command (dict | None): the serialized command sent on the tick
+        """
+        self._last_state = raw_state
+        offset = self._offset
+        length = self._write({"eventType": "gameTick", "data": raw_state, "command": command})
+        self._index_file.write(array("q", [raw_state["turnNumber"], offset, length]).tobytes())
+        self._index_file.flush()
+
+    def close(self):
+        """Record the end of the match with the outcome seen on the last recorded tick and close the file"""
+        outcome = get_outcome(self._last_state, self.own_ship_id) if self._last_state is not None else OUTCOME_UNKNOWN
+        self._write({"eventType": "endGame", "outcome": outcome})
+        self._file.close()
+        self._index_file.close()
+
+    def _write(self, record: dict) -> int:
+        line = _CODEC.encode(record)
+        self._file.write(line + b"\n")
+        self._file.flush()
+        self._offset += len(line) + 1
+        return len(line)
+
+
+def create_replay_path(directory: str, bot_name: str) -> str:
+    """Get a unique path for a new replay file in the given directory, creating the directory if needed
+
+    Arguments:
+        directory (str): the directory to store the replay in
+        bot_name (str): the name of the bot, used as the file name prefix
+
+    Returns:
+        (str): the path of the replay file
+    """
+    os.makedirs(directory, exist_ok=True)
+    timestamp = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+    return os.path.join(directory, f"{bot_name}-{timestamp}-{os.getpid()}.jsonl")
+
+
+def get_outcome(raw_state: dict, own_ship_id: str) -> int:
+    """Get the outcome of a match from its last game state
+
+    Arguments:
+        raw_state (dict): the last game state of the match as received from the server
+        own_ship_id (str): the id of our ship
+
+    Returns:
+        (int): `OUTCOME_WIN` if only the enemy ship is known to be destroyed, `OUTCOME_LOSS` if only our ship is,
+        otherwise `OUTCOME_UNKNOWN`
+    """
+    own_destroyed = True
+    enemy_destroyed = False
+    for row in raw_state["gameMap"]:
+        for cell in row:
+            if cell["type"] != "ship":
+                continue
+            health = cell["data"]["health"]
+            destroyed = health is not None and health <= 0
+            if cell["data"]["id"] == own_ship_id:
+                own_destroyed = destroyed
+            else:
+                enemy_destroyed = destroyed
+    if own_destroyed == enemy_destroyed:
+        return OUTCOME_UNKNOWN
+    return OUTCOME_LOSS if own_destroyed else OUTCOME_WIN
+
+
+class ReplayReader:
+    """Random and sequential access to the ticks of a replay file without loading the whole file.
+
+    The replay is memory-mapped and located through the tick offset index written by `ReplayRecorder`. If the index is
+    missing or does not cover the whole file, the missing part is built by scanning the file on open and saved.
+
+    Attributes:
+        path (str): the path of the replay file
+        turn_numbers (array): the turn number of each tick, in file order
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+        self._view = memoryview(self._map) if self._map is not None else memoryview(b"")
+        self._index = self._load_index()
+        self.turn_numbers = self._index[0::3]
+        self._turn_positions = {turn_number: position for position, turn_number in enumerate(self.turn_numbers)}
+
+    def __len__(self) -> int:
+        return len(self.turn_numbers)
+
+    def __enter__(self) -> "ReplayReader":
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def close(self):
+        """Release the memory map and close the file"""
+        self._view.release()
+        if self._map is not None:
+            self._map.close()
+        self._file.close()
+
+    def read_raw_tick(self, position: int) -> dict:
+        """Decode a single tick record
+
+        Arguments:
+            position (int): the position of the tick in the replay, starting from 0
+
+        Returns:
+            (dict): the tick record, with the raw game state in `data` and the sent command in `command`
+        """
+        offset, length = self._index[position * 3 + 1], self._index[position * 3 + 2]
+        return _CODEC.decode(self._view[offset:offset + length])
+
+    def read_tick(self, position: int) -> GameState:
+        """Decode a single tick into a game state
+
+        Arguments:
+            position (int): the position of the tick in the replay, starting from 0
+
+        Returns:
+            (GameState): the game state of the tick
+        """
+        return deserialize_game_state(self.read_raw_tick(position)["data"])
+
+    def read_turn(self, turn_number: int) -> GameState:
+        """Decode the tick of the given turn into a game state
+
+        Arguments:
+            turn_number (int): the turn number of the tick
+
+        Returns:
+            (GameState): the game state of the tick
+        """
+        return self.read_tick(self._turn_positions[turn_number])
+
+    def iter_ticks(self, read_ahead_bytes: int = DEFAULT_READ_AHEAD_BYTES) -> Iterator[GameState]:
+        """Iterate over all ticks in order, asking the OS to page in the upcoming part of the file ahead of decoding
+
+        Arguments:
+            read_ahead_bytes (int): how many bytes after the current tick to request ahead of time
+
+        Returns:
+            (Iterator[GameState]): the game states of the ticks
+        """
+        can_advise = self._map is not None and hasattr(self._map, "madvise") and hasattr(mmap, "MADV_WILLNEED")
+        advised_until = 0
+        for position in range(len(self)):
+            offset = self._index[position * 3 + 1]
+            if can_advise and offset + self._index[position * 3 + 2] >= advised_until:
+                start = offset - offset % mmap.PAGESIZE
+                length = min(read_ahead_bytes, len(self._map) - start)
+                self._map.madvise(mmap.MADV_WILLNEED, start, length)
+                advised_until = start + length
+            yield self.read_tick(position)
+
+    def _load_index(self) -> array:
+        index = array("q")
+        index_path = self.path + INDEX_SUFFIX
+        if os.path.exists(index_path):
+            with open(index_path, "rb") as index_file:
+                data = index_file.read()
+            if data.startswith(_INDEX_MAGIC):
+                body = data[len(_INDEX_MAGIC):]
+                index.frombytes(body[:len(body) - len(body) % (3 * index.itemsize)])
+        # Drop entries that point past the end of the file, then scan whatever the index does not cover
+        size = len(self._view)
+        while index and index[-2] + index[-1] > size:
+            del index[-3:]
+        scan_start = index[-2] + index[-1] + 1 if index else 0
+        if scan_start < size:
+            indexed = len(index)
+            self._scan(scan_start, index)
+            if len(index) != indexed:
+                self._save_index(index_path, index)
+        return index
+
+    def _scan(self, offset: int, index: array):
+        size = len(self._view)
+        while offset < size:
+            end = self._map.find(b"\n", offset)
+            if end == -1:
+                end = size
+            if self._map[offset:offset + len(_TICK_RECORD_PREFIX)] == _TICK_RECORD_PREFIX:
+                turn_number = _TURN_NUMBER_PATTERN.search(self._map, offset, end)
+                if turn_number is not None:
+                    index.extend((int(turn_number.group(1)), offset, end - offset))
+            offset = end + 1
+
+    @staticmethod
+    def _save_index(index_path: str, index: array):
+        try:
+            with open(index_path, "wb") as index_file:
+                index_file.write(_INDEX_MAGIC + index.tobytes())
+        except OSError:
+            pass
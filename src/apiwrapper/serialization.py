@@ -1,5 +1,5 @@
 from apiwrapper.models import Cell, CellType, HitBoxData, ShipData, Coordinates, CompassDirection, ProjectileData, \
-    GameState, Command, MoveActionData, TurnActionData, ShootActionData, ActionType
+    GameState, GameStateDelta, Command, MoveActionData, TurnActionData, ShootActionData, ActionType
 
 _CELL_TYPE_MAPPING = {
     "empty": CellType.Empty,
@@ -10,6 +10,8 @@ _CELL_TYPE_MAPPING = {
     "projectile": CellType.Projectile
 }
 
+_ENTITY_CELL_TYPES = {"ship", "projectile"}
+
 _COMPASS_DESERIALIZATION_MAPPING = {
     "n": CompassDirection.North,
     "ne": CompassDirection.NorthEast,
@@ -76,8 +78,47 @@ def _deserialize_cell(cell: dict) -> Cell:
     return Cell(_CELL_TYPE_MAPPING[cell_type], _CELL_DESERIALIZATION_MAPPING[cell_type](cell["data"]))
 
 
-def deserialize_game_state(game_state: dict) -> GameState:
-    return GameState(game_state["turnNumber"], deserialize_map(game_state["gameMap"]))
+def deserialize_game_state(game_state: dict, previous: GameState | None = None) -> GameState:
+    map_matrix = game_state["gameMap"]
+    game_map = deserialize_map(map_matrix)
+    delta = None
+    if previous is not None and previous.raw_map is not None and len(previous.raw_map) == len(map_matrix):
+        delta = _compute_delta(previous, map_matrix, game_map)
+    return GameState(game_state["turnNumber"], game_map, map_matrix, delta)
+
+
+def _compute_delta(previous: GameState, map_matrix: list[list[dict]], game_map: list[list[Cell]]) -> GameStateDelta:
+    changed_cells = []
+    previous_entities = {}
+    current_entities = {}
+    for y, (row, previous_row) in enumerate(zip(map_matrix, previous.raw_map)):
+        # Whole rows are compared first, most rows do not change between ticks
+        if row == previous_row:
+            continue
+        for x, (cell, previous_cell) in enumerate(zip(row, previous_row)):
+            if cell == previous_cell:
+                continue
+            changed_cells.append(Coordinates(x, y))
+            if previous_cell["type"] in _ENTITY_CELL_TYPES:
+                previous_entities[previous_cell["data"]["id"]] = previous.game_map[y][x].data
+            if cell["type"] in _ENTITY_CELL_TYPES:
+                current_entities[cell["data"]["id"]] = game_map[y][x].data
+    moved = []
+    updated = []
+    for entity_id, entity in current_entities.items():
+        previous_entity = previous_entities.get(entity_id)
+        if previous_entity is None:
+            continue
+        if previous_entity.position != entity.position:
+            moved.append((previous_entity, entity))
+        elif previous_entity != entity:
+            updated.append((previous_entity, entity))
+    return GameStateDelta(changed_cells,
+                          [entity for entity_id, entity in current_entities.items()
+                           if entity_id not in previous_entities],
+                          [entity for entity_id, entity in previous_entities.items()
+                           if entity_id not in current_entities],
+                          moved, updated)
 
 
 def _serialize_move_action(action_data: MoveActionData) -> dict:
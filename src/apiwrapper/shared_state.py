@@ -0,0 +1,330 @@
+import struct
+import sys
+from collections.abc import Sequence
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from typing import cast
+
+from apiwrapper.models import Cell, CellType, CompassDirection, Coordinates, GameState, HitBoxData, ProjectileData, \
+    ShipData
+
+DEFAULT_SLOTS = 4
+"""How many ticks the ring holds before a slot is overwritten"""
+
+DEFAULT_SLOT_SIZE = 64 * 1024
+"""The size of one slot in bytes, enough for a 100x100 map with a few hundred entities"""
+
+_HEADER = struct.Struct("<QqIIII")
+# cell index, direction, health, heat, speed, mass, id index, position x, position y
+_ENTITY = struct.Struct("<IbhhbbHhh")
+_ID_LENGTH = struct.Struct("<H")
+
+_NONE_VALUE = -32768
+
+_CELL_TYPES = [CellType.Empty, CellType.OutOfVision, CellType.AudioSignature, CellType.HitBox, CellType.Ship,
+               CellType.Projectile]
+_CELL_TYPE_CODES = {cell_type: code for code, cell_type in enumerate(_CELL_TYPES)}
+_RAW_CELL_TYPE_CODES = {"empty": 0, "outOfVision": 1, "audioSignature": 2, "hitBox": 3, "ship": 4, "projectile": 5}
+_HIT_BOX_CODE = 3
+_SHIP_CODE = 4
+_PROJECTILE_CODE = 5
+_RAW_DIRECTION_VALUES = {"n": 0, "ne": 1, "e": 2, "se": 3, "s": 4, "sw": 5, "w": 6, "nw": 7}
+
+
+class SharedStateRing:
+    """A ring of tick slots in shared memory for handing game states to worker processes without pickling them.
+
+    The writer encodes each tick into the next slot as a compact typed buffer: one byte per cell for the cell type, a
+    fixed size record per hit box, ship and projectile cell, and a table of the entity ids. Only the slot index and the
+    turn number have to be sent to a worker, which reads the slot as a `SharedGameState` view. A slot is overwritten
+    after `slots` more ticks, which the view can detect with `is_stale`.
+
+    Attributes:
+        name (str): the name of the shared memory block, used to attach to the ring from another process
+        slots (int): the number of slots in the ring
+        slot_size (int): the size of one slot in bytes
+    """
+
+    def __init__(self, slots: int = DEFAULT_SLOTS, slot_size: int = DEFAULT_SLOT_SIZE, name: str | None = None):
+        if slots < 1 or slot_size <= _HEADER.size:
+            raise ValueError(f"Invalid ring size: {slots} slots of {slot_size} bytes")
+        self.slots = slots
+        self.slot_size = slot_size
+        self._owner = name is None
+        size = slots * slot_size if self._owner else 0
+        # An attaching process must not register the block with its resource tracker, which would unlink the block
+        # from under the owner when the attaching process exits
+        if sys.version_info >= (3, 13):
+            self._memory = SharedMemory(name, create=self._owner, size=size, track=self._owner)
+        else:
+            self._memory = SharedMemory(name, create=self._owner, size=size)
+            if not self._owner:
+                resource_tracker.unregister(self._memory._name, "shared_memory")
+        self.name = self._memory.name
+        self._buffer = self._memory.buf
+        self._next_slot = 0
+
+    @classmethod
+    def attach(cls, name: str, slots: int = DEFAULT_SLOTS, slot_size: int = DEFAULT_SLOT_SIZE) -> "SharedStateRing":
+        """Attach to a ring created by another process
+
+        Arguments:
+            name (str): the name of the ring, see `name`
+            slots (int): the number of slots of the ring
+            slot_size (int): the size of one slot of the ring in bytes
+
+        Returns:
+            (SharedStateRing): the ring
+        """
+        return cls(slots, slot_size, name)
+
+    def __enter__(self) -> "SharedStateRing":
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def write(self, game_state: GameState) -> int:
+        """Write a game state into the next slot of the ring
+
+        Arguments:
+            game_state (GameState): the state to write, encoded from the raw map when the state has one
+
+        Returns:
+            (int): the index of the slot the state was written to
+        """
+        if game_state.raw_map is not None:
+            types, entities, ids = _encode_raw_map(game_state.raw_map)
+            height, width = len(game_state.raw_map), len(game_state.raw_map[0]) if game_state.raw_map else 0
+        else:
+            types, entities, ids = _encode_game_map(game_state.game_map)
+            height, width = len(game_state.game_map), len(game_state.game_map[0]) if game_state.game_map else 0
+        id_bytes = b"".join(_ID_LENGTH.pack(len(encoded)) + encoded
+                            for encoded in (entity_id.encode() for entity_id in ids))
+        size = _HEADER.size + len(types) + len(entities) * _ENTITY.size + len(id_bytes)
+        if size > self.slot_size:
+            raise ValueError(f"Game state of {size} bytes does not fit into a slot of {self.slot_size} bytes")
+        slot = self._next_slot
+        self._next_slot = (slot + 1) % self.slots
+        offset = slot * self.slot_size
+        # The sequence number is odd while the slot is being written, so readers can tell a torn slot from a whole one
+        sequence = _HEADER.unpack_from(self._buffer, offset)[0] + 1
+        _HEADER.pack_into(self._buffer, offset, sequence, game_state.turn_number, height, width, len(entities),
+                          len(id_bytes))
+        position = offset + _HEADER.size
+        self._buffer[position:position + len(types)] = types
+        position += len(types)
+        for entity in entities:
+            _ENTITY.pack_into(self._buffer, position, *entity)
+            position += _ENTITY.size
+        self._buffer[position:position + len(id_bytes)] = id_bytes
+        struct.pack_into("<Q", self._buffer, offset, sequence + 1)
+        return slot
+
+    def read(self, slot: int, turn_number: int) -> "SharedGameState":
+        """Get a read-only view of a game state in the ring
+
+        Arguments:
+            slot (int): the index of the slot, as returned by `write`
+            turn_number (int): the turn number of the state, to check that the slot has not been overwritten
+
+        Returns:
+            (SharedGameState): the view of the state
+
+        Raises:
+            ValueError: if the slot does not hold the turn, or it was overwritten while it was being read
+        """
+        if not 0 <= slot < self.slots:
+            raise ValueError(f"Slot {slot} is not in the ring of {self.slots} slots")
+        offset = slot * self.slot_size
+        sequence, slot_turn_number = _HEADER.unpack_from(self._buffer, offset)[:2]
+        if sequence % 2 == 1 or slot_turn_number != turn_number:
+            raise ValueError(f"Slot {slot} does not hold turn {turn_number}, it was overwritten")
+        return SharedGameState(self._buffer, offset)
+
+    def close(self):
+        """Detach from the ring, and free the shared memory if this process created it. Views of the ring have to be
+        released or garbage collected first."""
+        self._buffer = None
+        self._memory.close()
+        if self._owner:
+            self._memory.unlink()
+
+
+class _RowView(Sequence):
+
+    def __init__(self, game_state: "SharedGameState", y: int):
+        self._game_state = game_state
+        self._y = y
+
+    def __len__(self) -> int:
+        return self._game_state.width
+
+    def __getitem__(self, x):
+        if isinstance(x, slice):
+            return [self[index] for index in range(*x.indices(len(self)))]
+        if x < 0:
+            x += len(self)
+        if not 0 <= x < len(self):
+            raise IndexError(f"Cell {x} is not in the row of {len(self)} cells")
+        return self._game_state.get_cell(x, self._y)
+
+
+class _MapView(Sequence):
+
+    def __init__(self, game_state: "SharedGameState"):
+        self._rows = [_RowView(game_state, y) for y in range(game_state.height)]
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __getitem__(self, y):
+        return self._rows[y]
+
+
+class SharedGameState(GameState):
+    """A read-only view of a game state in a `SharedStateRing`, usable wherever a `GameState` is. The cell types are
+    read from the shared buffer without copying, and `Cell` objects are created on access. The entity and id tables
+    are copied when the view is created, which raises `ValueError` if the slot is written to meanwhile.
+
+    Attributes:
+        height (int): the height of the map
+        width (int): the width of the map
+    """
+
+    def __init__(self, buffer: memoryview, offset: int):
+        sequence, turn_number, height, width, entity_count, id_bytes_length = _HEADER.unpack_from(buffer, offset)
+        self.height = height
+        self.width = width
+        self._buffer = buffer
+        self._offset = offset
+        self._sequence = sequence
+        types_offset = offset + _HEADER.size
+        self._types = buffer[types_offset:types_offset + height * width].toreadonly()
+        entities_offset = types_offset + height * width
+        ids_offset = entities_offset + entity_count * _ENTITY.size
+        try:
+            self._entities = {entity[0]: entity for entity in _ENTITY.iter_unpack(buffer[entities_offset:ids_offset])}
+            self._ids = _decode_ids(buffer[ids_offset:ids_offset + id_bytes_length])
+        except (struct.error, UnicodeDecodeError) as error:
+            # A header torn by a concurrent write can point past the slot or into the middle of an id
+            self._types.release()
+            raise ValueError(f"Slot at offset {offset} was overwritten while it was being read") from error
+        if sequence % 2 == 1 or self.is_stale():
+            self._types.release()
+            raise ValueError(f"Slot at offset {offset} was overwritten while it was being read")
+        super().__init__(turn_number, cast(list[list[Cell]], _MapView(self)))
+
+    def get_cell(self, x: int, y: int) -> Cell:
+        """Get a cell of the map
+
+        Arguments:
+            x (int): the x coordinate of the cell
+            y (int): the y coordinate of the cell
+
+        Returns:
+            (Cell): a new cell object with the data of the cell
+        """
+        index = y * self.width + x
+        code = self._types[index]
+        if code < _HIT_BOX_CODE:
+            return Cell(_CELL_TYPES[code], {})
+        _, direction, health, heat, speed, mass, id_index, position_x, position_y = self._entities[index]
+        if code == _HIT_BOX_CODE:
+            return Cell(CellType.HitBox, HitBoxData(self._ids[id_index]))
+        position = Coordinates(position_x, position_y)
+        if code == _SHIP_CODE:
+            return Cell(CellType.Ship, ShipData(self._ids[id_index], position, CompassDirection(direction),
+                                                health if health != _NONE_VALUE else None,
+                                                heat if heat != _NONE_VALUE else None))
+        return Cell(CellType.Projectile, ProjectileData(self._ids[id_index], position, CompassDirection(direction),
+                                                        speed, mass))
+
+    def get_cell_type(self, x: int, y: int) -> CellType:
+        """Get the type of a cell without creating a cell object
+
+        Arguments:
+            x (int): the x coordinate of the cell
+            y (int): the y coordinate of the cell
+
+        Returns:
+            (CellType): the type of the cell
+        """
+        return _CELL_TYPES[self._types[y * self.width + x]]
+
+    def release(self):
+        """Release the shared buffer, after which the view can no longer be read"""
+        self._types.release()
+
+    def is_stale(self) -> bool:
+        """Check whether the slot of the view has been written to since the view was created
+
+        Returns:
+            (bool): `True` if the view no longer shows the state it was created for, otherwise `False`
+        """
+        return _HEADER.unpack_from(self._buffer, self._offset)[0] != self._sequence
+
+
+def _encode_raw_map(map_matrix: list[list[dict]]) -> tuple[bytes, list[tuple], list[str]]:
+    types = bytearray()
+    entities = []
+    ids: dict[str, int] = {}
+    index = 0
+    for row in map_matrix:
+        for cell in row:
+            code = _RAW_CELL_TYPE_CODES[cell["type"]]
+            types.append(code)
+            if code == _HIT_BOX_CODE:
+                entity_id = cell["data"]["entityId"]
+                entities.append((index, -1, 0, 0, 0, 0, ids.setdefault(entity_id, len(ids)), 0, 0))
+            elif code >= _SHIP_CODE:
+                data = cell["data"]
+                entity_id = ids.setdefault(data["id"], len(ids))
+                position = data["position"]
+                direction = _RAW_DIRECTION_VALUES[data["direction"]]
+                if code == _SHIP_CODE:
+                    health = data["health"] if data["health"] is not None else _NONE_VALUE
+                    heat = data["heat"] if data["heat"] is not None else _NONE_VALUE
+                    entities.append((index, direction, health, heat, 0, 0, entity_id, position["x"], position["y"]))
+                else:
+                    entities.append((index, direction, 0, 0, data["speed"], data["mass"], entity_id, position["x"],
+                                     position["y"]))
+            index += 1
+    return bytes(types), entities, list(ids)
+
+
+def _encode_game_map(game_map: list[list[Cell]]) -> tuple[bytes, list[tuple], list[str]]:
+    types = bytearray()
+    entities = []
+    ids: dict[str, int] = {}
+    index = 0
+    for row in game_map:
+        for cell in row:
+            code = _CELL_TYPE_CODES[cell.cell_type]
+            types.append(code)
+            if code == _HIT_BOX_CODE:
+                entity_id = cast(HitBoxData, cell.data).entity_id
+                entities.append((index, -1, 0, 0, 0, 0, ids.setdefault(entity_id, len(ids)), 0, 0))
+            elif code == _SHIP_CODE:
+                ship = cast(ShipData, cell.data)
+                entities.append((index, ship.direction.value, ship.health if ship.health is not None else _NONE_VALUE,
+                                 ship.heat if ship.heat is not None else _NONE_VALUE, 0, 0,
+                                 ids.setdefault(ship.id, len(ids)), ship.position.x, ship.position.y))
+            elif code == _PROJECTILE_CODE:
+                projectile = cast(ProjectileData, cell.data)
+                entities.append((index, projectile.direction.value, 0, 0, projectile.speed, projectile.mass,
+                                 ids.setdefault(projectile.id, len(ids)), projectile.position.x,
+                                 projectile.position.y))
+            index += 1
+    return bytes(types), entities, list(ids)
+
+
+def _decode_ids(buffer: memoryview) -> list[str]:
+    ids = []
+    position = 0
+    while position < len(buffer):
+        length = _ID_LENGTH.unpack_from(buffer, position)[0]
+        position += _ID_LENGTH.size
+        ids.append(bytes(buffer[position:position + length]).decode())
+        position += length
+    return ids
@@ -0,0 +1,55 @@
+import importlib
+from logging import getLogger
+from time import perf_counter
+from types import ModuleType
+
+_logger = getLogger("wrapper.startup")
+
+
+class StartupTimer:
+    """Measures the startup of a bot: how long the imports take, and how long it takes to get authorized and to send the
+    first command
+
+    Attributes:
+        started_at (float): the `time.perf_counter` timestamp the measuring started at
+        imports_ms (dict[str, float]): the time each timed import took in milliseconds, in import order. Modules that
+            were already imported by an earlier timed import are not counted again.
+        milestones_ms (dict[str, float]): the time from the start to each milestone in milliseconds, in order
+    """
+
+    def __init__(self, started_at: float | None = None):
+        self.started_at = perf_counter() if started_at is None else started_at
+        self.imports_ms: dict[str, float] = {}
+        self.milestones_ms: dict[str, float] = {}
+
+    def import_module(self, name: str) -> ModuleType:
+        """Import a module, recording how long the import took
+
+        Arguments:
+            name (str): the absolute name of the module
+
+        Returns:
+            (ModuleType): the module
+        """
+        start_time = perf_counter()
+        module = importlib.import_module(name)
+        self.imports_ms[name] = (perf_counter() - start_time) * 1000
+        return module
+
+    def mark(self, milestone: str):
+        """Record reaching a milestone now. Only the first time a milestone is reached is recorded.
+
+        Arguments:
+            milestone (str): the name of the milestone
+        """
+        if milestone not in self.milestones_ms:
+            self.milestones_ms[milestone] = (perf_counter() - self.started_at) * 1000
+
+    def log_report(self):
+        """Log the import times and the milestones"""
+        imports = ", ".join(f"{name} {import_ms:.1f} ms" for name, import_ms in self.imports_ms.items())
+        _logger.info(f"Startup imports: {imports or 'none timed'}")
+        previous_ms = 0.0
+        for milestone, milestone_ms in self.milestones_ms.items():
+            _logger.info(f"Startup: {milestone} at {milestone_ms:.1f} ms (+{milestone_ms - previous_ms:.1f} ms)")
+            previous_ms = milestone_ms
@@ -1,20 +1,45 @@
-import json
-import multiprocessing
+import random
+from concurrent.futures import Executor, Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from dataclasses import dataclass
 from enum import Enum
-from logging import getLogger
-from multiprocessing.pool import ThreadPool
+from logging import DEBUG, getLogger
+from threading import Thread
+from typing import TYPE_CHECKING
 
-from time import time
+from time import time, perf_counter, sleep
 
+from websockets.exceptions import ConnectionClosed, InvalidHandshake
 from websockets.sync.client import connect
 
-from helpers import get_config
-from apiwrapper.models import Command, MoveActionData, GameState, ClientContext, ActionType
+from helpers import get_config, get_optional_config, get_own_ship_id
+from apiwrapper.compression import CompressionStats, get_connect_options, log_compression_stats
+from apiwrapper.idle_precompute import IdlePrecompute
+from apiwrapper.latency import LatencyTracker, start_ping_monitor
+from apiwrapper.models import Command, MoveActionData, GameState, ClientContext, ActionType, TickDeadline
 from apiwrapper.serialization import deserialize_game_state, serialize_command
+from apiwrapper.startup import StartupTimer
+import team_ai
 from team_ai import process_tick
 
+# The optional subsystems are imported when their config is set, so that starting a bot does not import them
+if TYPE_CHECKING:
+    from apiwrapper.json_codec import JsonCodec
+    from apiwrapper.portfolio import Portfolio
+    from apiwrapper.replay import ReplayRecorder
 
-_TICK_FAILSAFE_TIME_MS = 50
+
+_codec: "JsonCodec | None" = None
+# Binary frames skip the UTF-8 round trip of text frames, but the server has to accept JSON in binary frames
+_BINARY_FRAMES = (get_optional_config("websocket_binary_frames") or "false").lower() == "true"
+
+_RECONNECT_BACKOFF_S = 0.1
+_MAX_RECONNECT_BACKOFF_S = 10.0
+
+# The precompute hook is optional, team ai modules without it run nothing between ticks
+_team_ai_precompute = getattr(team_ai, "precompute", None)
+# So is the warm up hook. It is run once per process, as the tables and caches it builds are shared by all bots.
+_team_ai_warm_up = getattr(team_ai, "warm_up", None)
+_warmed_up = False
 
 
 _logger = getLogger("wrapper.websockets")
@@ -28,61 +53,313 @@ class ClientState(Enum):
     InGame = 3
 
 
+@dataclass
+class ReconnectStats:
+    """Statistics of the reconnects of a client
+
+    Attributes:
+        reconnects (int): how many times the client reconnected after losing the connection
+        total_latency_ms (float): the summed time from losing the connection to being authorized again in milliseconds
+        max_latency_ms (float): the longest time from losing the connection to being authorized again in milliseconds
+        missed_ticks (int): how many ticks of resumed matches were missed while reconnecting
+    """
+    reconnects: int = 0
+    total_latency_ms: float = 0.0
+    max_latency_ms: float = 0.0
+    missed_ticks: int = 0
+
+
 class Client:
-    def __init__(self, state: ClientState = ClientState.Unconnected, context: ClientContext | None = None):
+    def __init__(self, state: ClientState = ClientState.Unconnected, context: ClientContext | None = None,
+                 executor: Executor | None = None):
         self.state: ClientState = state
         self.context: ClientContext | None = context
+        self.replay: "ReplayRecorder | None" = None
+        self.previous_state: GameState | None = None
+        # Set when one process runs several bots, the strategies and precomputing of all bots then share its workers
+        self.executor = executor
+        self.precompute: IdlePrecompute | None = \
+            IdlePrecompute(_team_ai_precompute, executor) if _team_ai_precompute is not None else None
+        self.portfolio: "Portfolio | None" = None
+        # Runs the team ai of each tick so it can time out. Created on warm up, kept over reconnects and shut down when
+        # the bot exits
+        self.tick_executor: ThreadPoolExecutor | None = None
+        self.tick_future: Future | None = None
+        # Set when one process runs several bots, otherwise the bot name and ship id come from the config
+        self.bot_name: str | None = None
+        self.ship_id: str | None = None
+        self.reconnect_stats = ReconnectStats()
+        # Kept over matches and reconnects, so the tick budget does not start over from the default
+        self.latency = LatencyTracker()
+        self.tick_received_at = 0.0
+        # Recorded by the compression extension of the connection, logged and reset at the end of each match
+        self.compression = CompressionStats()
+        # Set by the entry point to measure the startup, cleared once the first command has been sent
+        self.startup: StartupTimer | None = None
+        # The opponent store of the previous match is written in the background while waiting for the next match
+        self.opponent_store_flush: Thread | None = None
+        # Set while the connection is down, and until the first tick after reconnecting to a match in progress
+        self.disconnected_at: float | None = None
+        self.resuming_match = False
+        # Connections lost since the last authorization. A server that accepts the connection and then drops it
+        # does not reset the backoff, only being authorized again does.
+        self.failed_connects = 0
+
+
+def _get_codec() -> "JsonCodec":
+    # Created with the first message, as the fastest backend is a third party module that takes a while to import
+    global _codec
+    if _codec is None:
+        from apiwrapper.json_codec import get_codec
+        _codec = get_codec()
+    return _codec
 
 
 def _send_websocket_message(websocket, raw_message: dict):
-    message = json.dumps(raw_message)
+    codec = _get_codec()
+    message = codec.encode(raw_message) if _BINARY_FRAMES else codec.encode_text(raw_message)
     websocket.send(message)
-    _logger.debug(f"Sent: {message}")
+    # Formatting whole game messages is not free, so it is skipped when it would not be logged
+    if _logger.isEnabledFor(DEBUG):
+        _logger.debug(f"Sent: {message}")
 
 
 def handle_auth_ack(client, *_):
     if client.state == ClientState.Unauthorized:
-        client.state = ClientState.Idle
+        if client.disconnected_at is not None:
+            _record_reconnect(client)
+        # The context is kept over a reconnect in the middle of a match, so the match can continue where it left off
+        client.state = ClientState.InGame if client.resuming_match else ClientState.Idle
+        client.failed_connects = 0
         _logger.info("Authorization successful")
+        _mark_startup(client, "authAck")
+        if not client.resuming_match:
+            _warm_up(client)
+            _mark_startup(client, "warm up")
+
+
+def _warm_up(client: Client):
+    # Builds what the first tick would otherwise build while waiting for the match to start
+    global _warmed_up
+    strategies = get_optional_config("strategies")
+    if strategies is not None and client.portfolio is None:
+        from apiwrapper.portfolio import Portfolio, load_strategies
+        client.portfolio = Portfolio(load_strategies(strategies), client.executor)
+    if client.portfolio is None:
+        _get_tick_executor(client)
+    if _team_ai_warm_up is None or _warmed_up:
+        return
+    _warmed_up = True
+    try:
+        start_time = perf_counter()
+        _team_ai_warm_up()
+        _logger.debug(f"Team ai warmed up in {(perf_counter() - start_time) * 1000:.2f} milliseconds")
+    except Exception as exception:
+        if get_config("wrapper_verbose_exceptions") and get_config("wrapper_verbose_exceptions") != "false":
+            _logger.exception(f"Exception raised in team ai warm up code: {exception}")
+        else:
+            _logger.error(f"Exception raised in team ai warm up code: {exception}")
+
+
+def _mark_startup(client: Client, milestone: str):
+    if client.startup is not None:
+        client.startup.mark(milestone)
+
+
+def _record_reconnect(client: Client):
+    latency_ms = (perf_counter() - client.disconnected_at) * 1000
+    stats = client.reconnect_stats
+    stats.reconnects += 1
+    stats.total_latency_ms += latency_ms
+    stats.max_latency_ms = max(stats.max_latency_ms, latency_ms)
+    client.disconnected_at = None
+    _logger.info(f"Reconnected after {latency_ms:.2f} milliseconds")
+
+
+def handle_disconnect(client: Client) -> float:
+    """Reset the client after the connection was lost, keeping the context and caches of a match in progress so the
+    match can continue after reconnecting
+
+    Arguments:
+        client (Client): the client whose connection was lost
+
+    Returns:
+        (float): how long to wait before reconnecting in seconds, growing with each connection lost before the client
+        is authorized again
+    """
+    if client.precompute is not None:
+        client.precompute.cancel()
+    if client.disconnected_at is None:
+        client.disconnected_at = perf_counter()
+    if client.state == ClientState.InGame:
+        client.resuming_match = True
+    client.state = ClientState.Unauthorized
+    delay = get_reconnect_delay(client.failed_connects)
+    client.failed_connects += 1
+    return delay
+
+
+def shutdown_client(client: Client):
+    """Stop the background work of a client when the bot exits. Reconnecting keeps it, see `handle_disconnect`.
+
+    Arguments:
+        client (Client): the client of the bot
+    """
+    if client.precompute is not None:
+        client.precompute.cancel()
+    if client.tick_executor is not None:
+        # A timed out team ai function cannot be stopped, so it is left to finish without waiting for it
+        client.tick_executor.shutdown(wait=False)
+        client.tick_executor = None
+        client.tick_future = None
+
+
+def get_reconnect_delay(attempt: int) -> float:
+    """Get how long to wait before a reconnect attempt. The delay doubles with each failed attempt, and is jittered so
+    that many bots losing their connections at once do not reconnect at once.
+
+    Arguments:
+        attempt (int): how many attempts have failed in a row, 0 for the first attempt
+
+    Returns:
+        (float): the delay in seconds
+    """
+    backoff = min(_RECONNECT_BACKOFF_S * 2 ** attempt, _MAX_RECONNECT_BACKOFF_S)
+    return random.uniform(backoff / 2, backoff)
 
 
 def handle_game_start(client, game_config, websocket):
+    # A match that was in progress when the connection was lost may have ended while reconnecting
+    if client.resuming_match:
+        _end_resumed_match(client)
     assert client.state == ClientState.Idle, (f"Game can only be started in idle state! State right now is: "
                                               f"{client.state}")
     client.context = ClientContext(game_config["tickLength"], game_config["turnRate"])
+    client.previous_state = None
+    client.latency.reset_ticks()
+    if client.ship_id is not None:
+        client.context.own_ship_id = client.ship_id
     client.state = ClientState.InGame
     _send_websocket_message(websocket, {"eventType": "startAck", "data": {}})
+    _mark_startup(client, "startGame")
+    opponent_store = get_optional_config("opponent_store")
+    if opponent_store is not None:
+        from apiwrapper.opponent_store import OpponentStore
+        if client.opponent_store_flush is not None:
+            client.opponent_store_flush.join()
+            client.opponent_store_flush = None
+        # Opened before the strategies copy the context, so that their copies share the store
+        client.context.opponent_store = OpponentStore(opponent_store)
+    strategies = get_optional_config("strategies")
+    if strategies is not None:
+        if client.portfolio is None:
+            from apiwrapper.portfolio import Portfolio, load_strategies
+            client.portfolio = Portfolio(load_strategies(strategies), client.executor)
+        client.portfolio.start_match(client.context)
+    replay_directory = get_optional_config("replay_directory")
+    if replay_directory is not None:
+        from apiwrapper.replay import ReplayRecorder, create_replay_path
+        bot_name = client.bot_name if client.bot_name is not None else get_config("bot_name")
+        ship_id = client.ship_id if client.ship_id is not None else get_own_ship_id()
+        client.replay = ReplayRecorder(create_replay_path(replay_directory, bot_name), game_config, ship_id)
 
 
 def handle_game_tick(client, raw_state, websocket):
+    state = prepare_game_tick(client, raw_state)
+    action = _handle_tick_processing_timeout(client, state)
+    complete_game_tick(client, raw_state, state, action, websocket)
+
+
+def prepare_game_tick(client: Client, raw_state: dict, received_at: float | None = None) -> GameState:
+    client.tick_received_at = received_at if received_at is not None else perf_counter()
     assert client.state == ClientState.InGame, (f"Game ticks can only be handled while in in-game state! State right "
                                                 f"now is: {client.state}")
-    state = deserialize_game_state(raw_state)
-    action = _handle_tick_processing_timeout(client, state)
-    # None is returned on timeout, should be converted to empty action -> move 0 steps
+    if client.context is None:
+        raise ValueError("Context is None, but state is in game!")
+    if client.resuming_match:
+        client.resuming_match = False
+        if client.previous_state is not None:
+            missed_ticks = max(raw_state["turnNumber"] - client.previous_state.turn_number - 1, 0)
+            client.reconnect_stats.missed_ticks += missed_ticks
+            _logger.info(f"Resumed match, missed {missed_ticks} ticks")
+    state = deserialize_game_state(raw_state, client.previous_state)
+    client.latency.record_tick_arrival(state.turn_number, client.context.tick_length_ms, client.tick_received_at)
+    client.compression.ticks += 1
+    client.previous_state = state
+    return state
+
+
+def complete_game_tick(client: Client, raw_state: dict, state: GameState, action: Command | None, websocket):
+    start_time = perf_counter()
+    # None is returned on timeout if nothing was published, should be converted to empty action -> move 0 steps
     if action is None:
         action = Command(ActionType.Move, MoveActionData(0))
     serialized_action = serialize_command(action)
     _send_websocket_message(websocket, {"eventType": "gameAction", "data": serialized_action})
+    client.latency.record_send_overhead((perf_counter() - start_time) * 1000)
+    if client.startup is not None:
+        client.startup.mark("first gameAction")
+        client.startup.log_report()
+        client.startup = None
+    if client.replay is not None:
+        client.replay.record_tick(raw_state, serialized_action)
+    if client.precompute is not None:
+        client.precompute.start(client.context, state, action)
+
+
+def begin_tick_deadline(client: Client) -> TickDeadline:
+    context = client.context
+    context.tick_budget_ms = client.latency.get_budget_ms(context.tick_length_ms)
+    if context.tick_length_ms == 0:
+        deadline = TickDeadline()
+    else:
+        # The budget is counted from receiving the tick, as the time spent deserializing it is spent from the tick too
+        deadline = TickDeadline(client.tick_received_at + context.tick_budget_ms / 1000)
+    context.begin_tick(deadline)
+    return deadline
+
+
+def get_timeout_command(context: ClientContext) -> Command | None:
+    # We log instead of raising so the wrapper layer still knows to send the best command published so far, or an
+    # empty event if nothing was published
+    timeout_ms = round(context.tick_budget_ms)
+    provisional_command = context.provisional_command
+    if provisional_command is None:
+        _logger.error(f"Team ai function timed out after {timeout_ms} milliseconds.")
+    else:
+        _logger.warning(f"Team ai function timed out after {timeout_ms} milliseconds, sending provisional "
+                        f"command {provisional_command}.")
+    return provisional_command
 
 
 def _handle_tick_processing_timeout(client: Client, state: GameState) -> Command | None:
-    if client.context is None:
-        raise ValueError("Context is None, but state is in game!")
-    timeout_ms = client.context.tick_length_ms - _TICK_FAILSAFE_TIME_MS
+    deadline = begin_tick_deadline(client)
+    if client.portfolio is not None:
+        return client.portfolio.run(client.context, state, deadline)
     if client.context.tick_length_ms == 0:
-        return _process_tick_wrapper(client.context, state)
-    try:
-        with ThreadPool() as pool:
-            return pool.apply_async(_process_tick_wrapper, (client.context, state)).get(
-                timeout=(timeout_ms / 1000))
-    except multiprocessing.TimeoutError:
-        # We catch and log instead of propagating so the wrapper layer still knows to send an empty event
-        _logger.error(f"Team ai function timed out after {timeout_ms} milliseconds.")
+        return process_tick_safely(client.context, state)
+    # A timed out team ai function cannot be stopped, and it keeps the only worker busy until it returns
+    running = client.tick_future
+    if running is not None and not running.done():
+        _logger.warning("Skipped a tick, the previous tick is still being processed.")
         return None
+    future = _get_tick_executor(client).submit(process_tick_safely, client.context, state, client.context.tick)
+    client.tick_future = future
+    try:
+        return future.result(timeout=(max(deadline.remaining_ms(), 0) / 1000))
+    except FutureTimeoutError:
+        return get_timeout_command(client.context)
+
 
+def _get_tick_executor(client: Client) -> ThreadPoolExecutor:
+    if client.tick_executor is None:
+        client.tick_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="team-ai")
+    return client.tick_executor
 
-def _process_tick_wrapper(context: ClientContext, state: GameState) -> Command | None:
+
+def process_tick_safely(context: ClientContext, state: GameState, tick: int | None = None) -> Command | None:
+    if tick is not None:
+        context.bind_tick(tick)
     try:
         start_time = time()
         result = process_tick(context, state)
@@ -99,9 +376,31 @@ def _process_tick_wrapper(context: ClientContext, state: GameState) -> Command |
 def handle_game_end(client, _, websocket):
     assert client.state == ClientState.InGame, (f"Game can only be ended in in game state! State right now is: "
                                                 f"{client.state}")
+    _close_match(client)
+    _send_websocket_message(websocket, {"eventType": "endAck", "data": {}})
+
+
+def _end_resumed_match(client: Client):
+    _logger.warning("The match in progress ended while reconnecting")
+    _close_match(client)
+
+
+def _close_match(client: Client):
+    if client.context is not None and client.context.opponent_store is not None:
+        from apiwrapper.opponent_store import flush_in_background
+        client.opponent_store_flush = flush_in_background(client.context.opponent_store)
     client.context = None
+    client.previous_state = None
+    client.resuming_match = False
     client.state = ClientState.Idle
-    _send_websocket_message(websocket, {"eventType": "endAck", "data": {}})
+    if client.replay is not None:
+        client.replay.close()
+        client.replay = None
+    if client.portfolio is not None:
+        from apiwrapper.portfolio import log_stats
+        log_stats(client.portfolio)
+    log_compression_stats(client.compression)
+    client.compression.reset()
 
 
 _EVENT_HANDLERS = {
@@ -112,14 +411,40 @@ _EVENT_HANDLERS = {
 }
 
 
-def connect_websocket(url: str, token: str, bot_name: str):  # pragma: no cover -- main loop - runs forever
+def handle_event(client: Client, message: dict, websocket):
+    """Run the handler of a received message, messages of unknown event types are ignored
+
+    Arguments:
+        client (Client): the client that received the message
+        message (dict): the parsed message
+        websocket: the connection to send the replies on
+    """
+    handler = _EVENT_HANDLERS.get(message["eventType"], None)
+    if handler is not None:
+        try_run_handler(client, message, websocket, handler)
+
+
+def connect_websocket(url: str, token: str, bot_name: str,
+                      startup: StartupTimer | None = None):  # pragma: no cover -- main loop - runs forever
     client = Client(ClientState.Unauthorized)
+    client.startup = startup
     full_token = f"{url}?token={token}&botName={bot_name}"
-    _logger.debug(f"Connecting to web socket at {full_token}")
-    with connect(full_token) as websocket:
-        authorize_client(websocket, token, bot_name)
+    try:
         while True:
-            handle_loop(client, websocket)
+            _logger.debug(f"Connecting to web socket at {full_token}")
+            try:
+                with connect(full_token, **get_connect_options(client.compression)) as websocket:
+                    _mark_startup(client, "connected")
+                    start_ping_monitor(websocket, client.latency)
+                    authorize_client(websocket, token, bot_name)
+                    while True:
+                        handle_loop(client, websocket)
+            except (ConnectionClosed, InvalidHandshake, OSError) as exception:
+                delay = handle_disconnect(client)
+                _logger.warning(f"Lost connection to the server ({exception}), reconnecting in {delay:.2f} seconds")
+                sleep(delay)
+    finally:
+        shutdown_client(client)
 
 
 def authorize_client(websocket, token: str, bot_name: str):
@@ -129,17 +454,21 @@ def authorize_client(websocket, token: str, bot_name: str):
 
 def handle_loop(client: Client, websocket):
     message = receive_message(websocket)
-    handler = _EVENT_HANDLERS.get(message["eventType"], None)
-    if handler is not None:
-        try_run_handler(client, message, websocket, handler)
+    if client.precompute is not None:
+        client.precompute.cancel()
+    handle_event(client, message, websocket)
 
 
 def receive_message(websocket) -> dict:
     _logger.debug("Waiting for message...")
     raw_message = websocket.recv()
-    _logger.debug(f"Received: {raw_message}")
-    message = json.loads(raw_message)
-    return message
+    return parse_message(raw_message)
+
+
+def parse_message(raw_message: str | bytes) -> dict:
+    if _logger.isEnabledFor(DEBUG):
+        _logger.debug(f"Received: {raw_message}")
+    return _get_codec().decode(raw_message)
 
 
 def try_run_handler(client: Client, message: dict, websocket, handler):
@@ -0,0 +1,184 @@
+import math
+from functools import lru_cache
+from typing import TYPE_CHECKING
+
+from apiwrapper.models import Coordinates
+from bitboard import get_board_geometry, to_coordinates
+from world_model import WorldModel
+
+if TYPE_CHECKING:
+    from apiwrapper.models import ClientContext
+
+BEARING_HALF_WIDTH = 0.75
+"""How far from the bearing line (in cells) the enemy can be at the audio signature cell"""
+
+MAX_MOVE_DISTANCE = 3
+"""How many cells a ship can move per tick"""
+
+
+@lru_cache(maxsize=None)
+def _get_bearing_rows(dx: int, dy: int, extent: int) -> tuple[tuple[int, int, int], ...]:
+    # The bearing cone is convex, so each row of it is one interval of x offsets. Solving the interval per row keeps
+    # both building the table and turning it into a mask linear in the map height.
+    length = math.hypot(dx, dy)
+    ux, uy = dx / length, dy / length
+    # The audio cell is rounded to the grid, so the cone widens with distance by half a cell per audio distance
+    spread = 0.5 / length
+    start = length - 1
+    rows = []
+    for ry in range(-extent, extent + 1):
+        low, high = -math.inf, math.inf
+        # Each constraint is of the form k * rx <= m
+        for k, m in ((-ux, ry * uy - start),
+                     (uy - spread * ux, BEARING_HALF_WIDTH + spread * ry * uy + ry * ux),
+                     (-uy - spread * ux, BEARING_HALF_WIDTH + spread * ry * uy - ry * ux)):
+            if k > 1e-9:
+                high = min(high, m / k)
+            elif k < -1e-9:
+                low = max(low, m / k)
+            elif m < 0:
+                low, high = math.inf, -math.inf
+        if low > high:
+            continue
+        low, high = math.ceil(max(low, -extent) - 1e-9), math.floor(min(high, extent) + 1e-9)
+        if low <= high:
+            rows.append((ry, low, high))
+    return tuple(rows)
+
+
+class AudioTriangulator:
+    """Narrows down the position of an out-of-vision enemy by intersecting the audio signature bearings of successive
+    ticks.
+
+    The enemy position is kept as a set of candidate cells with a uniform probability. Each tick the set grows by the
+    distance the enemy can move, and is then cut down to the cone along the new bearing. Bearings use precomputed per
+    row interval tables, so an update is a few dozen integer operations on bit masks.
+
+    Attributes:
+        geometry (BoardGeometry): the precomputed masks for the map size
+        candidate_mask (int): the bit mask of the cells the enemy can be in (bit `y * width + x`)
+        turn_number (int | None): the turn of the latest update, `None` before the first update
+    """
+
+    def __init__(self, width: int, height: int):
+        self.geometry = get_board_geometry(width, height)
+        self.candidate_mask = self.geometry.full_mask
+        self.turn_number: int | None = None
+
+    def observe_enemy(self, turn_number: int, position: Coordinates):
+        """Set the enemy position to a cell seen in vision
+
+        Arguments:
+            turn_number (int): the current turn
+            position (Coordinates): the position of the enemy ship
+        """
+        self.candidate_mask = self.geometry.bit(position.x, position.y)
+        self.turn_number = turn_number
+
+    def update(self, turn_number: int, origin: Coordinates, audio_cell: Coordinates | None,
+               unseen_mask: int | None = None):
+        """Update the candidate cells with the observations of a tick on which the enemy is out of vision
+
+        Arguments:
+            turn_number (int): the current turn
+            origin (Coordinates): the position of our ship
+            audio_cell (Coordinates | None): the audio signature cell, `None` if no signature was heard
+            unseen_mask (int | None): the bit mask of the cells out of our vision, if known
+        """
+        if self.turn_number is not None:
+            elapsed_ticks = turn_number - self.turn_number
+            self.candidate_mask = self._dilate(self.candidate_mask, elapsed_ticks * MAX_MOVE_DISTANCE)
+        self.turn_number = turn_number
+        if unseen_mask is not None:
+            self.candidate_mask &= unseen_mask
+        if audio_cell is None or audio_cell == origin:
+            return
+        cone = self.get_bearing_mask(origin, audio_cell)
+        if unseen_mask is not None:
+            cone &= unseen_mask
+        # A bearing that contradicts the candidates means the enemy moved unexpectedly, so the bearing wins
+        self.candidate_mask = self.candidate_mask & cone or cone
+
+    def get_bearing_mask(self, origin: Coordinates, audio_cell: Coordinates) -> int:
+        """Get the cells the enemy can be in according to one audio signature
+
+        Arguments:
+            origin (Coordinates): the position of our ship
+            audio_cell (Coordinates): the audio signature cell
+
+        Returns:
+            (int): the bit mask of the cells in the cone from the audio signature cell away from our ship
+        """
+        width, height = self.geometry.width, self.geometry.height
+        mask = 0
+        for ry, low, high in _get_bearing_rows(audio_cell.x - origin.x, audio_cell.y - origin.y, max(width, height)):
+            y = origin.y + ry
+            if not 0 <= y < height:
+                continue
+            low, high = max(origin.x + low, 0), min(origin.x + high, width - 1)
+            if low <= high:
+                mask |= ((1 << (high - low + 1)) - 1) << (y * width + low)
+        return mask
+
+    def get_probability(self, x: int, y: int) -> float:
+        """Get the probability of the enemy being in a cell
+
+        Arguments:
+            x (int): the x coordinate of the cell
+            y (int): the y coordinate of the cell
+
+        Returns:
+            (float): the probability, uniform over the candidate cells
+        """
+        if not self.candidate_mask >> (y * self.geometry.width + x) & 1:
+            return 0.0
+        return 1 / self.candidate_mask.bit_count()
+
+    def get_estimate(self) -> Coordinates | None:
+        """Get the most likely single cell for the enemy position
+
+        Returns:
+            (Coordinates | None): the candidate cell nearest to the center of the candidate cells, `None` if there are
+            no candidates
+        """
+        cells = to_coordinates(self.candidate_mask, self.geometry.width)
+        if not cells:
+            return None
+        center_x = sum(cell.x for cell in cells) / len(cells)
+        center_y = sum(cell.y for cell in cells) / len(cells)
+        return min(cells, key=lambda cell: (cell.x - center_x) ** 2 + (cell.y - center_y) ** 2)
+
+    def _dilate(self, mask: int, distance: int) -> int:
+        geometry = self.geometry
+        for _ in range(min(distance, max(geometry.width, geometry.height))):
+            mask |= ((mask & ~geometry.right_column_mask) << 1) | ((mask & ~geometry.left_column_mask) >> 1)
+            mask |= ((mask << geometry.width) & geometry.full_mask) | (mask >> geometry.width)
+        return mask
+
+
+def get_audio_triangulator(context: "ClientContext", world_model: WorldModel) -> AudioTriangulator:
+    """Get the triangulator kept in the context, creating it on first use and updating it once per tick from the world
+    model
+
+    Arguments:
+        context (ClientContext): the context of the current game
+        world_model (WorldModel): the world model of the match, updated to the current tick
+
+    Returns:
+        (AudioTriangulator): the triangulator of the match, updated to the current tick
+    """
+    geometry = world_model.geometry
+    triangulator = getattr(context, "audio_triangulator", None)
+    if triangulator is None or (triangulator.geometry.width, triangulator.geometry.height) != \
+            (geometry.width, geometry.height):
+        triangulator = AudioTriangulator(geometry.width, geometry.height)
+        context.audio_triangulator = triangulator
+    if triangulator.turn_number == world_model.turn_number:
+        return triangulator
+    if world_model.enemy_visible:
+        triangulator.observe_enemy(world_model.turn_number, world_model.enemy.position)
+    elif world_model.own_ship is not None:
+        bearing = world_model.get_latest_bearing()
+        triangulator.update(world_model.turn_number, world_model.own_ship.position,
+                            bearing.cell if bearing is not None else None, world_model.unseen_mask)
+    return triangulator
@@ -0,0 +1,311 @@
+from functools import lru_cache
+
+from apiwrapper.models import Cell, CellType, CompassDirection, Coordinates
+from helpers import get_direction_vector
+
+VISION_RADIUS = 10
+"""The radius of the circle a ship can see around itself"""
+
+_DIRECTION_VECTORS = [(get_direction_vector(direction).x, get_direction_vector(direction).y)
+                      for direction in CompassDirection]
+
+
+class BoardGeometry:
+    """Precomputed bit masks for a map of the given size. Bit `y * width + x` of a mask represents the cell (x, y).
+
+    Ray masks are built on creation, vision circle and reachability masks lazily on first use of each radius or
+    reachability parameter combination. Use `get_board_geometry` to share one instance per map size.
+
+    Attributes:
+        width (int): the width of the map
+        height (int): the height of the map
+        full_mask (int): a mask with every cell of the map set
+        left_column_mask (int): a mask with every cell of the leftmost column set
+        right_column_mask (int): a mask with every cell of the rightmost column set
+    """
+
+    def __init__(self, width: int, height: int):
+        self.width = width
+        self.height = height
+        self.full_mask = (1 << (width * height)) - 1
+        self.left_column_mask = sum(1 << (y * width) for y in range(height))
+        self.right_column_mask = self.left_column_mask << (width - 1) if width else 0
+        self._rays = [self._build_ray(index % width, index // width, direction)
+                      for index in range(width * height) for direction in range(8)]
+        self._vision: dict[int, list[int]] = {}
+        self._reach: dict[tuple[int, int, int, int], int] = {}
+
+    def bit(self, x: int, y: int) -> int:
+        """Get the mask with only the given cell set
+
+        Arguments:
+            x (int): the x coordinate of the cell
+            y (int): the y coordinate of the cell
+
+        Returns:
+            (int): the single cell mask
+        """
+        return 1 << (y * self.width + x)
+
+    def ray_mask(self, x: int, y: int, direction: CompassDirection) -> int:
+        """Get the mask of the cells on a ray from a cell to the map edge, excluding the starting cell
+
+        Arguments:
+            x (int): the x coordinate of the starting cell
+            y (int): the y coordinate of the starting cell
+            direction (CompassDirection): the direction of the ray
+
+        Returns:
+            (int): the ray mask
+        """
+        return self._rays[(y * self.width + x) * 8 + direction.value]
+
+    def vision_mask(self, x: int, y: int, radius: int = VISION_RADIUS) -> int:
+        """Get the mask of the cells within a circle around a cell
+
+        Arguments:
+            x (int): the x coordinate of the center cell
+            y (int): the y coordinate of the center cell
+            radius (int): the radius of the circle, defaults to the ship vision radius
+
+        Returns:
+            (int): the mask of cells whose distance from the center is at most the radius
+        """
+        masks = self._vision.get(radius)
+        if masks is None:
+            masks = [self._build_circle(index % self.width, index // self.width, radius)
+                     for index in range(self.width * self.height)]
+            self._vision[radius] = masks
+        return masks[y * self.width + x]
+
+    def reach_mask(self, x: int, y: int, direction: CompassDirection, ticks: int, turn_rate: int) -> int:
+        """Get the mask of the cells a ship can be in after the given amount of ticks
+
+        Each tick the ship either moves 0 to 3 cells forward or turns at most `turn_rate` compass steps. As moving 0
+        cells is allowed, this is also the set of cells reachable within the given amount of ticks.
+
+        Arguments:
+            x (int): the x coordinate of the ship
+            y (int): the y coordinate of the ship
+            direction (CompassDirection): the direction the ship is facing
+            ticks (int): the amount of ticks
+            turn_rate (int): the turn rate of the game
+
+        Returns:
+            (int): the mask of reachable cells
+        """
+        key = (y * self.width + x, direction.value, ticks, turn_rate)
+        mask = self._reach.get(key)
+        if mask is None:
+            mask = self.reach_masks(self.bit(x, y), direction, ticks, turn_rate)[ticks]
+            self._reach[key] = mask
+        return mask
+
+    def reach_masks(self, start_mask: int, direction: CompassDirection | None, ticks: int, turn_rate: int) -> list[int]:
+        """Get the masks of the cells a ship starting from any of the given cells can be in after each tick
+
+        The ship positions are propagated as one bitset per facing direction, so each tick costs a few dozen integer
+        operations regardless of how many cells are reachable.
+
+        Arguments:
+            start_mask (int): the mask of the cells the ship can start from
+            direction (CompassDirection | None): the direction the ship is facing, `None` if it is not known
+            ticks (int): the amount of ticks
+            turn_rate (int): the turn rate of the game
+
+        Returns:
+            (list[int]): the mask of reachable cells after `k` ticks at index `k`, from 0 to `ticks`
+        """
+        if direction is None:
+            states = [start_mask] * 8
+        else:
+            states = [0] * 8
+            states[direction.value] = start_mask
+        masks = [start_mask]
+        for _ in range(ticks):
+            moved = []
+            for state_direction, state in enumerate(states):
+                forward = state
+                for _ in range(3):
+                    forward = self.shift(forward, state_direction)
+                    state |= forward
+                moved.append(state)
+            turned = list(moved)
+            for state_direction, state in enumerate(states):
+                if state:
+                    for turn in range(-turn_rate, turn_rate + 1):
+                        turned[(state_direction + turn) % 8] |= state
+            states = turned
+            mask = 0
+            for state in states:
+                mask |= state
+            masks.append(mask)
+        return masks
+
+    def shift(self, mask: int, direction: int) -> int:
+        """Move every cell of a mask one step in a direction, dropping the cells that would leave the map
+
+        Arguments:
+            mask (int): the mask to shift
+            direction (int): the value of the `CompassDirection` to shift towards
+
+        Returns:
+            (int): the shifted mask
+        """
+        dx, dy = _DIRECTION_VECTORS[direction]
+        if dx > 0:
+            mask = (mask & ~self.right_column_mask) << 1
+        elif dx < 0:
+            mask = (mask & ~self.left_column_mask) >> 1
+        if dy > 0:
+            mask = (mask << self.width) & self.full_mask
+        elif dy < 0:
+            mask >>= self.width
+        return mask
+
+    def _build_ray(self, x: int, y: int, direction: int) -> int:
+        dx, dy = _DIRECTION_VECTORS[direction]
+        mask = 0
+        x, y = x + dx, y + dy
+        while 0 <= x < self.width and 0 <= y < self.height:
+            mask |= 1 << (y * self.width + x)
+            x, y = x + dx, y + dy
+        return mask
+
+    def _build_circle(self, center_x: int, center_y: int, radius: int) -> int:
+        mask = 0
+        for y in range(max(center_y - radius, 0), min(center_y + radius + 1, self.height)):
+            for x in range(max(center_x - radius, 0), min(center_x + radius + 1, self.width)):
+                if (x - center_x) ** 2 + (y - center_y) ** 2 <= radius * radius:
+                    mask |= 1 << (y * self.width + x)
+        return mask
+
+
+@lru_cache(maxsize=None)
+def get_board_geometry(width: int, height: int) -> BoardGeometry:
+    """Get the shared precomputed masks for a map size
+
+    Arguments:
+        width (int): the width of the map
+        height (int): the height of the map
+
+    Returns:
+        (BoardGeometry): the masks for the map size
+    """
+    return BoardGeometry(width, height)
+
+
+class BitboardMap:
+    """A game map encoded as one bitset per cell type
+
+    Attributes:
+        geometry (BoardGeometry): the precomputed masks for the map size
+        occupancy (dict[CellType, int]): the mask of the cells of each cell type
+    """
+
+    def __init__(self, geometry: BoardGeometry, occupancy: dict[CellType, int]):
+        self.geometry = geometry
+        self.occupancy = occupancy
+
+    @classmethod
+    def from_game_map(cls, game_map: list[list[Cell]]) -> "BitboardMap":
+        """Encode a game map as bitsets
+
+        Arguments:
+            game_map (list[list[Cell]]): the map to encode
+
+        Returns:
+            (BitboardMap): the encoded map
+        """
+        height = len(game_map)
+        width = len(game_map[0]) if height else 0
+        occupancy = {cell_type: 0 for cell_type in CellType}
+        index = 0
+        for row in game_map:
+            for cell in row:
+                occupancy[cell.cell_type] |= 1 << index
+                index += 1
+        return cls(get_board_geometry(width, height), occupancy)
+
+    def get_mask(self, *cell_types: CellType) -> int:
+        """Get the mask of all cells of the given cell types
+
+        Arguments:
+            *cell_types (CellType): the cell types to include
+
+        Returns:
+            (int): the combined mask
+        """
+        mask = 0
+        for cell_type in cell_types:
+            mask |= self.occupancy[cell_type]
+        return mask
+
+    def any_along_ray(self, x: int, y: int, direction: CompassDirection, *cell_types: CellType) -> bool:
+        """Check whether any cell of the given types is on a ray from a cell to the map edge
+
+        Arguments:
+            x (int): the x coordinate of the starting cell
+            y (int): the y coordinate of the starting cell
+            direction (CompassDirection): the direction of the ray
+            *cell_types (CellType): the cell types to look for
+
+        Returns:
+            (bool): `True` if the ray contains a cell of the given types, otherwise `False`
+        """
+        return self.geometry.ray_mask(x, y, direction) & self.get_mask(*cell_types) != 0
+
+    def first_along_ray(self, x: int, y: int, direction: CompassDirection, *cell_types: CellType) \
+            -> Coordinates | None:
+        """Get the nearest cell of the given types on a ray from a cell to the map edge
+
+        Arguments:
+            x (int): the x coordinate of the starting cell
+            y (int): the y coordinate of the starting cell
+            direction (CompassDirection): the direction of the ray
+            *cell_types (CellType): the cell types to look for
+
+        Returns:
+            (Coordinates | None): the coordinates of the nearest matching cell, or `None` if there is none
+        """
+        hits = self.geometry.ray_mask(x, y, direction) & self.get_mask(*cell_types)
+        if not hits:
+            return None
+        dx, dy = _DIRECTION_VECTORS[direction.value]
+        if dy > 0 or (dy == 0 and dx > 0):
+            index = (hits & -hits).bit_length() - 1
+        else:
+            index = hits.bit_length() - 1
+        return Coordinates(index % self.geometry.width, index // self.geometry.width)
+
+    def cells_in_vision(self, x: int, y: int, *cell_types: CellType) -> int:
+        """Get the mask of cells of the given types within the vision radius of a cell
+
+        Arguments:
+            x (int): the x coordinate of the center cell
+            y (int): the y coordinate of the center cell
+            *cell_types (CellType): the cell types to include
+
+        Returns:
+            (int): the mask of matching cells in vision
+        """
+        return self.geometry.vision_mask(x, y) & self.get_mask(*cell_types)
+
+
+def to_coordinates(mask: int, width: int) -> list[Coordinates]:
+    """Convert a mask to the coordinates of its set cells
+
+    Arguments:
+        mask (int): the mask to convert
+        width (int): the width of the map the mask belongs to
+
+    Returns:
+        (list[Coordinates]): the coordinates of the set cells in ascending bit order
+    """
+    coordinates = []
+    while mask:
+        lowest = mask & -mask
+        index = lowest.bit_length() - 1
+        coordinates.append(Coordinates(index % width, index // width))
+        mask ^= lowest
+    return coordinates
@@ -0,0 +1,175 @@
+from dataclasses import dataclass
+from typing import Sequence, cast
+
+import numpy as np
+
+from apiwrapper.models import Cell, CellType, GameState, ProjectileData, ShipData
+
+_EMPTY_INDEX = 0
+_OUT_OF_VISION_INDEX = 1
+_AUDIO_SIGNATURE_INDEX = 2
+_HIT_BOX_INDEX = 3
+_SHIP_INDEX = 4
+_PROJECTILE_INDEX = 5
+
+_RAW_CELL_TYPE_INDICES = {
+    "empty": _EMPTY_INDEX,
+    "outOfVision": _OUT_OF_VISION_INDEX,
+    "audioSignature": _AUDIO_SIGNATURE_INDEX,
+    "hitBox": _HIT_BOX_INDEX,
+    "ship": _SHIP_INDEX,
+    "projectile": _PROJECTILE_INDEX
+}
+
+_CELL_TYPE_INDICES = {
+    CellType.Empty: _EMPTY_INDEX,
+    CellType.OutOfVision: _OUT_OF_VISION_INDEX,
+    CellType.AudioSignature: _AUDIO_SIGNATURE_INDEX,
+    CellType.HitBox: _HIT_BOX_INDEX,
+    CellType.Ship: _SHIP_INDEX,
+    CellType.Projectile: _PROJECTILE_INDEX
+}
+
+_RAW_DIRECTION_VALUES = {"n": 0, "ne": 1, "e": 2, "se": 3, "s": 4, "sw": 5, "w": 6, "nw": 7}
+
+_PLANE_INDICES = np.arange(len(_CELL_TYPE_INDICES), dtype=np.uint8).reshape(-1, 1, 1)
+
+CELL_TYPE_PLANES = [CellType.Empty, CellType.OutOfVision, CellType.AudioSignature, CellType.HitBox, CellType.Ship,
+                    CellType.Projectile]
+"""The cell type of each plane in `FeaturePlanes.cell_types`, in plane order"""
+
+
+@dataclass
+class FeaturePlanes:
+    """A game map, or a batch of game maps, as typed NumPy arrays. Single maps have the shapes below, batches have an
+    extra leading batch dimension.
+
+    Attributes:
+        cell_types (np.ndarray): uint8 one-hot cell types of shape (6, height, width), see `CELL_TYPE_PLANES`
+        ship_health (np.ndarray): int16 ship health at ship cells of shape (height, width). 0 where there is no ship and
+            -1 where the health of a ship is unknown
+        ship_heat (np.ndarray): int16 ship heat at ship cells of shape (height, width). 0 where there is no ship and -1
+            where the heat of a ship is unknown
+        direction (np.ndarray): int8 direction value (see `models.CompassDirection`) at ship and projectile cells of
+            shape (height, width), -1 elsewhere
+        projectile_speed (np.ndarray): int8 projectile speed at projectile cells of shape (height, width), 0 elsewhere
+        projectile_mass (np.ndarray): int8 projectile mass at projectile cells of shape (height, width), 0 elsewhere
+    """
+    cell_types: np.ndarray
+    ship_health: np.ndarray
+    ship_heat: np.ndarray
+    direction: np.ndarray
+    projectile_speed: np.ndarray
+    projectile_mass: np.ndarray
+
+
+def planes_from_raw_map(map_matrix: list[list[dict]]) -> FeaturePlanes:
+    """Build feature planes directly from a map as received from the server, without creating `Cell` objects
+
+    Arguments:
+        map_matrix (list[list[dict]]): the `gameMap` of a `gameTick` event
+
+    Returns:
+        (FeaturePlanes): the planes of the map
+    """
+    planes = _allocate(1, *_get_size(map_matrix))
+    _fill_from_raw_map(planes, 0, map_matrix)
+    return _unbatch(planes)
+
+
+def planes_from_game_map(game_map: list[list[Cell]]) -> FeaturePlanes:
+    """Build feature planes from a deserialized game map
+
+    Arguments:
+        game_map (list[list[Cell]]): the map to convert
+
+    Returns:
+        (FeaturePlanes): the planes of the map
+    """
+    planes = _allocate(1, *_get_size(game_map))
+    _fill_from_game_map(planes, 0, game_map)
+    return _unbatch(planes)
+
+
+def stack_game_states(game_states: Sequence[GameState]) -> FeaturePlanes:
+    """Build one batch of feature planes from many game states of the same map size. The batch arrays are allocated
+    once and filled in place. States created by the deserializer are read from their raw map.
+
+    Arguments:
+        game_states (Sequence[GameState]): the states to stack
+
+    Returns:
+        (FeaturePlanes): the planes of the states, with the batch dimension first
+    """
+    if not game_states:
+        raise ValueError("Cannot stack an empty sequence of game states")
+    planes = _allocate(len(game_states), *_get_size(game_states[0].game_map))
+    for index, game_state in enumerate(game_states):
+        if game_state.raw_map is not None:
+            _fill_from_raw_map(planes, index, game_state.raw_map)
+        else:
+            _fill_from_game_map(planes, index, game_state.game_map)
+    return planes
+
+
+def _get_size(game_map: list[list]) -> tuple[int, int]:
+    height = len(game_map)
+    return height, len(game_map[0]) if height else 0
+
+
+def _allocate(batch_size: int, height: int, width: int) -> FeaturePlanes:
+    return FeaturePlanes(np.zeros((batch_size, len(CELL_TYPE_PLANES), height, width), dtype=np.uint8),
+                         np.zeros((batch_size, height, width), dtype=np.int16),
+                         np.zeros((batch_size, height, width), dtype=np.int16),
+                         np.full((batch_size, height, width), -1, dtype=np.int8),
+                         np.zeros((batch_size, height, width), dtype=np.int8),
+                         np.zeros((batch_size, height, width), dtype=np.int8))
+
+
+def _unbatch(planes: FeaturePlanes) -> FeaturePlanes:
+    return FeaturePlanes(planes.cell_types[0], planes.ship_health[0], planes.ship_heat[0], planes.direction[0],
+                         planes.projectile_speed[0], planes.projectile_mass[0])
+
+
+def _fill_from_raw_map(planes: FeaturePlanes, index: int, map_matrix: list[list[dict]]):
+    type_indices = []
+    for y, row in enumerate(map_matrix):
+        for x, cell in enumerate(row):
+            type_index = _RAW_CELL_TYPE_INDICES[cell["type"]]
+            type_indices.append(type_index)
+            if type_index == _SHIP_INDEX:
+                data = cell["data"]
+                planes.ship_health[index, y, x] = data["health"] if data["health"] is not None else -1
+                planes.ship_heat[index, y, x] = data["heat"] if data["heat"] is not None else -1
+                planes.direction[index, y, x] = _RAW_DIRECTION_VALUES[data["direction"]]
+            elif type_index == _PROJECTILE_INDEX:
+                data = cell["data"]
+                planes.direction[index, y, x] = _RAW_DIRECTION_VALUES[data["direction"]]
+                planes.projectile_speed[index, y, x] = data["speed"]
+                planes.projectile_mass[index, y, x] = data["mass"]
+    _fill_cell_types(planes, index, type_indices)
+
+
+def _fill_from_game_map(planes: FeaturePlanes, index: int, game_map: list[list[Cell]]):
+    type_indices = []
+    for y, row in enumerate(game_map):
+        for x, cell in enumerate(row):
+            type_index = _CELL_TYPE_INDICES[cell.cell_type]
+            type_indices.append(type_index)
+            if type_index == _SHIP_INDEX:
+                ship = cast(ShipData, cell.data)
+                planes.ship_health[index, y, x] = ship.health if ship.health is not None else -1
+                planes.ship_heat[index, y, x] = ship.heat if ship.heat is not None else -1
+                planes.direction[index, y, x] = ship.direction.value
+            elif type_index == _PROJECTILE_INDEX:
+                projectile = cast(ProjectileData, cell.data)
+                planes.direction[index, y, x] = projectile.direction.value
+                planes.projectile_speed[index, y, x] = projectile.speed
+                planes.projectile_mass[index, y, x] = projectile.mass
+    _fill_cell_types(planes, index, type_indices)
+
+
+def _fill_cell_types(planes: FeaturePlanes, index: int, type_indices: list[int]):
+    height, width = planes.ship_health.shape[1:]
+    types = np.array(type_indices, dtype=np.uint8).reshape(height, width)
+    planes.cell_types[index] = types[np.newaxis] == _PLANE_INDICES
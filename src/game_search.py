@@ -0,0 +1,483 @@
+import random
+from dataclasses import dataclass
+from time import perf_counter
+from typing import TYPE_CHECKING, cast
+
+from apiwrapper.models import CellType, Command, CompassDirection, GameState, ProjectileData, ShipData
+from helpers import get_direction_vector
+from move_planner import ACTION_MOVE, ACTION_SHOOT, ACTION_TURN, MAX_HEAT, PlannerAction, to_command
+
+if TYPE_CHECKING:
+    from apiwrapper.models import ClientContext
+
+SHIP_COLLISION_DAMAGE = 3
+"""Damage taken by a ship trying to move into the cell of another ship"""
+
+SEARCH_SHOTS = ((4, 1), (2, 4), (4, 4))
+"""The (mass, speed) shot options considered by the search. Searching all 16 shots would square the branching factor
+for little gain, so only a cheap, a fast and the strongest shot are considered."""
+
+DEFAULT_MAX_DEPTH = 4
+"""The deepest iteration of the iterative deepening search by default"""
+
+DEFAULT_TABLE_SIZE = 200_000
+"""How many entries the transposition table holds. Entries from earlier ticks are evicted first, then the shallowest
+entries of the current tick, and new entries are not stored while the table is still full."""
+
+_DEFAULT_HEALTH = 100
+_WIN_SCORE = 100_000.0
+_HEALTH_WEIGHT = 10.0
+_HEAT_WEIGHT = 0.2
+_AIM_WEIGHT = 3.0
+
+_DIRECTION_VECTORS = [(get_direction_vector(direction).x, get_direction_vector(direction).y)
+                      for direction in CompassDirection]
+
+SearchShip = tuple[int, int, int, int, int]
+"""Compact ship state: x, y, direction value, heat and health"""
+
+SearchProjectile = tuple[int, int, int, int, int]
+"""Compact projectile state: x, y, direction value, speed and mass"""
+
+SearchState = tuple[SearchShip, SearchShip, tuple[SearchProjectile, ...]]
+"""Compact game state: own ship, enemy ship and the projectiles sorted by value"""
+
+
+@dataclass
+class SearchResult:
+    """The result of an adversarial search
+
+    Attributes:
+        command (Command | None): the best command found, `None` if not even the first iteration finished in time
+        value (float): the expected evaluation of the best command from our point of view
+        depth (int): the depth of the deepest finished iteration
+        nodes (int): how many decision nodes were visited
+        reused_depth (int): the depth of the search result for the root state reused from earlier ticks, 0 if the state
+            was not predicted by an earlier search
+    """
+    command: Command | None
+    value: float
+    depth: int
+    nodes: int
+    reused_depth: int
+
+
+class _SearchTimeout(Exception):
+    pass
+
+
+class ZobristKeys:
+    """Random 64-bit keys for Zobrist hashing compact search states of a map of the given size
+
+    Attributes:
+        width (int): the width of the map
+        height (int): the height of the map
+    """
+
+    def __init__(self, width: int, height: int, seed: int = 0x5EED):
+        self.width = width
+        self.height = height
+        generator = random.Random(seed)
+        cells = width * height
+        self._ship_keys = [[generator.getrandbits(64) for _ in range(cells * 8)] for _ in range(2)]
+        self._heat_keys = [[generator.getrandbits(64) for _ in range(MAX_HEAT + 1)] for _ in range(2)]
+        self._health_keys = [[generator.getrandbits(64) for _ in range(256)] for _ in range(2)]
+        self._projectile_keys = [generator.getrandbits(64) for _ in range(cells * 8 * 16)]
+
+    def hash(self, state: SearchState) -> int:
+        """Get the Zobrist hash of a compact search state
+
+        Arguments:
+            state (SearchState): the state to hash
+
+        Returns:
+            (int): the 64-bit hash of the state
+        """
+        key = self.hash_ship(0, state[0]) ^ self.hash_ship(1, state[1])
+        return key ^ self.hash_projectiles(state[2])
+
+    def hash_ship(self, side: int, ship: SearchShip) -> int:
+        """Get the part of the Zobrist hash that a ship contributes
+
+        Arguments:
+            side (int): 0 for our ship, 1 for the enemy
+            ship (SearchShip): the ship
+
+        Returns:
+            (int): the 64-bit hash of the ship
+        """
+        x, y, direction, heat, health = ship
+        return self._ship_keys[side][(y * self.width + x) * 8 + direction] ^ self._heat_keys[side][heat] ^ \
+            self._health_keys[side][health & 0xFF]
+
+    def hash_projectiles(self, projectiles: tuple[SearchProjectile, ...]) -> int:
+        """Get the part of the Zobrist hash that the projectiles contribute
+
+        Arguments:
+            projectiles (tuple[SearchProjectile, ...]): the projectiles
+
+        Returns:
+            (int): the 64-bit hash of the projectiles
+        """
+        key = 0
+        width = self.width
+        for x, y, direction, speed, mass in projectiles:
+            key ^= self._projectile_keys[((y * width + x) * 8 + direction) * 16 + (speed - 1) * 4 + mass - 1]
+        return key
+
+    def update(self, key: int, state: SearchState, child: SearchState) -> int:
+        """Get the Zobrist hash of a state from the hash of the state it was reached from, only XORing out and in the
+        parts that changed
+
+        Arguments:
+            key (int): the hash of `state`
+            state (SearchState): the earlier state
+            child (SearchState): the later state, for example from `apply_actions`
+
+        Returns:
+            (int): the 64-bit hash of `child`
+        """
+        for side in (0, 1):
+            if state[side] != child[side]:
+                key ^= self.hash_ship(side, state[side]) ^ self.hash_ship(side, child[side])
+        if state[2] != child[2]:
+            key ^= self.hash_projectiles(state[2]) ^ self.hash_projectiles(child[2])
+        return key
+
+
+def get_ship_actions(turn_rate: int) -> list[PlannerAction]:
+    """Get the compact actions considered for a ship by the search
+
+    Arguments:
+        turn_rate (int): the turn rate of the game
+
+    Returns:
+        (list[PlannerAction]): moves of 0 to 3 cells, turns to relative directions allowed by the turn rate and the
+        shots in `SEARCH_SHOTS`. Turns are given as relative offsets in the direction argument.
+    """
+    actions = [(ACTION_MOVE, distance, 0) for distance in range(4)]
+    actions += [(ACTION_TURN, turn, 0) for turn in range(-min(turn_rate, 3), min(turn_rate, 4) + 1) if turn != 0]
+    actions += [(ACTION_SHOOT, mass, speed) for mass, speed in SEARCH_SHOTS]
+    return actions
+
+
+def to_search_state(game_state: GameState, own_ship_id: str, enemy: ShipData | None = None) -> SearchState | None:
+    """Convert a game state to a compact search state
+
+    Arguments:
+        game_state (GameState): the game state to convert
+        own_ship_id (str): the id of our ship, see `helpers.get_own_ship_id`
+        enemy (ShipData | None): the enemy ship to use if it is not visible, for example its last known state
+
+    Returns:
+        (SearchState | None): the compact state, or `None` if our ship is not on the map or the enemy is not visible
+        and not given
+    """
+    own = None
+    projectiles = []
+    for row in game_state.game_map:
+        for cell in row:
+            if cell.cell_type == CellType.Ship:
+                ship = cast(ShipData, cell.data)
+                if ship.id == own_ship_id:
+                    own = ship
+                else:
+                    enemy = ship
+            elif cell.cell_type == CellType.Projectile:
+                projectile = cast(ProjectileData, cell.data)
+                projectiles.append((projectile.position.x, projectile.position.y, projectile.direction.value,
+                                    projectile.speed, projectile.mass))
+    if own is None or enemy is None:
+        return None
+    return _to_search_ship(own), _to_search_ship(enemy), tuple(sorted(projectiles))
+
+
+def _to_search_ship(ship: ShipData) -> SearchShip:
+    health = ship.health if ship.health is not None else _DEFAULT_HEALTH
+    return ship.position.x, ship.position.y, ship.direction.value, min(ship.heat or 0, MAX_HEAT), health
+
+
+def apply_actions(state: SearchState, own_action: PlannerAction, enemy_action: PlannerAction, width: int,
+                  height: int) -> SearchState:
+    """Simulate one tick of the game from a compact search state with both ships acting simultaneously
+
+    Ships act first: moves stop at the map edge or in front of the other ship (the mover takes contact damage), shots
+    add heat and spawn a projectile in front of the ship. Then the projectiles that existed at the start of the tick
+    advance their speed worth of cells, hitting any ship on the way.
+
+    Arguments:
+        state (SearchState): the state at the start of the tick
+        own_action (PlannerAction): our action, turns given as relative offsets (see `get_ship_actions`)
+        enemy_action (PlannerAction): the action of the enemy
+        width (int): the width of the map
+        height (int): the height of the map
+
+    Returns:
+        (SearchState): the state at the start of the next tick
+    """
+    own, enemy, projectiles = state
+    new_own, own_shot = _apply_ship_action(own, own_action, enemy, width, height)
+    new_enemy, enemy_shot = _apply_ship_action(enemy, enemy_action, own, width, height)
+    if new_own[:2] == new_enemy[:2]:
+        new_own = (own[0], own[1], new_own[2], new_own[3], new_own[4] - SHIP_COLLISION_DAMAGE)
+        new_enemy = (enemy[0], enemy[1], new_enemy[2], new_enemy[3], new_enemy[4] - SHIP_COLLISION_DAMAGE)
+    own_x, own_y = new_own[0], new_own[1]
+    enemy_x, enemy_y = new_enemy[0], new_enemy[1]
+    own_damage = 0
+    enemy_damage = 0
+    remaining = []
+    for projectile in projectiles:
+        x, y, direction, speed, mass = projectile
+        dx, dy = _DIRECTION_VECTORS[direction]
+        for _ in range(speed):
+            x += dx
+            y += dy
+            if not (0 <= x < width and 0 <= y < height):
+                break
+            if x == own_x and y == own_y:
+                own_damage += mass * 2 + speed
+                break
+            if x == enemy_x and y == enemy_y:
+                enemy_damage += mass * 2 + speed
+                break
+        else:
+            remaining.append((x, y, direction, speed, mass))
+    for shot in (own_shot, enemy_shot):
+        if shot is None:
+            continue
+        x, y, _, speed, mass = shot
+        if x == own_x and y == own_y:
+            own_damage += mass * 2 + speed
+        elif x == enemy_x and y == enemy_y:
+            enemy_damage += mass * 2 + speed
+        else:
+            remaining.append(shot)
+    if own_damage:
+        new_own = new_own[:4] + (max(new_own[4] - own_damage, 0),)
+    if enemy_damage:
+        new_enemy = new_enemy[:4] + (max(new_enemy[4] - enemy_damage, 0),)
+    remaining.sort()
+    return new_own, new_enemy, tuple(remaining)
+
+
+def _apply_ship_action(ship: SearchShip, action: PlannerAction, other: SearchShip, width: int,
+                       height: int) -> tuple[SearchShip, SearchProjectile | None]:
+    x, y, direction, heat, health = ship
+    kind, first, second = action
+    if kind == ACTION_TURN:
+        return (x, y, (direction + first) % 8, heat, health), None
+    dx, dy = _DIRECTION_VECTORS[direction]
+    if kind == ACTION_MOVE:
+        moved = 0
+        for _ in range(first):
+            next_x, next_y = x + dx, y + dy
+            if not (0 <= next_x < width and 0 <= next_y < height):
+                break
+            if next_x == other[0] and next_y == other[1]:
+                health -= SHIP_COLLISION_DAMAGE
+                break
+            x, y = next_x, next_y
+            moved += 1
+        return (x, y, direction, max(heat - moved * 2, 0), max(health, 0)), None
+    heat += first * second
+    if heat > MAX_HEAT:
+        health = max(health - (heat - MAX_HEAT), 0)
+        heat = MAX_HEAT
+    shot_x, shot_y = x + dx, y + dy
+    shot = (shot_x, shot_y, direction, second, first) if 0 <= shot_x < width and 0 <= shot_y < height else None
+    return (x, y, direction, heat, health), shot
+
+
+def evaluate(state: SearchState) -> float:
+    """Evaluate a compact search state from our point of view
+
+    Arguments:
+        state (SearchState): the state to evaluate
+
+    Returns:
+        (float): the evaluation, higher is better for us. Destroying the enemy gives a large positive score and losing
+        our ship a large negative score.
+    """
+    own, enemy, _ = state
+    own_health = own[4]
+    enemy_health = enemy[4]
+    if own_health <= 0 or enemy_health <= 0:
+        if own_health <= 0 and enemy_health <= 0:
+            return 0.0
+        return -_WIN_SCORE if own_health <= 0 else _WIN_SCORE
+    score = (own_health - enemy_health) * _HEALTH_WEIGHT + (enemy[3] - own[3]) * _HEAT_WEIGHT
+    if _is_on_ray(own, enemy):
+        score += _AIM_WEIGHT
+    if _is_on_ray(enemy, own):
+        score -= _AIM_WEIGHT
+    return score
+
+
+def _is_on_ray(ship: SearchShip, target: SearchShip) -> bool:
+    dx, dy = _DIRECTION_VECTORS[ship[2]]
+    offset_x, offset_y = target[0] - ship[0], target[1] - ship[1]
+    if dx == 0:
+        return offset_x == 0 and offset_y * dy > 0
+    if dy == 0:
+        return offset_y == 0 and offset_x * dx > 0
+    return offset_x * dx > 0 and offset_x * dx == offset_y * dy
+
+
+class GameSearch:
+    """Simultaneous-move expectimax search over both ships' actions with iterative deepening.
+
+    The enemy is modelled as choosing uniformly between its actions. Search results are kept in a Zobrist-hashed
+    transposition table that persists between ticks, with the hash of each child state updated from the hash of its
+    parent. When the observed state of a new tick was already searched as a child of an earlier root, the earlier
+    result is reused and the search continues one level deeper from it.
+
+    Attributes:
+        width (int): the width of the map
+        height (int): the height of the map
+        turn_rate (int): the turn rate of the game
+        max_table_size (int): the most transposition table entries kept, see `DEFAULT_TABLE_SIZE`
+    """
+
+    def __init__(self, width: int, height: int, turn_rate: int, max_table_size: int = DEFAULT_TABLE_SIZE):
+        self.width = width
+        self.height = height
+        self.turn_rate = turn_rate
+        self.max_table_size = max_table_size
+        self._keys = ZobristKeys(width, height)
+        self._actions = get_ship_actions(turn_rate)
+        # hash -> (state, depth, value, best action index, generation)
+        self._table: dict[int, tuple[SearchState, int, float, int, int]] = {}
+        self._generation = 0
+        self._nodes = 0
+        self._deadline: float | None = None
+
+    def search(self, state: SearchState, deadline: float | None = None, max_depth: int = DEFAULT_MAX_DEPTH,
+               context: "ClientContext | None" = None) -> SearchResult:
+        """Search for the best command in the given state
+
+        Arguments:
+            state (SearchState): the current state, see `to_search_state`
+            deadline (float | None): `time.perf_counter` timestamp at which the search is stopped and the result of the
+                deepest iteration finished before it is returned. `None` searches until `max_depth` is finished
+            max_depth (int): the deepest iteration to search
+            context (ClientContext | None): if given, the best command of every finished iteration is published with
+                `ClientContext.publish_command`
+
+        Returns:
+            (SearchResult): the best command found and search statistics
+        """
+        self._generation += 1
+        if state[0][4] <= 0 or state[1][4] <= 0:
+            return SearchResult(None, evaluate(state), 0, 0, 0)
+        self._deadline = deadline
+        self._nodes = 0
+        entry = self._lookup(state)
+        reused_depth = entry[1] if entry is not None else 0
+        best_index = entry[3] if entry is not None else -1
+        value = entry[2] if entry is not None else evaluate(state)
+        finished_depth = reused_depth
+        for depth in range(max(reused_depth, 0) + 1, max_depth + 1):
+            try:
+                depth_value, depth_index = self._search_root(state, depth)
+            except _SearchTimeout:
+                break
+            # An iteration that only finished after the deadline came too late to be used on this tick
+            if deadline is not None and perf_counter() >= deadline:
+                break
+            value, best_index = depth_value, depth_index
+            finished_depth = depth
+            if context is not None:
+                context.publish_command(self._to_command(state, best_index))
+        command = self._to_command(state, best_index) if best_index >= 0 else None
+        return SearchResult(command, value, finished_depth, self._nodes, reused_depth)
+
+    def _to_command(self, state: SearchState, action_index: int) -> Command:
+        kind, first, second = self._actions[action_index]
+        if kind == ACTION_TURN:
+            first = (state[0][2] + first) % 8
+        return to_command((kind, first, second))
+
+    def _search_root(self, state: SearchState, depth: int) -> tuple[float, int]:
+        return self._search_node(state, depth, self._keys.hash(state))
+
+    def _lookup(self, state: SearchState):
+        entry = self._table.get(self._keys.hash(state))
+        if entry is None or entry[0] != state:
+            return None
+        return entry
+
+    def _value(self, state: SearchState, depth: int, key: int) -> float:
+        own, enemy, _ = state
+        if depth == 0 or own[4] <= 0 or enemy[4] <= 0:
+            return evaluate(state)
+        return self._search_node(state, depth, key)[0]
+
+    def _search_node(self, state: SearchState, depth: int, key: int) -> tuple[float, int]:
+        self._nodes += 1
+        deadline = self._deadline
+        if deadline is not None and perf_counter() >= deadline:
+            raise _SearchTimeout()
+        entry = self._table.get(key)
+        action_order = range(len(self._actions))
+        if entry is not None and entry[0] == state:
+            if entry[1] >= depth:
+                self._table[key] = entry[:4] + (self._generation,)
+                return entry[2], entry[3]
+            action_order = [entry[3]] + [index for index in action_order if index != entry[3]]
+        actions = self._actions
+        keys = self._keys
+        width, height = self.width, self.height
+        best_value = -_WIN_SCORE * 2
+        best_index = 0
+        for index in action_order:
+            # Checked for each of our actions as well, a decision node has the square of the action count as children
+            if deadline is not None and perf_counter() >= deadline:
+                raise _SearchTimeout()
+            own_action = actions[index]
+            total = 0.0
+            for enemy_action in actions:
+                child = apply_actions(state, own_action, enemy_action, width, height)
+                if depth == 1:
+                    total += evaluate(child)
+                else:
+                    total += self._value(child, depth - 1, keys.update(key, state, child))
+            value = total / len(actions)
+            if value > best_value:
+                best_value = value
+                best_index = index
+        self._store(key, (state, depth, best_value, best_index, self._generation))
+        return best_value, best_index
+
+    def _store(self, key: int, entry: tuple[SearchState, int, float, int, int]):
+        if key not in self._table and len(self._table) >= self.max_table_size:
+            self._make_room()
+            if len(self._table) >= self.max_table_size:
+                return
+        self._table[key] = entry
+
+    def _make_room(self):
+        # Entries of earlier ticks go first, then the shallowest entries of this tick as they are the cheapest to redo
+        generation = self._generation
+        self._table = {key: entry for key, entry in self._table.items() if entry[4] == generation}
+        if len(self._table) >= self.max_table_size:
+            shallowest = min(entry[1] for entry in self._table.values())
+            self._table = {key: entry for key, entry in self._table.items() if entry[1] > shallowest}
+
+
+def get_game_search(context: "ClientContext", width: int, height: int) -> GameSearch:
+    """Get the search engine kept in the context, creating it on first use. Keeping the engine in the context
+    preserves its transposition table between the ticks of a match.
+
+    Arguments:
+        context (ClientContext): the context of the current game
+        width (int): the width of the map
+        height (int): the height of the map
+
+    Returns:
+        (GameSearch): the search engine of the match, created again if the map size or turn rate changed
+    """
+    search = getattr(context, "game_search", None)
+    if search is None or (search.width, search.height, search.turn_rate) != (width, height, context.turn_rate):
+        search = GameSearch(width, height, context.turn_rate)
+        context.game_search = search
+    return search
@@ -1,11 +1,24 @@
 import json
 import math
 import os
-from typing import cast
+from typing import Iterable, cast
 
 from apiwrapper.models import Coordinates, CompassDirection, Cell, CellType, ProjectileData, ShipData
 
 
+_config_file: dict | None = None
+
+
+def _read_config_file() -> dict:
+    # The file is read once per process, the environment is still checked on every call so it can override the file
+    global _config_file
+    if _config_file is None:
+        file_path = os.path.join(os.path.dirname(__file__), "../config.json")
+        with open(file_path, "r", encoding="utf-8") as config_file:
+            _config_file = json.loads(config_file.read())
+    return _config_file
+
+
 def get_config(config_name: str) -> str:
     """Get a config value from environment, falls back to config.json if config is not found in environment.
 
@@ -17,9 +30,25 @@ def get_config(config_name: str) -> str:
     """
     config = os.getenv(config_name, None)
     if config is None:
-        file_path = os.path.join(os.path.dirname(__file__), "../config.json")
-        with open(file_path, "r", encoding="utf-8") as config_file:
-            config = json.loads(config_file.read())[config_name]
+        config = _read_config_file()[config_name]
+    return str(config)
+
+
+def get_optional_config(config_name: str, default: str | None = None) -> str | None:
+    """Get an optional config value from environment, falls back to config.json if config is not found in environment.
+
+    Arguments:
+        config_name (str): the name of the config value to get
+        default (str | None): the value to return if the config is missing, null or empty
+
+    Returns:
+        (str | None): the config found, or the default
+    """
+    config = os.getenv(config_name, None)
+    if config is None:
+        config = _read_config_file().get(config_name, None)
+    if config is None or config in ("", "null"):
+        return default
     return str(config)
 
 
@@ -36,20 +65,17 @@ def get_coordinate_difference(origin: Coordinates, target: Coordinates) -> Coord
     return Coordinates(target.x - origin.x, target.y - origin.y)
 
 
-def _get_vector_angle_degrees(vector: Coordinates) -> float:
-    return (math.atan2(vector.y, -vector.x) * 180 / math.pi) % 360
+LOOKUP_TABLE_RANGE = 30
+"""Vectors with both components between -LOOKUP_TABLE_RANGE and LOOKUP_TABLE_RANGE are answered from a precomputed
+table by the direction helpers. This covers every vector between two cells of a 30x30 map."""
 
 
-def get_approximate_direction(vector: Coordinates) -> CompassDirection:
-    """Get a compass direction most closely representing the given vector
+def _get_vector_angle_degrees(x: int, y: int) -> float:
+    return (math.atan2(y, -x) * 180 / math.pi) % 360
 
-    Arguments:
-        vector (Coordinates): the vector which should be converted to approximate compass direction
 
-    Returns:
-        (CompassDirection): the compass direction closest to the vector
-    """
-    angle = _get_vector_angle_degrees(vector)
+def _compute_approximate_direction(x: int, y: int) -> CompassDirection:
+    angle = _get_vector_angle_degrees(x, y)
     cutoff = 360 / 16
     if angle >= 15 * cutoff or angle < cutoff:
         return CompassDirection.North
@@ -68,6 +94,126 @@ def get_approximate_direction(vector: Coordinates) -> CompassDirection:
     return CompassDirection.NorthWest
 
 
+def _build_vector_table(function) -> list:
+    return [function(x, y) for x in range(-LOOKUP_TABLE_RANGE, LOOKUP_TABLE_RANGE + 1)
+            for y in range(-LOOKUP_TABLE_RANGE, LOOKUP_TABLE_RANGE + 1)]
+
+
+_TABLE_SIDE = 2 * LOOKUP_TABLE_RANGE + 1
+_TABLE_CENTER = LOOKUP_TABLE_RANGE * _TABLE_SIDE + LOOKUP_TABLE_RANGE
+_APPROXIMATE_DIRECTION_TABLE = _build_vector_table(_compute_approximate_direction)
+
+
+def get_approximate_direction(vector: Coordinates) -> CompassDirection:
+    """Get a compass direction most closely representing the given vector
+
+    Arguments:
+        vector (Coordinates): the vector which should be converted to approximate compass direction
+
+    Returns:
+        (CompassDirection): the compass direction closest to the vector
+    """
+    x, y = vector.x, vector.y
+    if -LOOKUP_TABLE_RANGE <= x <= LOOKUP_TABLE_RANGE and -LOOKUP_TABLE_RANGE <= y <= LOOKUP_TABLE_RANGE:
+        return _APPROXIMATE_DIRECTION_TABLE[_TABLE_CENTER + x * _TABLE_SIDE + y]
+    return _compute_approximate_direction(x, y)
+
+
+def get_approximate_directions(vectors: Iterable[Coordinates]) -> list[CompassDirection]:
+    """Get the compass directions most closely representing each of the given vectors, see
+    `get_approximate_direction`
+
+    Arguments:
+        vectors (Iterable[Coordinates]): the vectors which should be converted to approximate compass directions
+
+    Returns:
+        (list[CompassDirection]): the compass directions closest to the vectors, in the same order
+    """
+    table = _APPROXIMATE_DIRECTION_TABLE
+    directions = []
+    for vector in vectors:
+        x, y = vector.x, vector.y
+        if -LOOKUP_TABLE_RANGE <= x <= LOOKUP_TABLE_RANGE and -LOOKUP_TABLE_RANGE <= y <= LOOKUP_TABLE_RANGE:
+            directions.append(table[_TABLE_CENTER + x * _TABLE_SIDE + y])
+        else:
+            directions.append(_compute_approximate_direction(x, y))
+    return directions
+
+
+def get_chebyshev_distance(vector: Coordinates) -> int:
+    """Get the Chebyshev length of a vector, which is the amount of single cell steps (diagonals included) needed to
+    travel along it
+
+    Arguments:
+        vector (Coordinates): the vector to measure
+
+    Returns:
+        (int): the larger of the absolute values of the vector components
+    """
+    return max(abs(vector.x), abs(vector.y))
+
+
+def get_chebyshev_distances(vectors: Iterable[Coordinates]) -> list[int]:
+    """Get the Chebyshev lengths of the given vectors, see `get_chebyshev_distance`
+
+    Arguments:
+        vectors (Iterable[Coordinates]): the vectors to measure
+
+    Returns:
+        (list[int]): the lengths of the vectors, in the same order
+    """
+    return [max(abs(vector.x), abs(vector.y)) for vector in vectors]
+
+
+def get_euclidean_distance(vector: Coordinates) -> float:
+    """Get the Euclidean length of a vector
+
+    Arguments:
+        vector (Coordinates): the vector to measure
+
+    Returns:
+        (float): the length of the vector
+    """
+    return math.hypot(vector.x, vector.y)
+
+
+def get_euclidean_distances(vectors: Iterable[Coordinates]) -> list[float]:
+    """Get the Euclidean lengths of the given vectors
+
+    Arguments:
+        vectors (Iterable[Coordinates]): the vectors to measure
+
+    Returns:
+        (list[float]): the lengths of the vectors, in the same order
+    """
+    return [math.hypot(vector.x, vector.y) for vector in vectors]
+
+
+_DIRECTION_VECTORS = {
+    CompassDirection.North: (-1, 0),
+    CompassDirection.NorthEast: (-1, 1),
+    CompassDirection.East: (0, 1),
+    CompassDirection.SouthEast: (1, 1),
+    CompassDirection.South: (1, 0),
+    CompassDirection.SouthWest: (1, -1),
+    CompassDirection.West: (0, -1),
+    CompassDirection.NorthWest: (-1, -1)
+}
+
+
+def get_direction_vector(direction: CompassDirection) -> Coordinates:
+    """Get the unit vector pointing in the given compass direction. This is the inverse of
+    `get_approximate_direction` for the eight exact compass directions.
+
+    Arguments:
+        direction (CompassDirection): the direction to get the vector for
+
+    Returns:
+        (Coordinates): a vector of length one (diagonals have both components set) towards the direction
+    """
+    return Coordinates(*_DIRECTION_VECTORS[direction])
+
+
 def get_entity_coordinates(entity_id: str, game_map: list[list[Cell]]) -> Coordinates | None:
     """Get coordinates for a given entity from the given game map
 
@@ -86,6 +232,33 @@ def get_entity_coordinates(entity_id: str, game_map: list[list[Cell]]) -> Coordi
     return None
 
 
+def get_projectiles(game_map: list[list[Cell]]) -> list[ProjectileData]:
+    """Get the data of all projectiles visible in the given game map
+
+    Arguments:
+        game_map (list[list[Cell]]): the game map to search for projectiles in
+
+    Returns:
+        (list[ProjectileData]): the projectiles in the map, in row-major order
+    """
+    return [cast(ProjectileData, cell.data) for row in game_map for cell in row
+            if cell.cell_type == CellType.Projectile]
+
+
+def _compute_partial_turn(starting_direction: int, target_direction: int, turn_rate: int) -> CompassDirection:
+    initial_turn = (target_direction - starting_direction) % 8
+    if initial_turn > 4:  # turning counterclockwise
+        initial_turn -= 8
+        return CompassDirection((starting_direction + max(initial_turn, -turn_rate)) % 8)
+    return CompassDirection((starting_direction + min(initial_turn, turn_rate)) % 8)
+
+
+# Turn rates of 4 and above all allow turning straight to any direction, so the table stops at 4
+_MAX_TABLE_TURN_RATE = 4
+_PARTIAL_TURN_TABLE = [_compute_partial_turn(start, target, turn_rate) for start in range(8) for target in range(8)
+                       for turn_rate in range(_MAX_TABLE_TURN_RATE + 1)]
+
+
 def get_partial_turn(starting_direction: CompassDirection, target_direction: CompassDirection, turn_rate: int)\
         -> CompassDirection:
     """Get the compass direction that is the furthest one you are allowed to turn towards from the given starting
@@ -102,11 +275,10 @@ def get_partial_turn(starting_direction: CompassDirection, target_direction: Com
     Note:
         If performing a 180-degree turn, the function will always perform the partial turn clockwise
     """
-    initial_turn = (target_direction.value - starting_direction.value) % 8
-    if initial_turn > 4:  # turning counterclockwise
-        initial_turn -= 8
-        return CompassDirection((starting_direction.value + max(initial_turn, -turn_rate)) % 8)
-    return CompassDirection((starting_direction.value + min(initial_turn, turn_rate)) % 8)
+    if turn_rate < 0:
+        return _compute_partial_turn(starting_direction.value, target_direction.value, turn_rate)
+    return _PARTIAL_TURN_TABLE[(starting_direction.value * 8 + target_direction.value) * (_MAX_TABLE_TURN_RATE + 1)
+                               + min(turn_rate, _MAX_TABLE_TURN_RATE)]
 
 
 def get_own_ship_id() -> str:
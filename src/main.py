@@ -1,14 +1,22 @@
 from logging import getLogger
 
-from helpers import get_config
-from apiwrapper.websocket_wrapper import connect_websocket
-from logging_setup import setup_logging
+from apiwrapper.startup import StartupTimer
+
+# Imported in dependency order after logging is set up, so each time is what the module adds on top of the earlier ones
+_TIMED_IMPORTS = ["websockets.sync.client", "team_ai", "apiwrapper.websocket_wrapper"]
 
 if __name__ == '__main__':
-    setup_logging()
+    startup = StartupTimer()
+    startup.import_module("logging_setup").setup_logging()
+    startup.mark("logging set up")
+    for module_name in _TIMED_IMPORTS:
+        startup.import_module(module_name)
+    startup.mark("imports")
+    from helpers import get_config
+    from apiwrapper.websocket_wrapper import connect_websocket
     _logger = getLogger("wrapper.main")
     websocket_url = get_config("websocket_url")
     token = get_config("token")
     name = get_config("bot_name")
     _logger.debug("Starting websocket loop")
-    connect_websocket(websocket_url, token, name)
+    connect_websocket(websocket_url, token, name, startup)
@@ -0,0 +1,246 @@
+import heapq
+from dataclasses import dataclass, field
+from threading import Event
+from time import perf_counter
+from typing import TYPE_CHECKING
+
+from apiwrapper.models import ActionType, Command, CompassDirection, Coordinates, GameState, MoveActionData, \
+    ShipData, ShootActionData, TurnActionData
+from helpers import get_direction_vector
+from projectile_prediction import DangerMap
+
+if TYPE_CHECKING:
+    from apiwrapper.models import ClientContext
+
+MAX_HEAT = 25
+"""Heat above this amount is converted to damage on the ship"""
+
+DEFAULT_MAX_DEPTH = 6
+"""How many actions ahead the planner searches by default"""
+
+PLANNING_SAFETY_MARGIN_MS = 60
+"""Time reserved from the tick for the wrapper timeout failsafe and for sending the command"""
+
+PLANNING_RESULT_MARGIN_MS = 10
+"""Time reserved before the wrapper tick deadline for turning the plan into a command"""
+
+_DIRECTION_VECTORS = [(get_direction_vector(direction).x, get_direction_vector(direction).y)
+                      for direction in CompassDirection]
+_SHOTS = [(mass, speed) for mass in range(1, 5) for speed in range(1, 5)]
+_MAX_SHOT_DAMAGE = 4 * 2 + 4
+_SHOT_DAMAGE_WEIGHT = 0.01
+
+ACTION_MOVE = 0
+"""Action kind of a compact move action, the first argument is the distance"""
+ACTION_TURN = 1
+"""Action kind of a compact turn action, the first argument is the direction value"""
+ACTION_SHOOT = 2
+"""Action kind of a compact shoot action, the arguments are the mass and the speed"""
+
+PlannerState = tuple[int, int, int, int]
+"""Compact planner state: x, y, direction value (see `models.CompassDirection`) and heat"""
+
+PlannerAction = tuple[int, int, int]
+"""Compact planner action: action kind and two arguments (distance, direction value or mass and speed)"""
+
+
+@dataclass
+class MovePlan:
+    """The result of a planner search
+
+    Attributes:
+        commands (list[Command]): the planned commands in execution order. Empty if the start was the best state found
+        complete (bool): `True` if the plan ends in a shot at the target, `False` if the search ran out of time or depth
+            and the plan only leads to the most promising state found
+        expanded_nodes (int): how many search nodes were expanded
+    """
+    commands: list[Command] = field(default_factory=list)
+    complete: bool = False
+    expanded_nodes: int = 0
+
+
+def get_planning_deadline(context: "ClientContext", start_time: float | None = None) -> float | None:
+    """Get the `time.perf_counter` timestamp by which planning should be finished on this tick
+
+    Arguments:
+        context (ClientContext): the context of the current game
+        start_time (float | None): the `time.perf_counter` timestamp the tick processing started at. Defaults to the
+            wrapper deadline of the current tick (see `models.ClientContext.deadline`) if one is set, otherwise now
+
+    Returns:
+        (float | None): the deadline timestamp, or `None` if the game has no tick time limit
+    """
+    if context.tick_length_ms == 0:
+        return None
+    if start_time is None:
+        if context.deadline.timestamp is not None:
+            return context.deadline.timestamp - PLANNING_RESULT_MARGIN_MS / 1000
+        start_time = perf_counter()
+    return start_time + max(context.tick_length_ms - PLANNING_SAFETY_MARGIN_MS, 0) / 1000
+
+
+def to_planner_state(ship: ShipData) -> PlannerState:
+    """Convert ship data to the compact planner state
+
+    Arguments:
+        ship (ShipData): the ship to convert
+
+    Returns:
+        (PlannerState): the compact state of the ship
+    """
+    return ship.position.x, ship.position.y, ship.direction.value, ship.heat or 0
+
+
+def to_command(action: PlannerAction) -> Command:
+    """Convert a compact planner action to a command
+
+    Arguments:
+        action (PlannerAction): the action to convert
+
+    Returns:
+        (Command): the command corresponding to the action
+    """
+    kind, first, second = action
+    if kind == ACTION_MOVE:
+        return Command(ActionType.Move, MoveActionData(first))
+    if kind == ACTION_TURN:
+        return Command(ActionType.Turn, TurnActionData(CompassDirection(first)))
+    return Command(ActionType.Shoot, ShootActionData(first, second))
+
+
+def plan_moves(context: "ClientContext", game_state: GameState, ship: ShipData, target: Coordinates,
+               danger_map: DangerMap | None = None, max_depth: int = DEFAULT_MAX_DEPTH,
+               deadline: float | None = None, cancel: Event | None = None) -> MovePlan:
+    """Search for the cheapest sequence of moves and turns that ends in a shot hitting the target.
+
+    Uses A* search over the compact ship state. The cost of a plan is one per tick, plus predicted projectile damage
+    taken along the way (see `projectile_prediction.DangerMap`) and damage from overheating. The heuristic is the
+    minimum number of ticks needed to turn onto the target line and shoot, so it never overestimates.
+
+    Arguments:
+        context (ClientContext): the context of the current game, used for the turn rate
+        game_state (GameState): the current game state, used for the map size
+        ship (ShipData): the ship to plan for
+        target (Coordinates): the cell to hit
+        danger_map (DangerMap | None): predicted projectile danger, should be updated to `game_state`. Optional
+        max_depth (int): the maximum amount of actions in a plan
+        deadline (float | None): `time.perf_counter` timestamp after which the best plan found so far is returned,
+            see `get_planning_deadline`. `None` searches until the whole space up to `max_depth` is exhausted
+        cancel (Event | None): when set, the best plan found so far is returned, for planning in the background until
+            the next tick arrives. Optional
+
+    Returns:
+        (MovePlan): the best plan found
+    """
+    height = len(game_state.game_map)
+    width = len(game_state.game_map[0]) if height else 0
+    turn_rate = context.turn_rate
+    target_x, target_y = target.x, target.y
+    start = to_planner_state(ship)
+
+    # Nodes are kept in flat lists and referenced by index to keep expansion allocation light
+    node_states: list[PlannerState] = [start]
+    node_actions: list[PlannerAction | None] = [None]
+    node_parents: list[int] = [-1]
+    node_depths: list[int] = [0]
+    start_heuristic = _heuristic(start, target_x, target_y, turn_rate)
+    open_list = [(float(start_heuristic), start_heuristic, 0.0, 0)]
+    best_costs = {(start, 0): 0.0}
+    best_partial = (start_heuristic, 0.0, 0)
+    expanded = 0
+
+    while open_list:
+        if (deadline is not None and perf_counter() >= deadline) or (cancel is not None and cancel.is_set()):
+            break
+        _, heuristic, cost, index = heapq.heappop(open_list)
+        state = node_states[index]
+        depth = node_depths[index]
+        if node_actions[index] is not None and node_actions[index][0] == ACTION_SHOOT:
+            return MovePlan(_reconstruct(index, node_actions, node_parents), True, expanded)
+        if best_costs.get((state, depth), cost) < cost:
+            continue
+        expanded += 1
+        if (heuristic, cost) < best_partial[:2]:
+            best_partial = (heuristic, cost, index)
+        if depth >= max_depth:
+            continue
+        for action, next_state, step_cost in _expand(state, depth, width, height, turn_rate, target_x, target_y,
+                                                     danger_map):
+            next_cost = cost + step_cost
+            is_shot = action[0] == ACTION_SHOOT
+            key = (next_state, depth + 1) if not is_shot else None
+            if key is not None and best_costs.get(key, next_cost + 1) <= next_cost:
+                continue
+            if key is not None:
+                best_costs[key] = next_cost
+            next_heuristic = 0 if is_shot else _heuristic(next_state, target_x, target_y, turn_rate)
+            node_states.append(next_state)
+            node_actions.append(action)
+            node_parents.append(index)
+            node_depths.append(depth + 1)
+            heapq.heappush(open_list, (next_cost + next_heuristic, next_heuristic, next_cost, len(node_states) - 1))
+
+    return MovePlan(_reconstruct(best_partial[2], node_actions, node_parents), False, expanded)
+
+
+def _expand(state: PlannerState, depth: int, width: int, height: int, turn_rate: int, target_x: int, target_y: int,
+            danger_map: DangerMap | None):
+    x, y, direction, heat = state
+    tick = depth + 1
+    stay_cost = 1 + _get_danger(danger_map, x, y, tick)
+    if _is_aimed(x, y, direction, target_x, target_y):
+        for mass, speed in _SHOTS:
+            overheat = max(heat + mass * speed - MAX_HEAT, 0)
+            shot_cost = stay_cost + overheat + (_MAX_SHOT_DAMAGE - (mass * 2 + speed)) * _SHOT_DAMAGE_WEIGHT
+            yield (ACTION_SHOOT, mass, speed), (x, y, direction, min(heat + mass * speed, MAX_HEAT)), shot_cost
+    dx, dy = _DIRECTION_VECTORS[direction]
+    for distance in range(0, 4):
+        next_x, next_y = x + dx * distance, y + dy * distance
+        if not (0 <= next_x < width and 0 <= next_y < height):
+            break
+        yield ((ACTION_MOVE, distance, 0), (next_x, next_y, direction, max(heat - distance * 2, 0)),
+               1 + _get_danger(danger_map, next_x, next_y, tick))
+    for turn in range(-turn_rate, turn_rate + 1):
+        if turn == 0 or (turn_rate >= 4 and turn == -4):
+            continue
+        next_direction = (direction + turn) % 8
+        yield (ACTION_TURN, next_direction, 0), (x, y, next_direction, heat), stay_cost
+
+
+def _get_danger(danger_map: DangerMap | None, x: int, y: int, tick: int) -> int:
+    if danger_map is None or tick >= danger_map.horizon:
+        return 0
+    return danger_map.get_danger(x, y, tick)
+
+
+def _is_aimed(x: int, y: int, direction: int, target_x: int, target_y: int) -> bool:
+    return _get_target_direction(target_x - x, target_y - y) == direction
+
+
+def _get_target_direction(dx: int, dy: int) -> int | None:
+    if dx == 0 and dy == 0:
+        return None
+    if dx != 0 and dy != 0 and abs(dx) != abs(dy):
+        return None
+    return _DIRECTION_VECTORS.index(((dx > 0) - (dx < 0), (dy > 0) - (dy < 0)))
+
+
+def _heuristic(state: PlannerState, target_x: int, target_y: int, turn_rate: int) -> int:
+    # Moving never puts the target on the line the ship is facing, so a ship that is not aimed has to turn at least
+    # once. Either it turns straight onto the target line, or it moves at least once before turning.
+    x, y, direction, _ = state
+    target_direction = _get_target_direction(target_x - x, target_y - y)
+    if target_direction == direction:
+        return 1
+    if target_direction is None or turn_rate == 0:
+        return 3
+    rotation = min((target_direction - direction) % 8, (direction - target_direction) % 8)
+    return min(-(-rotation // turn_rate) + 1, 3)
+
+
+def _reconstruct(index: int, node_actions: list[PlannerAction | None], node_parents: list[int]) -> list[Command]:
+    actions = []
+    while index > 0:
+        actions.append(node_actions[index])
+        index = node_parents[index]
+    return [to_command(action) for action in reversed(actions) if action is not None]
@@ -0,0 +1,15 @@
+import asyncio
+from logging import getLogger
+
+from helpers import get_config, get_optional_config
+from apiwrapper.async_runner import BotRunner, parse_bots
+from logging_setup import setup_logging
+
+if __name__ == '__main__':
+    setup_logging()
+    _logger = getLogger("wrapper.main")
+    websocket_url = get_config("websocket_url")
+    bots = parse_bots(get_config("bots"))
+    workers = get_optional_config("bot_workers")
+    _logger.debug(f"Starting websocket loop for {len(bots)} bots")
+    asyncio.run(BotRunner(websocket_url, bots, int(workers) if workers is not None else None).run())
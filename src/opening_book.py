@@ -0,0 +1,371 @@
+import mmap
+import os
+import struct
+from dataclasses import dataclass
+from logging import getLogger
+from typing import TYPE_CHECKING
+
+from apiwrapper.models import ActionType, Command, CompassDirection, Coordinates, ShipData
+from game_search import GameSearch, SearchShip, SearchState, apply_actions
+from helpers import get_approximate_direction, get_direction_vector, get_optional_config
+from move_planner import ACTION_MOVE, ACTION_SHOOT, ACTION_TURN, PlannerAction, to_command
+
+if TYPE_CHECKING:
+    from apiwrapper.models import ClientContext
+    from world_model import WorldModel
+
+BOOK_TURNS = 8
+"""How many turns from the start of a match a generated book covers by default"""
+
+BOOK_TURN_RATES = 4
+"""The turn rates 1 to `BOOK_TURN_RATES` have their own lines in the book. The search considers the same turns for all
+turn rates from 4 up, so higher turn rates use the lines of the highest one."""
+
+ENEMY_ROW_BUCKETS = 6
+"""How many groups of rows the enemy starting row is divided into. One more bucket is for an unknown enemy row."""
+
+DEFAULT_SEARCH_DEPTH = 2
+"""The search depth used for both ships when generating a book by default"""
+
+_MAGIC = b"OPNBOOK1"
+_HEADER = struct.Struct("<8s6i")
+_RECORD = struct.Struct("<8B")
+_DIRECTION_VECTORS = [(get_direction_vector(direction).x, get_direction_vector(direction).y)
+                      for direction in CompassDirection]
+_START_HEALTH = 100
+
+# A book that failed to open is kept as None, so a missing or corrupt file is only tried and reported once
+_books: dict[str, "OpeningBook | None"] = {}
+_logger = getLogger("opening_book")
+
+
+@dataclass
+class OpeningLine:
+    """The book line a match follows, chosen on the first tick of the match
+
+    Attributes:
+        first_turn (int): the turn number of the first tick of the match
+        mirrored (bool): whether our ship started at the high x side, which is looked up as the mirror image of the low
+            x side
+        start_row (int): the starting row (y) of our ship
+        enemy_bucket (int): the bucket of the estimated enemy starting row, `ENEMY_ROW_BUCKETS` if unknown
+    """
+    first_turn: int
+    mirrored: bool
+    start_row: int
+    enemy_bucket: int
+
+
+class OpeningBook:
+    """Precomputed commands for the first turns of a match, read from a memory-mapped book file.
+
+    Matches start with the ships on opposite x sides of the map, facing each other, on random rows. The book holds the
+    command chosen by self-play search for each turn of the opening, for each turn rate, starting row of our ship and
+    bucket of the enemy starting row. Each command is stored in a fixed-size record with the state our ship is expected
+    to be in on that turn, so a lookup is one offset computation, and the command is only used if our ship is in the
+    expected state. A ship starting at the high x side is looked up as the mirror image of one at the low x side.
+
+    Attributes:
+        path (str): the path of the book file
+        width (int): the width of the map the book was generated for
+        height (int): the height of the map the book was generated for
+        turns (int): how many turns from the start of a match the book covers
+        start_margin (int): how many cells from the map edge the ships start
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._map) < _HEADER.size or self._map[:len(_MAGIC)] != _MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not an opening book file")
+        _, self.width, self.height, self.turns, self.start_margin, turn_rates, buckets = \
+            _HEADER.unpack_from(self._map)
+        if (turn_rates, buckets) != (BOOK_TURN_RATES, ENEMY_ROW_BUCKETS + 1) or \
+                len(self._map) != _HEADER.size + _get_record_count(self.height, self.turns) * _RECORD.size:
+            self.close()
+            raise ValueError(f"Opening book {path} does not match the book format")
+
+    def close(self):
+        """Release the memory map and close the file"""
+        self._map.close()
+        self._file.close()
+
+    def start_line(self, turn_number: int, width: int, height: int, own_ship: ShipData,
+                   enemy_row: int | None) -> OpeningLine | None:
+        """Choose the book line of a match on its first tick
+
+        Arguments:
+            turn_number (int): the turn number of the first tick
+            width (int): the width of the map
+            height (int): the height of the map
+            own_ship (ShipData): our ship on the first tick
+            enemy_row (int | None): the starting row (y) of the enemy, estimated for example from the audio signature,
+                `None` if unknown
+
+        Returns:
+            (OpeningLine | None): the line, `None` if the map or the starting position are not covered by the book
+        """
+        if (width, height) != (self.width, self.height):
+            return None
+        x, y, direction = own_ship.position.x, own_ship.position.y, own_ship.direction.value
+        if not 0 <= y < height:
+            return None
+        if x == self.start_margin:
+            mirrored = False
+        elif x == width - 1 - self.start_margin:
+            mirrored = True
+        else:
+            return None
+        if direction != _get_spawn_direction(x, width):
+            return None
+        return OpeningLine(turn_number, mirrored, y, get_enemy_bucket(enemy_row, height))
+
+    def get_command(self, line: OpeningLine, turn_number: int, turn_rate: int, own_ship: ShipData) -> Command | None:
+        """Look up the command of a tick of the opening
+
+        Arguments:
+            line (OpeningLine): the line of the match, see `start_line`
+            turn_number (int): the turn number of the tick
+            turn_rate (int): the turn rate of the game
+            own_ship (ShipData): our ship on the tick
+
+        Returns:
+            (Command | None): the book command, `None` if the turn is past the book or our ship is not in the state the
+            book expects
+        """
+        turn = turn_number - line.first_turn
+        if not 0 <= turn < self.turns or turn_rate < 1:
+            return None
+        offset = _HEADER.size + _get_record_index(min(turn_rate, BOOK_TURN_RATES) - 1, line.start_row,
+                                                  line.enemy_bucket, turn, self.height, self.turns) * _RECORD.size
+        valid, x, y, direction, heat, kind, first, second = _RECORD.unpack_from(self._map, offset)
+        own_x, own_direction = own_ship.position.x, own_ship.direction.value
+        if line.mirrored:
+            own_x, own_direction = self.width - 1 - own_x, _mirror_direction(own_direction)
+        if not valid or (own_x, own_ship.position.y, own_direction, own_ship.heat or 0) != (x, y, direction, heat):
+            return None
+        if kind == ACTION_TURN and line.mirrored:
+            first = _mirror_direction(first)
+        return to_command((kind, first, second))
+
+
+def get_enemy_bucket(enemy_row: int | None, height: int) -> int:
+    """Get the book bucket of an enemy starting row
+
+    Arguments:
+        enemy_row (int | None): the starting row of the enemy, `None` if unknown
+        height (int): the height of the map
+
+    Returns:
+        (int): the bucket between 0 and `ENEMY_ROW_BUCKETS` - 1, or `ENEMY_ROW_BUCKETS` for an unknown row
+    """
+    if enemy_row is None or not 0 <= enemy_row < height:
+        return ENEMY_ROW_BUCKETS
+    return enemy_row * ENEMY_ROW_BUCKETS // height
+
+
+def estimate_enemy_row(world_model: "WorldModel", width: int, height: int, start_margin: int) -> int | None:
+    """Estimate the starting row of the enemy from what has been seen and heard of it
+
+    Arguments:
+        world_model (WorldModel): the world model of the match, updated to the first tick
+        width (int): the width of the map
+        height (int): the height of the map
+        start_margin (int): how many cells from the map edge the ships start
+
+    Returns:
+        (int | None): the row of the enemy if it is visible, otherwise the row where the latest audio signature bearing
+        crosses the starting column of the enemy, `None` if neither is known
+    """
+    if world_model.enemy is not None:
+        return world_model.enemy.position.y
+    if not world_model.audio_bearings or world_model.own_ship is None:
+        return None
+    bearing = world_model.audio_bearings[-1]
+    origin, cell = bearing.origin, bearing.cell
+    enemy_x = width - 1 - start_margin if origin.x < width / 2 else start_margin
+    if cell.x == origin.x:
+        return None
+    row = origin.y + (cell.y - origin.y) * (enemy_x - origin.x) / (cell.x - origin.x)
+    return min(max(round(row), 0), height - 1)
+
+
+def get_opening_book(path: str | None = None) -> OpeningBook | None:
+    """Get the opening book, opening it on first use. The book is shared by all matches and bots of the process.
+
+    Arguments:
+        path (str | None): the path of the book file. If not given, the `opening_book` config is used
+
+    Returns:
+        (OpeningBook | None): the book, `None` if no book is configured or the book file could not be opened
+    """
+    if path is None:
+        path = get_optional_config("opening_book")
+    if path is None:
+        return None
+    if path in _books:
+        return _books[path]
+    try:
+        book = OpeningBook(path)
+    except (OSError, ValueError) as error:
+        _logger.error(f"Could not open opening book {path}, playing without it: {error}")
+        book = None
+    _books[path] = book
+    return book
+
+
+def get_opening_command(context: "ClientContext", world_model: "WorldModel") -> Command | None:
+    """Get the book command for the current tick of the match, if the match is still in the opening covered by the
+    book of the `opening_book` config
+
+    Arguments:
+        context (ClientContext): the context of the current game
+        world_model (WorldModel): the world model of the match, updated to the current tick
+
+    Returns:
+        (Command | None): the book command, `None` if there is no book, the opening is over or the match left the book
+    """
+    book = get_opening_book()
+    own_ship = world_model.own_ship
+    if book is None or own_ship is None or world_model.geometry is None or world_model.turn_number is None:
+        return None
+    width, height = world_model.geometry.width, world_model.geometry.height
+    line = getattr(context, "opening_line", None)
+    if line is None:
+        enemy_row = estimate_enemy_row(world_model, width, height, book.start_margin)
+        # A match that does not start from a book position is marked with False, so it is only checked once
+        line = book.start_line(world_model.turn_number, width, height, own_ship, enemy_row) or False
+        context.opening_line = line
+    if line is False:
+        return None
+    return book.get_command(line, world_model.turn_number, context.turn_rate, own_ship)
+
+
+def _get_record_count(height: int, turns: int) -> int:
+    return BOOK_TURN_RATES * height * (ENEMY_ROW_BUCKETS + 1) * turns
+
+
+def _get_record_index(rate_index: int, own_row: int, enemy_bucket: int, turn: int, height: int, turns: int) -> int:
+    return ((rate_index * height + own_row) * (ENEMY_ROW_BUCKETS + 1) + enemy_bucket) * turns + turn
+
+
+def _mirror_direction(direction: int) -> int:
+    # Mirroring over the middle column negates the x component of the direction vector
+    dx, dy = _DIRECTION_VECTORS[direction]
+    return _DIRECTION_VECTORS.index((-dx, dy))
+
+
+def _to_planner_action(command: Command) -> PlannerAction:
+    payload = command.payload
+    if command.action == ActionType.Move:
+        return ACTION_MOVE, payload.distance, 0
+    if command.action == ActionType.Turn:
+        return ACTION_TURN, payload.direction.value, 0
+    return ACTION_SHOOT, payload.mass, payload.speed
+
+
+def _get_spawn_direction(x: int, width: int) -> int:
+    # The ships start facing each other across the map, so towards the middle from the side they start on
+    return get_approximate_direction(Coordinates(1 if x < width / 2 else -1, 0)).value
+
+
+def _to_search_action(action: PlannerAction, direction: int) -> PlannerAction:
+    # The search simulates turns as offsets from the current direction
+    kind, first, second = action
+    if kind != ACTION_TURN:
+        return action
+    offset = (first - direction) % 8
+    return ACTION_TURN, offset - 8 if offset > 4 else offset, 0
+
+
+def _play_line(width: int, height: int, turns: int, depth: int, start_margin: int, turn_rate: int, own_row: int,
+               enemy_row: int) -> bytes:
+    # The book is generated for the ship starting at the low x side
+    own: SearchShip = (start_margin, own_row, _get_spawn_direction(start_margin, width), 0, _START_HEALTH)
+    enemy_x = width - 1 - start_margin
+    enemy: SearchShip = (enemy_x, enemy_row, _get_spawn_direction(enemy_x, width), 0, _START_HEALTH)
+    state: SearchState = (own, enemy, ())
+    own_search = GameSearch(width, height, turn_rate)
+    enemy_search = GameSearch(width, height, turn_rate)
+    records = []
+    for _ in range(turns):
+        own_command = own_search.search(state, max_depth=depth).command
+        enemy_command = enemy_search.search((state[1], state[0], state[2]), max_depth=depth).command
+        if own_command is None or enemy_command is None:
+            break
+        x, y, direction, heat, _ = state[0]
+        own_action = _to_planner_action(own_command)
+        records.append(_RECORD.pack(1, x, y, direction, heat, *own_action))
+        state = apply_actions(state, _to_search_action(own_action, direction),
+                              _to_search_action(_to_planner_action(enemy_command), state[1][2]), width, height)
+    records += [bytes(_RECORD.size)] * (turns - len(records))
+    return b"".join(records)
+
+
+def _generate_row(task: tuple[int, int, int, int, int, int, int]) -> bytes:
+    width, height, turns, depth, start_margin, turn_rate, own_row = task
+    lines = []
+    for bucket in range(ENEMY_ROW_BUCKETS + 1):
+        # Each bucket is played against an enemy in its middle row, the unknown bucket against one in the map middle
+        if bucket == ENEMY_ROW_BUCKETS:
+            enemy_row = height // 2
+        else:
+            enemy_row = min((2 * bucket + 1) * height // (2 * ENEMY_ROW_BUCKETS), height - 1)
+        lines.append(_play_line(width, height, turns, depth, start_margin, turn_rate, own_row, enemy_row))
+    return b"".join(lines)
+
+
+def generate_book(path: str, width: int = 30, height: int = 30, turns: int = BOOK_TURNS,
+                  depth: int = DEFAULT_SEARCH_DEPTH, start_margin: int = 0, workers: int = 1):
+    """Generate an opening book by self-play: both ships choose their commands with `game_search.GameSearch` from each
+    starting position the book covers, and the commands of the ship at the low x side are recorded
+
+    Arguments:
+        path (str): the path of the book file to write
+        width (int): the width of the map
+        height (int): the height of the map
+        turns (int): how many turns from the start of a match to cover
+        depth (int): the search depth of both ships
+        start_margin (int): how many cells from the map edge the ships start
+        workers (int): the amount of worker processes, the starting rows are spread over them
+    """
+    tasks = [(width, height, turns, depth, start_margin, turn_rate, own_row)
+             for turn_rate in range(1, BOOK_TURN_RATES + 1) for own_row in range(height)]
+    if workers <= 1:
+        rows = [_generate_row(task) for task in tasks]
+    else:
+        # Imported here, as the bots import this module at startup only to read books
+        from multiprocessing import Pool
+        with Pool(workers) as pool:
+            rows = pool.map(_generate_row, tasks)
+    temporary_path = path + ".tmp"
+    with open(temporary_path, "wb") as book_file:
+        book_file.write(_HEADER.pack(_MAGIC, width, height, turns, start_margin, BOOK_TURN_RATES,
+                                     ENEMY_ROW_BUCKETS + 1))
+        book_file.writelines(rows)
+    # Running bots keep reading the previous book through their memory maps
+    os.replace(temporary_path, path)
+
+
+def main():  # pragma: no cover -- command line entry point
+    import argparse
+    parser = argparse.ArgumentParser(description="Generate an opening book by self-play search")
+    parser.add_argument("path", help="the book file to write")
+    parser.add_argument("--width", type=int, default=30, help="the width of the map")
+    parser.add_argument("--height", type=int, default=30, help="the height of the map")
+    parser.add_argument("--turns", type=int, default=BOOK_TURNS, help="turns from the start of a match to cover")
+    parser.add_argument("--depth", type=int, default=DEFAULT_SEARCH_DEPTH, help="the search depth of both ships")
+    parser.add_argument("--start-margin", type=int, default=0, help="cells from the map edge the ships start")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="worker processes, starting rows are sharded between them")
+    arguments = parser.parse_args()
+    generate_book(arguments.path, arguments.width, arguments.height, arguments.turns, arguments.depth,
+                  arguments.start_margin, arguments.workers)
+    print(f"Wrote an opening book of {arguments.turns} turns for a {arguments.width}x{arguments.height} map to "
+          f"{arguments.path}")
+
+
+if __name__ == '__main__':
+    main()
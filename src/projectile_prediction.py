@@ -0,0 +1,217 @@
+from typing import cast
+
+from apiwrapper.models import Cell, CellType, Coordinates, GameState, HitBoxData, ProjectileData
+from helpers import get_direction_vector
+
+DEFAULT_HORIZON = 8
+"""How many ticks ahead (including the current tick) the danger map predicts by default"""
+
+
+class _ProjectileTrack:
+
+    def __init__(self, projectile: ProjectileData, footprint: list[tuple[int, int]], observed_turn: int):
+        direction = get_direction_vector(projectile.direction)
+        self.x = projectile.position.x
+        self.y = projectile.position.y
+        self.dx = direction.x
+        self.dy = direction.y
+        self.speed = projectile.speed
+        self.damage = get_projectile_damage(projectile)
+        self.footprint = footprint
+        self.observed_turn = observed_turn
+        self.contributions: dict[int, list[int]] = {}
+
+    def get_center(self, turn: int) -> tuple[int, int]:
+        steps = (turn - self.observed_turn) * self.speed
+        return self.x + self.dx * steps, self.y + self.dy * steps
+
+    def get_swept_steps(self, turn: int) -> range:
+        ticks = turn - self.observed_turn
+        if ticks == 0:
+            return range(0, 1)
+        return range((ticks - 1) * self.speed + 1, ticks * self.speed + 1)
+
+
+def get_projectile_damage(projectile: ProjectileData) -> int:
+    """Get the damage the given projectile deals on hit
+
+    Arguments:
+        projectile (ProjectileData): the projectile to calculate the damage for
+
+    Returns:
+        (int): the damage dealt, `mass * 2 + speed`
+    """
+    return projectile.mass * 2 + projectile.speed
+
+
+def predict_projectile_positions(projectiles: list[ProjectileData], ticks: int) -> dict[str, list[Coordinates]]:
+    """Advance all given projectiles the given amount of ticks ahead in one pass
+
+    Arguments:
+        projectiles (list[ProjectileData]): the projectiles to advance
+        ticks (int): how many ticks ahead to predict
+
+    Returns:
+        (dict[str, list[Coordinates]]): the predicted positions per projectile id. The list at index `k` is the position
+        after `k` ticks, so index 0 is the current position. Positions are not clamped to the map.
+    """
+    predictions = {}
+    for projectile in projectiles:
+        direction = get_direction_vector(projectile.direction)
+        x, y, speed = projectile.position.x, projectile.position.y, projectile.speed
+        predictions[projectile.id] = [Coordinates(x + direction.x * speed * tick, y + direction.y * speed * tick)
+                                      for tick in range(ticks + 1)]
+    return predictions
+
+
+class DangerMap:
+    """Predicted projectile damage per map cell for the current and upcoming ticks.
+
+    The map is updated incrementally: projectiles that move as predicted keep their existing contributions and only the
+    newest tick of the horizon is computed for them. Projectiles that appear, change course or vanish are re-predicted
+    or removed. Projectiles that fly out of vision are kept on their predicted course.
+
+    Danger at `ticks_ahead = 0` is the damage of the projectiles occupying a cell right now. Danger at `ticks_ahead = k`
+    is the damage of the projectiles passing through or stopping at a cell during the k:th upcoming tick.
+
+    Attributes:
+        width (int): the width of the tracked map
+        height (int): the height of the tracked map
+        horizon (int): how many ticks (including the current tick) are predicted
+        turn_number (int | None): the turn number of the latest update, `None` before the first update
+    """
+
+    def __init__(self, width: int, height: int, horizon: int = DEFAULT_HORIZON):
+        self.width = width
+        self.height = height
+        self.horizon = horizon
+        self.turn_number: int | None = None
+        self._layers: list[dict[int, int]] = [{} for _ in range(horizon)]
+        self._tracks: dict[str, _ProjectileTrack] = {}
+
+    def get_danger(self, x: int, y: int, ticks_ahead: int) -> int:
+        """Get the expected projectile damage in a cell at the given amount of ticks from the latest update
+
+        Arguments:
+            x (int): the x coordinate of the cell
+            y (int): the y coordinate of the cell
+            ticks_ahead (int): how many ticks ahead of the latest update to look, between 0 and `horizon - 1`
+
+        Returns:
+            (int): the summed damage of all projectiles predicted to hit the cell on that tick
+        """
+        if self.turn_number is None or not 0 <= ticks_ahead < self.horizon:
+            raise ValueError(f"Danger can only be queried for 0 to {self.horizon - 1} ticks ahead of an update")
+        return self._layers[(self.turn_number + ticks_ahead) % self.horizon].get(y * self.width + x, 0)
+
+    def is_safe(self, x: int, y: int, ticks_ahead: int) -> bool:
+        """Check whether no projectile is predicted to hit the given cell at the given amount of ticks ahead
+
+        Arguments:
+            x (int): the x coordinate of the cell
+            y (int): the y coordinate of the cell
+            ticks_ahead (int): how many ticks ahead of the latest update to look, between 0 and `horizon - 1`
+
+        Returns:
+            (bool): `True` if no danger is predicted for the cell, otherwise `False`
+        """
+        return self.get_danger(x, y, ticks_ahead) == 0
+
+    def update(self, game_state: GameState):
+        """Update the danger map to the given game state
+
+        Arguments:
+            game_state (GameState): the state of the current tick
+        """
+        turn = game_state.turn_number
+        if self.turn_number is None or not 0 <= turn - self.turn_number < self.horizon:
+            self._reset()
+            first_new_turn = turn
+        else:
+            first_new_turn = self.turn_number + self.horizon
+            self._expire_turns(self.turn_number, turn)
+        self.turn_number = turn
+        projectiles, footprints = _collect_projectiles(game_state.game_map)
+        self._reconcile(game_state.game_map, projectiles, footprints)
+        for track in self._tracks.values():
+            if track.observed_turn != turn:
+                self._add_contributions(track, first_new_turn, turn + self.horizon)
+
+    def _reset(self):
+        for layer in self._layers:
+            layer.clear()
+        self._tracks.clear()
+
+    def _expire_turns(self, start: int, end: int):
+        for turn in range(start, end):
+            self._layers[turn % self.horizon].clear()
+            for track in self._tracks.values():
+                track.contributions.pop(turn, None)
+
+    def _reconcile(self, game_map: list[list[Cell]], projectiles: list[ProjectileData],
+                   footprints: dict[str, list[tuple[int, int]]]):
+        turn = cast(int, self.turn_number)
+        seen = set()
+        for projectile in projectiles:
+            seen.add(projectile.id)
+            track = self._tracks.get(projectile.id)
+            if track is not None and track.get_center(turn) == (projectile.position.x, projectile.position.y) \
+                    and get_direction_vector(projectile.direction) == Coordinates(track.dx, track.dy):
+                continue
+            if track is not None:
+                self._remove_contributions(track)
+            track = _ProjectileTrack(projectile, footprints.get(projectile.id, []), turn)
+            self._tracks[projectile.id] = track
+            self._add_contributions(track, turn, turn + self.horizon)
+        for projectile_id in [projectile_id for projectile_id in self._tracks if projectile_id not in seen]:
+            track = self._tracks[projectile_id]
+            x, y = track.get_center(turn)
+            if not self._is_on_map(x, y) or game_map[y][x].cell_type != CellType.OutOfVision:
+                self._remove_contributions(track)
+                del self._tracks[projectile_id]
+
+    def _add_contributions(self, track: _ProjectileTrack, start: int, end: int):
+        for turn in range(start, end):
+            cells = []
+            layer = self._layers[turn % self.horizon]
+            for step in track.get_swept_steps(turn):
+                center_x, center_y = track.x + track.dx * step, track.y + track.dy * step
+                if not self._is_on_map(center_x, center_y):
+                    break
+                for offset_x, offset_y in [(0, 0)] + track.footprint:
+                    x, y = center_x + offset_x, center_y + offset_y
+                    if self._is_on_map(x, y):
+                        index = y * self.width + x
+                        layer[index] = layer.get(index, 0) + track.damage
+                        cells.append(index)
+            track.contributions[turn] = cells
+
+    def _remove_contributions(self, track: _ProjectileTrack):
+        for turn, cells in track.contributions.items():
+            layer = self._layers[turn % self.horizon]
+            for index in cells:
+                remaining = layer[index] - track.damage
+                if remaining:
+                    layer[index] = remaining
+                else:
+                    del layer[index]
+        track.contributions.clear()
+
+    def _is_on_map(self, x: int, y: int) -> bool:
+        return 0 <= x < self.width and 0 <= y < self.height
+
+
+def _collect_projectiles(game_map: list[list[Cell]]) -> tuple[list[ProjectileData], dict[str, list[tuple[int, int]]]]:
+    projectiles = []
+    hit_boxes: dict[str, list[tuple[int, int]]] = {}
+    for y, row in enumerate(game_map):
+        for x, cell in enumerate(row):
+            if cell.cell_type == CellType.Projectile:
+                projectiles.append(cast(ProjectileData, cell.data))
+            elif cell.cell_type == CellType.HitBox:
+                hit_boxes.setdefault(cast(HitBoxData, cell.data).entity_id, []).append((x, y))
+    footprints = {}
+    for projectile in projectiles:
+        footprints[projectile.id] = [(x - projectile.position.x, y - projectile.position.y)
+                                     for x, y in hit_boxes.get(projectile.id, [])]
+    return projectiles, footprints
@@ -0,0 +1,285 @@
+import argparse
+import ast
+import os
+import sys
+import zipfile
+from array import array
+from multiprocessing import Pool
+from typing import Iterable, Iterator
+
+from apiwrapper.json_codec import get_codec
+from apiwrapper.replay import OUTCOME_UNKNOWN
+
+DEFAULT_CHUNK_ROWS = 8192
+"""How many tick rows are buffered before they are written out as one shard"""
+
+TICK_COLUMNS = ("match_id", "turn_number",
+                "own_x", "own_y", "own_direction", "own_heat", "own_health",
+                "enemy_visible", "enemy_x", "enemy_y", "enemy_direction", "enemy_heat", "enemy_health",
+                "projectile_count",
+                "command_action", "command_first", "command_second",
+                "outcome")
+"""The per-tick columns of an exported shard. Missing values (invisible enemy, unknown health, no command) are -1.
+`command_action` is 0 for move, 1 for turn and 2 for shoot. `command_first` is the move distance, the turn direction
+value or the shot mass, and `command_second` is the shot speed."""
+
+PROJECTILE_COLUMNS = ("projectile_row", "projectile_x", "projectile_y", "projectile_direction", "projectile_speed",
+                      "projectile_mass")
+"""The per-projectile columns of an exported shard. `projectile_row` is the index of the tick row in the same shard"""
+
+_DIRECTION_VALUES = {"n": 0, "ne": 1, "e": 2, "se": 3, "s": 4, "sw": 5, "w": 6, "nw": 7}
+_ACTION_VALUES = {"move": 0, "turn": 1, "shoot": 2}
+_MISSING_SHIP = (-1, -1, -1, -1, -1)
+_NPY_MAGIC = b"\x93NUMPY\x01\x00"
+_INT32_TYPE = "i" if array("i").itemsize == 4 else "l"
+_CODEC = get_codec()
+
+
+def iter_replay_records(path: str) -> Iterator[dict]:
+    """Read the records of a replay file one at a time
+
+    Arguments:
+        path (str): the path of the replay file, see `apiwrapper.replay.ReplayRecorder`
+
+    Returns:
+        (Iterator[dict]): the records in file order
+    """
+    with open(path, "rb") as replay_file:
+        for line in replay_file:
+            if line.strip():
+                yield _CODEC.decode(line)
+
+
+def read_replay_outcome(path: str) -> int:
+    """Read the outcome of a replay from its last record without reading the whole file
+
+    Arguments:
+        path (str): the path of the replay file
+
+    Returns:
+        (int): the outcome, `apiwrapper.replay.OUTCOME_UNKNOWN` if the replay has no end record
+    """
+    with open(path, "rb") as replay_file:
+        replay_file.seek(0, os.SEEK_END)
+        size = replay_file.tell()
+        replay_file.seek(max(size - 4096, 0))
+        lines = replay_file.read().splitlines()
+    if not lines:
+        return OUTCOME_UNKNOWN
+    try:
+        record = _CODEC.decode(lines[-1])
+    except ValueError:
+        return OUTCOME_UNKNOWN
+    if record.get("eventType") != "endGame":
+        return OUTCOME_UNKNOWN
+    return record["outcome"]
+
+
+def iter_replay_rows(path: str, match_id: int) -> Iterator[tuple[tuple[int, ...], list[tuple[int, ...]]]]:
+    """Convert the ticks of a replay to dataset rows one tick at a time
+
+    Arguments:
+        path (str): the path of the replay file
+        match_id (int): the id to store in the `match_id` column
+
+    Returns:
+        (Iterator[tuple[tuple[int, ...], list[tuple[int, ...]]]]): for each tick the values of `TICK_COLUMNS` and the
+        values of `PROJECTILE_COLUMNS` (without `projectile_row`) for each projectile
+    """
+    outcome = read_replay_outcome(path)
+    own_ship_id = None
+    for record in iter_replay_records(path):
+        if record["eventType"] == "startGame":
+            own_ship_id = record["shipId"]
+        elif record["eventType"] == "gameTick":
+            yield _to_row(record, own_ship_id, match_id, outcome)
+
+
+def _to_row(record: dict, own_ship_id: str | None, match_id: int,
+            outcome: int) -> tuple[tuple[int, ...], list[tuple[int, ...]]]:
+    state = record["data"]
+    own = _MISSING_SHIP
+    enemy = _MISSING_SHIP
+    projectiles = []
+    for row in state["gameMap"]:
+        for cell in row:
+            cell_type = cell["type"]
+            if cell_type == "ship":
+                data = cell["data"]
+                ship = (data["position"]["x"], data["position"]["y"], _DIRECTION_VALUES[data["direction"]],
+                        _or_missing(data["heat"]), _or_missing(data["health"]))
+                if data["id"] == own_ship_id:
+                    own = ship
+                else:
+                    enemy = ship
+            elif cell_type == "projectile":
+                data = cell["data"]
+                projectiles.append((data["position"]["x"], data["position"]["y"], _DIRECTION_VALUES[data["direction"]],
+                                    data["speed"], data["mass"]))
+    command = _to_command_values(record.get("command"))
+    values = (match_id, state["turnNumber"]) + own + (int(enemy is not _MISSING_SHIP),) + enemy \
+        + (len(projectiles),) + command + (outcome,)
+    return values, projectiles
+
+
+def _or_missing(value: int | None) -> int:
+    return -1 if value is None else value
+
+
+def _to_command_values(command: dict | None) -> tuple[int, int, int]:
+    if command is None:
+        return -1, -1, -1
+    payload = command["payload"]
+    action = command["action"]
+    if action == "move":
+        return _ACTION_VALUES[action], payload["distance"], 0
+    if action == "turn":
+        return _ACTION_VALUES[action], _DIRECTION_VALUES[payload["direction"]], 0
+    return _ACTION_VALUES[action], payload["mass"], payload["speed"]
+
+
+class ShardWriter:
+    """Buffers dataset rows and writes them out as compressed columnar shards.
+
+    Each shard is an `.npz` file (a deflate-compressed zip with one `.npy` member per column of little-endian 32-bit
+    integers) that can be read with `numpy.load` or, without NumPy, with `load_shard`. At most `chunk_rows` tick rows are
+    held in memory at a time.
+
+    Attributes:
+        output_directory (str): the directory the shards are written to
+        prefix (str): the file name prefix of the shards
+        chunk_rows (int): how many tick rows are written per shard
+        shard_paths (list[str]): the paths of the shards written so far
+        rows_written (int): how many tick rows have been written so far
+    """
+
+    def __init__(self, output_directory: str, prefix: str = "shard", chunk_rows: int = DEFAULT_CHUNK_ROWS):
+        self.output_directory = output_directory
+        self.prefix = prefix
+        self.chunk_rows = chunk_rows
+        self.shard_paths: list[str] = []
+        self.rows_written = 0
+        self._reset()
+
+    def write(self, values: tuple[int, ...], projectiles: list[tuple[int, ...]]):
+        """Add a tick row, writing a shard if the buffer is full
+
+        Arguments:
+            values (tuple[int, ...]): the values of `TICK_COLUMNS`
+            projectiles (list[tuple[int, ...]]): the values of `PROJECTILE_COLUMNS` without `projectile_row`
+        """
+        row_index = len(self._tick_columns[0])
+        for column, value in zip(self._tick_columns, values):
+            column.append(value)
+        for projectile in projectiles:
+            self._projectile_columns[0].append(row_index)
+            for column, value in zip(self._projectile_columns[1:], projectile):
+                column.append(value)
+        if row_index + 1 >= self.chunk_rows:
+            self.flush()
+
+    def flush(self):
+        """Write the buffered rows as a shard, if there are any"""
+        rows = len(self._tick_columns[0])
+        if rows == 0:
+            return
+        os.makedirs(self.output_directory, exist_ok=True)
+        path = os.path.join(self.output_directory, f"{self.prefix}-{len(self.shard_paths):05d}.npz")
+        with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED) as shard:
+            for name, column in zip(TICK_COLUMNS + PROJECTILE_COLUMNS,
+                                    self._tick_columns + self._projectile_columns):
+                shard.writestr(f"{name}.npy", _to_npy(column))
+        self.shard_paths.append(path)
+        self.rows_written += rows
+        self._reset()
+
+    def _reset(self):
+        self._tick_columns = [array(_INT32_TYPE) for _ in TICK_COLUMNS]
+        self._projectile_columns = [array(_INT32_TYPE) for _ in PROJECTILE_COLUMNS]
+
+
+def _to_npy(column: array) -> bytes:
+    if sys.byteorder == "big":
+        column = array(column.typecode, column)
+        column.byteswap()
+    header = f"{{'descr': '<i4', 'fortran_order': False, 'shape': ({len(column)},), }}"
+    # The header is padded so that the data starts at a multiple of 64 bytes, as the format specifies
+    padding = 64 - (len(_NPY_MAGIC) + 2 + len(header) + 1) % 64
+    header = header + " " * (padding % 64) + "\n"
+    return _NPY_MAGIC + len(header).to_bytes(2, "little") + header.encode("latin1") + column.tobytes()
+
+
+def load_shard(path: str) -> dict[str, array]:
+    """Read a shard written by `ShardWriter` without NumPy
+
+    Arguments:
+        path (str): the path of the shard
+
+    Returns:
+        (dict[str, array]): the columns of the shard by name
+    """
+    columns = {}
+    with zipfile.ZipFile(path, "r") as shard:
+        for member in shard.namelist():
+            data = shard.read(member)
+            header_length = int.from_bytes(data[len(_NPY_MAGIC):len(_NPY_MAGIC) + 2], "little")
+            header = ast.literal_eval(data[len(_NPY_MAGIC) + 2:len(_NPY_MAGIC) + 2 + header_length].decode("latin1"))
+            column = array(_INT32_TYPE)
+            column.frombytes(data[len(_NPY_MAGIC) + 2 + header_length:])
+            if sys.byteorder == "big":
+                column.byteswap()
+            assert len(column) == header["shape"][0], f"Corrupted column {member} in shard {path}"
+            columns[member.removesuffix(".npy")] = column
+    return columns
+
+
+def export_replays(replay_paths: Iterable[str], output_directory: str, chunk_rows: int = DEFAULT_CHUNK_ROWS,
+                   workers: int = 1) -> int:
+    """Export replays into compressed columnar shards, streaming one tick at a time
+
+    With one worker all matches go into a shared sequence of shards. With more workers the matches are spread over a
+    process pool and each match is written into its own shards, so no rows need to be passed between processes.
+
+    Arguments:
+        replay_paths (Iterable[str]): the replay files to export, match ids are given in this order starting from 0
+        output_directory (str): the directory to write the shards into
+        chunk_rows (int): the maximum amount of tick rows per shard
+        workers (int): the amount of worker processes to use
+
+    Returns:
+        (int): the amount of tick rows exported
+    """
+    if workers <= 1:
+        writer = ShardWriter(output_directory, chunk_rows=chunk_rows)
+        for match_id, path in enumerate(replay_paths):
+            for values, projectiles in iter_replay_rows(path, match_id):
+                writer.write(values, projectiles)
+        writer.flush()
+        return writer.rows_written
+    tasks = ((path, match_id, output_directory, chunk_rows) for match_id, path in enumerate(replay_paths))
+    with Pool(workers) as pool:
+        return sum(pool.imap_unordered(_export_match, tasks))
+
+
+def _export_match(task: tuple[str, int, str, int]) -> int:
+    path, match_id, output_directory, chunk_rows = task
+    writer = ShardWriter(output_directory, prefix=f"match-{match_id:06d}", chunk_rows=chunk_rows)
+    for values, projectiles in iter_replay_rows(path, match_id):
+        writer.write(values, projectiles)
+    writer.flush()
+    return writer.rows_written
+
+
+def main():  # pragma: no cover -- command line entry point
+    parser = argparse.ArgumentParser(description="Export recorded replays into compressed columnar dataset shards")
+    parser.add_argument("output_directory", help="the directory to write the shards into")
+    parser.add_argument("replays", nargs="+", help="the replay files to export")
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS, help="tick rows per shard")
+    parser.add_argument("--workers", type=int, default=1, help="worker processes, matches are sharded between them")
+    arguments = parser.parse_args()
+    rows = export_replays(arguments.replays, arguments.output_directory, arguments.chunk_rows, arguments.workers)
+    print(f"Exported {rows} ticks from {len(arguments.replays)} replays into {arguments.output_directory}")
+
+
+if __name__ == '__main__':
+    main()
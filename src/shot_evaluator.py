@@ -0,0 +1,103 @@
+from dataclasses import dataclass
+
+from apiwrapper.models import CompassDirection, Coordinates
+from bitboard import BoardGeometry
+from move_planner import MAX_HEAT
+
+SHOT_OPTIONS = tuple((mass, speed) for mass in range(1, 5) for speed in range(1, 5))
+"""Every allowed (mass, speed) combination of a shot"""
+
+DEFAULT_SHOT_HORIZON = 8
+"""How many ticks after firing a projectile is followed by default"""
+
+
+@dataclass
+class ShotEvaluation:
+    """The expected outcome of firing a shot
+
+    Attributes:
+        mass (int): the mass of the projectile
+        speed (int): the speed of the projectile
+        hit_probability (float): the estimated probability of the projectile hitting the enemy within the horizon
+        damage (int): the damage a hit deals, `mass * 2 + speed`
+        expected_damage (float): the damage times the hit probability
+        heat (int): the heat firing generates, `mass * speed`
+        overheat_damage (int): the damage our ship takes from the heat exceeding the maximum heat
+    """
+    mass: int
+    speed: int
+    hit_probability: float
+    damage: int
+    expected_damage: float
+    heat: int
+    overheat_damage: int
+
+
+def evaluate_shots(geometry: BoardGeometry, origin: Coordinates, direction: CompassDirection, enemy_mask: int,
+                   enemy_direction: CompassDirection | None, turn_rate: int, heat: int = 0,
+                   horizon: int = DEFAULT_SHOT_HORIZON) -> list[ShotEvaluation]:
+    """Score every shot option against the cells the enemy can reach while the projectile flies
+
+    The enemy positions after each tick are the reachable sets of `BoardGeometry.reach_masks`, and the enemy is assumed
+    to be in any of the reachable cells with equal probability, independently on each tick. Each tick the projectile is
+    checked against the cells it sweeps on that tick, so the hit probability of a speed is shared by all masses.
+
+    Arguments:
+        geometry (BoardGeometry): the precomputed masks for the map size
+        origin (Coordinates): the position of our ship
+        direction (CompassDirection): the direction our ship is facing, which is the direction of the shot
+        enemy_mask (int): the mask of the cells the enemy can currently be in, a single bit if it is in vision
+        enemy_direction (CompassDirection | None): the direction the enemy is facing, `None` if it is not known
+        turn_rate (int): the turn rate of the game
+        heat (int): the current heat of our ship
+        horizon (int): how many ticks after firing the projectile is followed
+
+    Returns:
+        (list[ShotEvaluation]): the evaluation of each option in `SHOT_OPTIONS` order
+    """
+    reach = geometry.reach_masks(enemy_mask, enemy_direction, horizon + 1, turn_rate)
+    reach_sizes = [mask.bit_count() for mask in reach]
+    path = []
+    cell = geometry.shift(geometry.bit(origin.x, origin.y), direction.value)
+    while cell:
+        path.append(cell)
+        cell = geometry.shift(cell, direction.value)
+    hit_probabilities = {speed: _get_hit_probability(path, reach, reach_sizes, speed, horizon)
+                         for speed in range(1, 5)}
+    evaluations = []
+    for mass, speed in SHOT_OPTIONS:
+        damage = mass * 2 + speed
+        hit_probability = hit_probabilities[speed]
+        evaluations.append(ShotEvaluation(mass, speed, hit_probability, damage, hit_probability * damage, mass * speed,
+                                          max(heat + mass * speed - MAX_HEAT, 0)))
+    return evaluations
+
+
+def _get_hit_probability(path: list[int], reach: list[int], reach_sizes: list[int], speed: int, horizon: int) -> float:
+    miss_probability = 1.0
+    # The projectile appears on the first path cell on the tick it is fired, and then sweeps `speed` cells per tick.
+    # Ships act before projectiles move, so on tick `k` the enemy has acted `k + 1` times.
+    start, end = 0, 1
+    for tick in range(horizon + 1):
+        if start >= len(path):
+            break
+        if reach_sizes[tick + 1]:
+            swept = 0
+            for cell in path[start:end]:
+                swept |= cell
+            miss_probability *= 1 - (swept & reach[tick + 1]).bit_count() / reach_sizes[tick + 1]
+        start, end = end, end + speed
+    return 1 - miss_probability
+
+
+def choose_shot(evaluations: list[ShotEvaluation]) -> ShotEvaluation:
+    """Choose the shot with the best expected damage to the enemy after subtracting the overheat damage to our ship
+
+    Arguments:
+        evaluations (list[ShotEvaluation]): the evaluated options, see `evaluate_shots`
+
+    Returns:
+        (ShotEvaluation): the best option, the one generating the least heat on ties
+    """
+    return max(evaluations, key=lambda evaluation: (evaluation.expected_damage - evaluation.overheat_damage,
+                                                    -evaluation.heat))
@@ -0,0 +1,222 @@
+from dataclasses import replace
+from threading import Event
+from time import perf_counter
+from typing import TYPE_CHECKING, Any, Hashable, cast
+
+from apiwrapper.models import ActionType, CellType, Command, Coordinates, GameState, MoveActionData, ShipData, \
+    ShootActionData, TurnActionData
+from helpers import get_direction_vector, get_own_ship_id
+from move_planner import MovePlan, plan_moves, to_planner_state
+from projectile_prediction import DangerMap
+
+if TYPE_CHECKING:
+    from apiwrapper.models import ClientContext
+
+SPECULATION_TIME_SHARE = 0.5
+"""The share of the tick length that speculative planning may take in the idle time after a command has been sent"""
+
+_ENEMY_MOVES = 4
+
+
+class SpeculationCache:
+    """Results computed ahead of time for an upcoming turn, filled by the precompute hook between ticks and read by
+    `process_tick` on the turn. Storing a result for a later turn drops the results of earlier turns.
+
+    The precompute hook runs in a background thread, so the cache swaps whole turns at once instead of mutating shared
+    state, and a lookup always sees either the old or the new turn.
+
+    Attributes:
+        hits (int): how many lookups found a result
+        misses (int): how many lookups found nothing
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self._turn: tuple[int | None, dict[Hashable, Any]] = (None, {})
+
+    def put(self, turn_number: int, key: Hashable, value: Any):
+        """Store a result for a turn. Results for turns earlier than the latest stored turn are ignored.
+
+        Arguments:
+            turn_number (int): the turn the result is for
+            key (Hashable): the key of the result, for example the predicted state it was computed for
+            value (Any): the result
+        """
+        stored_turn, entries = self._turn
+        if stored_turn is not None and turn_number < stored_turn:
+            return
+        if stored_turn != turn_number:
+            entries = {}
+            self._turn = (turn_number, entries)
+        entries[key] = value
+
+    def get(self, turn_number: int, key: Hashable, default: Any = None) -> Any:
+        """Look up a result for a turn
+
+        Arguments:
+            turn_number (int): the current turn
+            key (Hashable): the key the result was stored with
+            default (Any): the value to return if there is no result
+
+        Returns:
+            (Any): the stored result, or `default` if nothing was stored for the turn and key
+        """
+        stored_turn, entries = self._turn
+        if stored_turn == turn_number and key in entries:
+            self.hits += 1
+            return entries[key]
+        self.misses += 1
+        return default
+
+
+def get_speculation_cache(context: "ClientContext") -> SpeculationCache:
+    """Get the speculation cache kept in the context, creating it on first use
+
+    Arguments:
+        context (ClientContext): the context of the current game
+
+    Returns:
+        (SpeculationCache): the cache of the match
+    """
+    cache = getattr(context, "speculation_cache", None)
+    if cache is None:
+        cache = SpeculationCache()
+        context.speculation_cache = cache
+    return cache
+
+
+def predict_own_ship(ship: ShipData, command: Command | None, width: int, height: int) -> ShipData:
+    """Predict our ship on the next tick from the command sent on this tick, ignoring collisions and hits
+
+    Arguments:
+        ship (ShipData): our ship on this tick
+        command (Command | None): the command sent on this tick, `None` for move 0
+        width (int): the width of the map
+        height (int): the height of the map
+
+    Returns:
+        (ShipData): the predicted ship
+    """
+    if command is None:
+        return ship
+    if command.action == ActionType.Turn:
+        return replace(ship, direction=cast(TurnActionData, command.payload).direction)
+    if command.action == ActionType.Shoot:
+        shot = cast(ShootActionData, command.payload)
+        return replace(ship, heat=(ship.heat or 0) + shot.mass * shot.speed)
+    vector = get_direction_vector(ship.direction)
+    position = ship.position
+    moved = 0
+    for _ in range(cast(MoveActionData, command.payload).distance):
+        x, y = position.x + vector.x, position.y + vector.y
+        if not (0 <= x < width and 0 <= y < height):
+            break
+        position = replace(position, x=x, y=y)
+        moved += 1
+    return replace(ship, position=position, heat=max((ship.heat or 0) - moved * 2, 0))
+
+
+def speculate_plans(context: "ClientContext", game_state: GameState, command: Command | None, cancel: Event,
+                    own_ship_id: str | None = None) -> int:
+    """Plan ahead for the next turn from the predicted next state of our ship, for `get_speculative_plan` to look up on
+    the next turn. Meant to be called from the precompute hook.
+
+    A plan is made for each cell the visible enemy can be in on the next turn if it keeps its direction, most likely
+    first, with the projectile danger of the next turn. Nothing is planned if the enemy is not visible.
+
+    Arguments:
+        context (ClientContext): the context of the current game
+        game_state (GameState): the state of the tick whose command was just sent
+        command (Command | None): the command that was sent
+        cancel (Event): set when the next tick arrives, planning stops then
+        own_ship_id (str | None): the id of our ship, taken from the context or the config if not given
+
+    Returns:
+        (int): how many plans were stored
+    """
+    own, enemy = _find_ships(context, game_state, own_ship_id)
+    if own is None or enemy is None:
+        return 0
+    height = len(game_state.game_map)
+    width = len(game_state.game_map[0]) if height else 0
+    predicted = predict_own_ship(own, command, width, height)
+    danger_map = DangerMap(width, height)
+    danger_map.update(game_state)
+    next_turn_danger = _NextTurnDanger(danger_map)
+    deadline = perf_counter() + context.tick_length_ms * SPECULATION_TIME_SHARE / 1000 \
+        if context.tick_length_ms else None
+    cache = get_speculation_cache(context)
+    planned = 0
+    for target in _predict_enemy_cells(enemy, width, height):
+        if cancel.is_set() or (deadline is not None and perf_counter() >= deadline):
+            break
+        plan = plan_moves(context, game_state, predicted, target, next_turn_danger, deadline=deadline, cancel=cancel)
+        if cancel.is_set():
+            break
+        cache.put(game_state.turn_number + 1, _plan_key(predicted, target), plan)
+        planned += 1
+    return planned
+
+
+def get_speculative_plan(context: "ClientContext", game_state: GameState,
+                         own_ship_id: str | None = None) -> MovePlan | None:
+    """Look up the plan made by `speculate_plans` on the previous turn for the current state of our ship and the
+    current position of the enemy
+
+    Arguments:
+        context (ClientContext): the context of the current game
+        game_state (GameState): the state of the current tick
+        own_ship_id (str | None): the id of our ship, taken from the context or the config if not given
+
+    Returns:
+        (MovePlan | None): the plan, `None` if the ships are not where they were predicted to be or the enemy is not
+        visible
+    """
+    own, enemy = _find_ships(context, game_state, own_ship_id)
+    if own is None or enemy is None:
+        return None
+    return get_speculation_cache(context).get(game_state.turn_number, _plan_key(own, enemy.position))
+
+
+class _NextTurnDanger:
+    # The danger map of a tick, seen from the next tick: the planner counts ticks from the state it plans from
+
+    def __init__(self, danger_map: DangerMap):
+        self._danger_map = danger_map
+        self.horizon = danger_map.horizon - 1
+
+    def get_danger(self, x: int, y: int, ticks_ahead: int) -> int:
+        return self._danger_map.get_danger(x, y, ticks_ahead + 1)
+
+
+def _plan_key(ship: ShipData, target: Coordinates) -> tuple:
+    return "plan", to_planner_state(ship), target.x, target.y
+
+
+def _predict_enemy_cells(enemy: ShipData, width: int, height: int) -> list[Coordinates]:
+    vector = get_direction_vector(enemy.direction)
+    cells = []
+    for distance in range(_ENEMY_MOVES):
+        x, y = enemy.position.x + vector.x * distance, enemy.position.y + vector.y * distance
+        if not (0 <= x < width and 0 <= y < height):
+            break
+        cells.append(Coordinates(x, y))
+    return cells
+
+
+def _find_ships(context: "ClientContext", game_state: GameState,
+                own_ship_id: str | None) -> tuple[ShipData | None, ShipData | None]:
+    if own_ship_id is None:
+        own_ship_id = getattr(context, "own_ship_id", None) or get_own_ship_id()
+    own = None
+    enemy = None
+    for row in game_state.game_map:
+        for cell in row:
+            if cell.cell_type == CellType.Ship:
+                ship = cast(ShipData, cell.data)
+                if ship.id == own_ship_id:
+                    own = ship
+                else:
+                    enemy = ship
+    return own, enemy
@@ -0,0 +1,241 @@
+import asyncio
+import multiprocessing
+import os
+import queue
+from dataclasses import asdict
+from logging import getLogger
+from multiprocessing.process import BaseProcess
+from time import monotonic
+
+from helpers import get_config, get_optional_config
+from apiwrapper.async_runner import BotRunner, BotStats, combine_stats, parse_bots
+from logging_setup import setup_logging
+
+RESTART_BACKOFF_S = 1.0
+"""How long the supervisor waits before restarting a crashed worker for the first time, doubled on each crash in a
+row"""
+
+MAX_RESTART_BACKOFF_S = 60.0
+"""The longest time the supervisor waits before restarting a crashed worker"""
+
+STABLE_RUN_S = 300.0
+"""How long a worker has to run before a crash no longer counts as a crash in a row for the backoff"""
+
+STATS_INTERVAL_S = 30.0
+"""How often the workers send their statistics to the supervisor, and the supervisor logs the combined report"""
+
+_logger = getLogger("wrapper.supervisor")
+
+
+def shard_bots(bots: list[tuple[str, str]], shard_count: int) -> list[list[tuple[str, str]]]:
+    """Split the bots into evenly sized shards, one per worker process
+
+    Arguments:
+        bots (list[tuple[str, str]]): the tokens and names of the bots
+        shard_count (int): the maximum number of shards
+
+    Returns:
+        (list[list[tuple[str, str]]]): the non-empty shards
+    """
+    if shard_count < 1:
+        raise ValueError(f"Shard count must be at least 1, got {shard_count}")
+    shards = [bots[index::shard_count] for index in range(shard_count)]
+    return [shard for shard in shards if shard]
+
+
+def get_worker_cpus(worker_index: int, available_cpus: list[int]) -> set[int]:
+    """Choose the core a worker process is pinned to. With more workers than cores, the cores are shared in turns.
+
+    Arguments:
+        worker_index (int): the index of the worker
+        available_cpus (list[int]): the cores the supervisor is allowed to run on
+
+    Returns:
+        (set[int]): the cores of the worker
+    """
+    return {available_cpus[worker_index % len(available_cpus)]}
+
+
+def get_restart_delay(crashes_in_row: int) -> float:
+    """Get how long to wait before restarting a crashed worker
+
+    Arguments:
+        crashes_in_row (int): how many times the worker has crashed in a row, including this crash
+
+    Returns:
+        (float): the delay in seconds
+    """
+    return min(RESTART_BACKOFF_S * 2 ** max(crashes_in_row - 1, 0), MAX_RESTART_BACKOFF_S)
+
+
+class _Worker:
+
+    def __init__(self, index: int, bots: list[tuple[str, str]], cpus: set[int] | None):
+        self.index = index
+        self.bots = bots
+        self.cpus = cpus
+        self.process: BaseProcess | None = None
+        self.started_at = 0.0
+        self.crashes_in_row = 0
+        self.restart_at: float | None = None
+
+
+class Supervisor:
+    """Runs bots sharded across worker processes, each worker running its bots with a `BotRunner` and pinned to its own
+    core where the platform supports it. Crashed workers are restarted with exponential backoff, and the statistics of
+    all workers are combined into one report.
+
+    Attributes:
+        url (str): the websocket url of the server
+        bot_workers (int | None): how many team ai threads each worker process runs, one per bot of the worker if
+            `None`
+        stats (dict[str, BotStats]): the combined statistics of each bot by name, including earlier runs of restarted
+            workers
+        restarts (int): how many times crashed workers have been restarted
+    """
+
+    def __init__(self, url: str, bots: list[tuple[str, str]], processes: int | None = None,
+                 bot_workers: int | None = None):
+        if not bots:
+            raise ValueError("The supervisor needs at least one bot")
+        self.url = url
+        self.bot_workers = bot_workers
+        self.stats: dict[str, BotStats] = {}
+        self.restarts = 0
+        available_cpus = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else []
+        shards = shard_bots(bots, processes or len(available_cpus) or os.cpu_count() or 1)
+        self._workers = [_Worker(index, shard, get_worker_cpus(index, available_cpus) if available_cpus else None)
+                         for index, shard in enumerate(shards)]
+        self._queue = multiprocessing.Queue()
+        # The statistics of the current run of each bot, folded into `stats` when its worker restarts
+        self._current_stats: dict[str, BotStats] = {}
+
+    def run(self):  # pragma: no cover -- main loop - runs forever
+        """Start the workers and keep them running"""
+        for worker in self._workers:
+            self._start_worker(worker)
+        next_report = monotonic() + STATS_INTERVAL_S
+        try:
+            while True:
+                self._receive_stats(timeout=1.0)
+                for worker in self._workers:
+                    self._check_worker(worker)
+                if monotonic() >= next_report:
+                    self.log_report()
+                    next_report = monotonic() + STATS_INTERVAL_S
+        finally:
+            for worker in self._workers:
+                if worker.process is not None and worker.process.is_alive():
+                    worker.process.terminate()
+            self.log_report()
+
+    def get_report(self) -> dict[str, BotStats]:
+        """Get the combined statistics of each bot
+
+        Returns:
+            (dict[str, BotStats]): the statistics of each bot by name over all runs of its worker
+        """
+        report = dict(self.stats)
+        for bot_name, stats in self._current_stats.items():
+            report[bot_name] = combine_stats(report[bot_name], stats) if bot_name in report else stats
+        return report
+
+    def log_report(self):
+        """Log the combined statistics of each bot and of all bots"""
+        report = self.get_report()
+        total = BotStats()
+        for bot_name, stats in sorted(report.items()):
+            total = combine_stats(total, stats)
+            _logger.info(f"Bot {bot_name}: {stats.ticks} ticks, {stats.timeouts} timed out, {stats.skipped} skipped")
+        _logger.info(f"All bots: {total.ticks} ticks, {total.timeouts} timed out, {total.skipped} skipped, "
+                     f"{self.restarts} worker restarts")
+
+    def _receive_stats(self, timeout: float):
+        try:
+            bot_stats = self._queue.get(timeout=timeout)
+            while True:
+                for bot_name, stats in bot_stats.items():
+                    self._current_stats[bot_name] = BotStats(**stats)
+                bot_stats = self._queue.get_nowait()
+        except queue.Empty:
+            pass
+
+    def _check_worker(self, worker: _Worker):
+        if worker.restart_at is not None:
+            if monotonic() >= worker.restart_at:
+                self.restarts += 1
+                self._start_worker(worker)
+            return
+        if worker.process is None or worker.process.is_alive():
+            return
+        # Take in the last statistics the worker sent before exiting, so they are not counted for its next run
+        self._receive_stats(timeout=0)
+        if monotonic() - worker.started_at >= STABLE_RUN_S:
+            worker.crashes_in_row = 0
+        worker.crashes_in_row += 1
+        delay = get_restart_delay(worker.crashes_in_row)
+        _logger.error(f"Worker {worker.index} exited with code {worker.process.exitcode}, restarting in {delay:.1f} "
+                      f"seconds.")
+        for _, bot_name in worker.bots:
+            stats = self._current_stats.pop(bot_name, None)
+            if stats is not None:
+                self.stats[bot_name] = combine_stats(self.stats[bot_name], stats) if bot_name in self.stats else stats
+        worker.restart_at = monotonic() + delay
+
+    def _start_worker(self, worker: _Worker):
+        worker.process = multiprocessing.Process(target=_run_worker, name=f"bot-worker-{worker.index}",
+                                                 args=(self.url, worker.bots, self.bot_workers, worker.cpus,
+                                                       self._queue), daemon=True)
+        worker.started_at = monotonic()
+        worker.restart_at = None
+        worker.process.start()
+        _logger.info(f"Started worker {worker.index} with {len(worker.bots)} bots on cores {worker.cpus}")
+
+
+def get_stats_snapshot(runner: BotRunner) -> dict[str, dict]:
+    """Get the statistics a worker reports to the supervisor. They cover all matches of the current run of the worker,
+    as the bots reset their statistics at the end of each match.
+
+    Arguments:
+        runner (BotRunner): the runner of the worker
+
+    Returns:
+        (dict[str, dict]): the statistics of each bot by name, as dictionaries that can be sent between processes
+    """
+    return {bot.bot_name: asdict(bot.get_total_stats()) for bot in runner.bots}
+
+
+def _run_worker(url: str, bots: list[tuple[str, str]], bot_workers: int | None, cpus: set[int] | None,
+                stats_queue: multiprocessing.Queue):  # pragma: no cover -- runs in the worker process
+    if cpus is not None:
+        os.sched_setaffinity(0, cpus)
+    setup_logging()
+    # The worker is pinned to one core, so more threads than bots would only add contention
+    runner = BotRunner(url, bots, bot_workers or len(bots))
+    asyncio.run(_run_runner(runner, stats_queue))
+
+
+async def _run_runner(runner: BotRunner, stats_queue: multiprocessing.Queue):  # pragma: no cover -- runs forever
+    async def report_stats():
+        while True:
+            await asyncio.sleep(STATS_INTERVAL_S)
+            stats_queue.put(get_stats_snapshot(runner))
+
+    reporter = asyncio.create_task(report_stats())
+    try:
+        await runner.run()
+    finally:
+        reporter.cancel()
+        stats_queue.put(get_stats_snapshot(runner))
+
+
+if __name__ == '__main__':
+    setup_logging()
+    _main_logger = getLogger("wrapper.main")
+    processes = get_optional_config("supervisor_processes")
+    bot_workers = get_optional_config("bot_workers")
+    supervisor = Supervisor(get_config("websocket_url"), parse_bots(get_config("bots")),
+                            int(processes) if processes is not None else None,
+                            int(bot_workers) if bot_workers is not None else None)
+    _main_logger.debug("Starting supervisor")
+    supervisor.run()
@@ -1,16 +1,25 @@
 from __future__ import annotations
 
 from logging import getLogger
+from threading import Event
 from typing import TYPE_CHECKING
 
 if TYPE_CHECKING:
     from apiwrapper.websocket_wrapper import ClientContext
 from apiwrapper.models import ActionType, GameState, Command, MoveActionData, ShootActionData, TurnActionData
+from bitboard import get_board_geometry
 from helpers import *
 
 import random
 
 
+EXPECTED_MAP_SIZE = 30
+"""The map width and height the lookup tables are built for in `warm_up`, before the actual map size is known"""
+
+OPENING_TURNS = 8
+"""How many turns from the start of a match the opening book of the `opening_book` config is looked up, the turns a
+book generated with the default settings covers"""
+
 ai_logger = getLogger("team_ai")
 """You can use this logger to track the behaviour of your bot. 
 
@@ -49,6 +58,24 @@ def process_tick(context: ClientContext, game_state: GameState) -> Command | Non
 
     ai_logger.info("processing tick")
 
+    # Imported here so that importing the team ai does not import the search and the planner. `warm_up` imports them
+    # before the match starts, so the first tick does not pay for it.
+    from opening_book import get_opening_command
+    from speculation import get_speculative_plan
+    from world_model import get_world_model
+
+    # The first turns of the match are looked up from the opening book, the rest of the function plays if the book
+    # has no move for the tick
+    if game_state.turn_number < OPENING_TURNS:
+        command = get_opening_command(context, get_world_model(context, game_state))
+        if command is not None:
+            return command
+
+    # Planned in the idle time after the previous tick, if our ship and the enemy ended up where they were expected
+    plan = get_speculative_plan(context, game_state)
+    if plan is not None and plan.complete and plan.commands:
+        return plan.commands[0]
+
     y = -1
     ourShip = [-1,-1]
     heat = -1
@@ -128,3 +155,39 @@ def process_tick(context: ClientContext, game_state: GameState) -> Command | Non
     else:
         return Command(action=ActionType.Turn, payload=TurnActionData(get_partial_turn(wantedDirection)))
     return None
+
+
+def precompute(context: ClientContext, game_state: GameState, command: Command | None, cancel: Event):
+    """Optional function run in the background after the command of a tick has been sent, until the next tick arrives
+
+    Use it to prepare work for the next tick, for example plans for the predicted next state of your ship (see
+    `speculation.predict_own_ship`), and store the results in `speculation.get_speculation_cache(context)` to look them
+    up in `process_tick`. Check `cancel.is_set()` often and return when it is set, as the next tick has arrived then.
+
+    Arguments:
+        context (ClientContext): the persistent context of the game, the same one `process_tick` gets
+        game_state (GameState): the state of the tick whose command was just sent
+        command (Command | None): the command that was sent
+        cancel (Event): set when the next message arrives
+    """
+    height = len(game_state.game_map)
+    width = len(game_state.game_map[0]) if height else 0
+    if width and height:
+        # Builds the vision circle masks of the map size now instead of during tick processing
+        get_board_geometry(width, height).vision_mask(0, 0)
+    from speculation import speculate_plans
+    speculate_plans(context, game_state, command, cancel)
+
+
+def warm_up():
+    """Optional function run once after the bot is authorized, before the first match starts
+
+    Use it to build lookup tables and fill caches that would otherwise be built during the first tick. The map size is
+    not known before the first tick, so build them for the expected map size.
+    """
+    get_board_geometry(EXPECTED_MAP_SIZE, EXPECTED_MAP_SIZE).vision_mask(0, 0)
+    # Imports the modules `process_tick` and `precompute` import on use, before the match starts
+    import speculation
+    import world_model
+    from opening_book import get_opening_book
+    get_opening_book()
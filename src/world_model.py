@@ -0,0 +1,198 @@
+from collections import deque
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, cast
+
+from apiwrapper.models import CellType, Coordinates, GameState, ProjectileData, ShipData
+from bitboard import BoardGeometry, get_board_geometry, to_coordinates
+from helpers import get_own_ship_id
+
+if TYPE_CHECKING:
+    from apiwrapper.models import ClientContext
+
+AUDIO_HISTORY_LENGTH = 16
+"""How many of the latest audio signature bearings the world model keeps"""
+
+_MAX_MOVE_DISTANCE = 3
+
+
+@dataclass
+class AudioBearing:
+    """An audio signature heard on a tick, pointing from our ship towards the enemy
+
+    Attributes:
+        turn_number (int): the turn the signature was heard on
+        origin (Coordinates): the position of our ship on the turn
+        cell (Coordinates): the audio signature cell on the edge of our vision
+    """
+    turn_number: int
+    origin: Coordinates
+    cell: Coordinates
+
+
+class WorldModel:
+    """Knowledge about the match that persists between ticks, updated from the tick deltas.
+
+    Updating costs time in proportion to the amount of changed cells, except on the first tick and after a skipped tick,
+    when the whole map is scanned.
+
+    Attributes:
+        own_ship_id (str): the id of our ship
+        turn_rate (int): the turn rate of the game
+        turn_number (int | None): the turn of the latest update, `None` before the first update
+        own_ship (ShipData | None): our ship as of the latest update
+        enemy (ShipData | None): the enemy ship as it was when last seen, `None` if it has not been seen
+        enemy_visible (bool): whether the enemy ship is in vision on the latest update
+        enemy_seen_turn (int | None): the turn the enemy ship was last seen on
+        projectiles (dict[str, ProjectileData]): the projectiles in vision by id
+        audio_bearings (deque[AudioBearing]): the latest audio signature bearings, oldest first
+        geometry (BoardGeometry | None): the precomputed masks for the map size, `None` before the first update
+        unseen_mask (int): the bit mask of the cells out of our vision on the latest update
+    """
+
+    def __init__(self, own_ship_id: str, turn_rate: int):
+        self.own_ship_id = own_ship_id
+        self.turn_rate = turn_rate
+        self.turn_number: int | None = None
+        self.own_ship: ShipData | None = None
+        self.enemy: ShipData | None = None
+        self.enemy_visible = False
+        self.enemy_seen_turn: int | None = None
+        self.projectiles: dict[str, ProjectileData] = {}
+        self.audio_bearings: deque[AudioBearing] = deque(maxlen=AUDIO_HISTORY_LENGTH)
+        self.geometry: BoardGeometry | None = None
+        self.unseen_mask = 0
+        self._audio_mask = 0
+
+    def update(self, game_state: GameState):
+        """Update the model with the state of a new tick
+
+        Arguments:
+            game_state (GameState): the state of the tick
+        """
+        delta = game_state.delta
+        if delta is None or self.turn_number is None or game_state.turn_number != self.turn_number + 1:
+            self._rebuild(game_state)
+        else:
+            for coordinates in delta.changed_cells:
+                self._update_cell(coordinates, game_state.game_map[coordinates.y][coordinates.x].cell_type)
+            for entity in delta.disappeared:
+                self._remove_entity(entity)
+            for entity in delta.appeared:
+                self._set_entity(entity)
+            for _, entity in delta.moved:
+                self._set_entity(entity)
+            for _, entity in delta.updated:
+                self._set_entity(entity)
+        self.turn_number = game_state.turn_number
+        if self.enemy_visible:
+            self.enemy_seen_turn = game_state.turn_number
+        if self.own_ship is not None:
+            for cell in to_coordinates(self._audio_mask, self.geometry.width):
+                self.audio_bearings.append(AudioBearing(game_state.turn_number, self.own_ship.position, cell))
+
+    def get_latest_bearing(self) -> AudioBearing | None:
+        """Get the audio signature bearing of the latest update
+
+        Returns:
+            (AudioBearing | None): the bearing heard on the latest update, `None` if no signature was heard on it
+        """
+        if self.audio_bearings and self.audio_bearings[-1].turn_number == self.turn_number:
+            return self.audio_bearings[-1]
+        return None
+
+    def estimate_enemy_region(self) -> int:
+        """Get the cells the enemy ship can be in on the latest update
+
+        The region is a superset: when the enemy is out of vision, it holds the cells out of our vision within the
+        distance the enemy can have moved since last seen.
+
+        Returns:
+            (int): the region as a bit mask of the cells (bit `y * width + x`), see `bitboard.BoardGeometry`
+        """
+        if self.geometry is None:
+            return 0
+        if self.enemy_visible and self.enemy is not None:
+            return self.geometry.bit(self.enemy.position.x, self.enemy.position.y)
+        if self.enemy is None or self.enemy_seen_turn is None:
+            return self.unseen_mask
+        radius = (self.turn_number - self.enemy_seen_turn) * _MAX_MOVE_DISTANCE
+        return self._get_square_mask(self.enemy.position, radius) & self.unseen_mask
+
+    def _rebuild(self, game_state: GameState):
+        height = len(game_state.game_map)
+        width = len(game_state.game_map[0]) if height else 0
+        if self.geometry is None or (self.geometry.width, self.geometry.height) != (width, height):
+            self.geometry = get_board_geometry(width, height)
+        self.unseen_mask = 0
+        self._audio_mask = 0
+        self.projectiles.clear()
+        self.own_ship = None
+        self.enemy_visible = False
+        for y, row in enumerate(game_state.game_map):
+            for x, cell in enumerate(row):
+                self._update_cell(Coordinates(x, y), cell.cell_type)
+                if cell.cell_type in (CellType.Ship, CellType.Projectile):
+                    self._set_entity(cast(ShipData | ProjectileData, cell.data))
+
+    def _update_cell(self, coordinates: Coordinates, cell_type: CellType):
+        bit = self.geometry.bit(coordinates.x, coordinates.y)
+        if cell_type == CellType.OutOfVision:
+            self.unseen_mask |= bit
+        else:
+            self.unseen_mask &= ~bit
+        if cell_type == CellType.AudioSignature:
+            self._audio_mask |= bit
+        else:
+            self._audio_mask &= ~bit
+
+    def _set_entity(self, entity: ShipData | ProjectileData):
+        if isinstance(entity, ProjectileData):
+            self.projectiles[entity.id] = entity
+        elif entity.id == self.own_ship_id:
+            self.own_ship = entity
+        else:
+            self.enemy = entity
+            self.enemy_visible = True
+
+    def _remove_entity(self, entity: ShipData | ProjectileData):
+        if isinstance(entity, ProjectileData):
+            self.projectiles.pop(entity.id, None)
+        elif entity.id == self.own_ship_id:
+            self.own_ship = None
+        else:
+            # The enemy is kept as last seen
+            self.enemy_visible = False
+
+    def _get_square_mask(self, center: Coordinates, radius: int) -> int:
+        width = self.geometry.width
+        min_x, max_x = max(center.x - radius, 0), min(center.x + radius, width - 1)
+        min_y, max_y = max(center.y - radius, 0), min(center.y + radius, self.geometry.height - 1)
+        if min_x > max_x or min_y > max_y:
+            return 0
+        row_mask = ((1 << (max_x - min_x + 1)) - 1) << min_x
+        mask = 0
+        for y in range(min_y, max_y + 1):
+            mask |= row_mask << (y * width)
+        return mask
+
+
+def get_world_model(context: "ClientContext", game_state: GameState, own_ship_id: str | None = None) -> WorldModel:
+    """Get the world model kept in the context, creating it on the first tick and updating it once per tick
+
+    Arguments:
+        context (ClientContext): the context of the current game
+        game_state (GameState): the state of the current tick
+        own_ship_id (str | None): the id of our ship, taken from the context or the config if not given
+
+    Returns:
+        (WorldModel): the world model of the match, updated to the given tick
+    """
+    model = getattr(context, "world_model", None)
+    if model is None:
+        if own_ship_id is None:
+            own_ship_id = getattr(context, "own_ship_id", None) or get_own_ship_id()
+        model = WorldModel(own_ship_id, context.turn_rate)
+        context.world_model = model
+    if model.turn_number != game_state.turn_number:
+        model.update(game_state)
+    return model
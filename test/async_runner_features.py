@@ -0,0 +1,175 @@
+import asyncio
+import json
+from threading import Event, current_thread
+from time import perf_counter
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from apiwrapper import async_runner
+from apiwrapper.async_runner import Bot, BotRunner, BufferedSocket, parse_bots
+from apiwrapper.models import ActionType, ClientContext, Command, GameState, MoveActionData
+from apiwrapper.portfolio import Portfolio
+from apiwrapper.websocket_wrapper import ClientState
+
+_TICK = {"eventType": "gameTick", "data": {"turnNumber": 1, "gameMap": [[{"type": "empty", "data": {}}]]}}
+
+
+def _command(distance: int) -> Command:
+    return Command(ActionType.Move, MoveActionData(distance))
+
+
+def _start_game(runner: BotRunner, tick_length_ms: int = 500):
+    for bot in runner.bots:
+        bot.client.state = ClientState.InGame
+        bot.client.context = ClientContext(tick_length_ms, 2)
+        bot.client.precompute = None
+
+
+async def _process_tick(runner: BotRunner, bot: Bot, turn_number: int) -> Command | None:
+    bot.client.tick_received_at = perf_counter()
+    return await runner.process_tick(bot, GameState(turn_number, []))
+
+
+def _sent_message(websocket) -> dict:
+    return json.loads(websocket.send.call_args.args[0])
+
+
+# noinspection PyMethodMayBeStatic
+class AsyncRunnerFeatures:
+
+    def should_send_buffered_messages_in_order_on_flush(self):
+        buffer = BufferedSocket()
+        websocket = AsyncMock()
+
+        buffer.send("first")
+        buffer.send("second")
+        asyncio.run(buffer.flush(websocket))
+
+        assert [call.args[0] for call in websocket.send.call_args_list] == ["first", "second"]
+        assert buffer.messages == []
+
+    def should_parse_bots_from_token_and_name_pairs(self):
+        assert parse_bots("token1:first, token2:second,") == [("token1", "first"), ("token2", "second")]
+
+    def should_raise_error_on_bot_without_name(self):
+        with pytest.raises(ValueError):
+            parse_bots("token1")
+
+    def should_give_each_bot_its_own_client_and_ship_id(self):
+        runner = BotRunner("ws://localhost", [("token1", "first"), ("token2", "second")], 1)
+
+        assert runner.bots[0].client is not runner.bots[1].client
+        assert runner.bots[1].client.ship_id == "ship:token2:second"
+        runner.shutdown()
+
+    @patch("apiwrapper.websocket_wrapper.process_tick")
+    def should_send_team_ai_command_on_game_tick(self, mock_tick_handler):
+        mock_tick_handler.return_value = _command(2)
+        runner = BotRunner("ws://localhost", [("token", "bot")], 1)
+        _start_game(runner)
+        websocket = AsyncMock()
+
+        asyncio.run(runner.handle_message(runner.bots[0], _TICK, websocket))
+
+        websocket.send.assert_called_once()
+        assert _sent_message(websocket) == {"eventType": "gameAction",
+                                            "data": {"action": "move", "payload": {"distance": 2}}}
+        assert runner.bots[0].stats.runs == 1
+        runner.shutdown()
+
+    @patch("apiwrapper.websocket_wrapper.process_tick")
+    def should_send_published_command_and_skip_next_tick_while_team_ai_is_still_running(self, mock_tick_handler):
+        release = Event()
+
+        def slow(context: ClientContext, _):
+            context.publish_command(_command(3))
+            release.wait(1)
+
+        mock_tick_handler.side_effect = slow
+        runner = BotRunner("ws://localhost", [("token", "bot")], 2)
+        _start_game(runner, 80)
+        bot = runner.bots[0]
+
+        first = asyncio.run(_process_tick(runner, bot, 1))
+        second = asyncio.run(_process_tick(runner, bot, 2))
+        release.set()
+
+        assert first == _command(3)
+        assert second is None
+        assert bot.stats.timeouts == 1
+        assert bot.stats.skipped == 1
+        runner.shutdown()
+
+    @patch("apiwrapper.websocket_wrapper.process_tick")
+    def should_not_let_slow_bot_hold_up_other_bots(self, mock_tick_handler):
+        release = Event()
+        mock_tick_handler.side_effect = lambda context, _: release.wait(1) if context.turn_rate == 1 else _command(1)
+        runner = BotRunner("ws://localhost", [("token1", "slow"), ("token2", "fast")], 2)
+        _start_game(runner, 80)
+        runner.bots[0].client.context.turn_rate = 1
+
+        async def process_both():
+            return await asyncio.gather(*(_process_tick(runner, bot, 1) for bot in runner.bots))
+
+        commands = asyncio.run(process_both())
+        release.set()
+
+        assert commands == [None, _command(1)]
+        assert runner.bots[1].stats.timeouts == 0
+        runner.shutdown()
+
+    @patch("apiwrapper.websocket_wrapper.deserialize_game_state")
+    @patch("apiwrapper.websocket_wrapper.process_tick")
+    def should_deserialize_game_state_off_event_loop_and_team_ai_pool(self, mock_tick_handler,
+                                                                      mock_state_deserialization):
+        threads = []
+        mock_state_deserialization.side_effect = lambda *_: threads.append(current_thread().name) or GameState(1, [])
+        mock_tick_handler.return_value = _command(1)
+        runner = BotRunner("ws://localhost", [("token", "bot")], 1)
+        _start_game(runner)
+
+        asyncio.run(runner.handle_message(runner.bots[0], _TICK, AsyncMock()))
+
+        assert threads[0].startswith("messages")
+        runner.shutdown()
+
+    def should_start_match_off_event_loop(self, monkeypatch):
+        threads = []
+        monkeypatch.setattr(async_runner, "handle_event", lambda *_: threads.append(current_thread().name))
+        runner = BotRunner("ws://localhost", [("token", "bot")], 1)
+        bot = runner.bots[0]
+        bot.client.precompute = None
+
+        asyncio.run(runner.handle_message(bot, {"eventType": "startGame", "data": {"tickLength": 500, "turnRate": 2}},
+                                          AsyncMock()))
+
+        assert threads[0].startswith("messages")
+        runner.shutdown()
+
+    def should_run_portfolio_strategies_on_shared_pool(self):
+        threads = []
+        runner = BotRunner("ws://localhost", [("token", "bot")], 2)
+        _start_game(runner)
+        bot = runner.bots[0]
+        bot.client.portfolio = Portfolio([("first", lambda *_: threads.append(current_thread().name) or _command(1))],
+                                         bot.client.executor)
+
+        command = asyncio.run(_process_tick(runner, bot, 1))
+
+        assert command == _command(1)
+        assert threads[0].startswith("team-ai")
+        runner.shutdown()
+
+    @patch("apiwrapper.websocket_wrapper.process_tick")
+    def should_reset_bot_stats_at_end_of_match(self, mock_tick_handler):
+        mock_tick_handler.return_value = _command(1)
+        runner = BotRunner("ws://localhost", [("token", "bot")], 1)
+        _start_game(runner)
+        bot = runner.bots[0]
+        asyncio.run(runner.handle_message(bot, _TICK, AsyncMock()))
+
+        asyncio.run(runner.handle_message(bot, {"eventType": "endGame", "data": {}}, AsyncMock()))
+
+        assert bot.stats.ticks == 0
+        runner.shutdown()
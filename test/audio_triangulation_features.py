@@ -0,0 +1,79 @@
+import math
+
+from apiwrapper.models import ClientContext, Coordinates
+from apiwrapper.serialization import deserialize_game_state
+from audio_triangulation import AudioTriangulator, get_audio_triangulator
+from world_model import get_world_model
+
+
+def _audio_cell(origin: tuple[int, int], enemy: tuple[int, int], radius: int = 10) -> Coordinates:
+    dx, dy = enemy[0] - origin[0], enemy[1] - origin[1]
+    length = math.hypot(dx, dy)
+    return Coordinates(round(origin[0] + dx / length * radius), round(origin[1] + dy / length * radius))
+
+
+def _cells(mask: int, width: int) -> set[tuple[int, int]]:
+    return {(index % width, index // width) for index in range(mask.bit_length()) if mask >> index & 1}
+
+
+# noinspection PyMethodMayBeStatic
+class AudioTriangulatorFeatures:
+
+    def should_build_bearing_cone_beyond_the_audio_cell(self):
+        triangulator = AudioTriangulator(30, 30)
+
+        cells = _cells(triangulator.get_bearing_mask(Coordinates(5, 5), Coordinates(15, 5)), 30)
+
+        assert (20, 5) in cells and (29, 5) in cells and (15, 5) in cells
+        assert (10, 5) not in cells
+        assert (20, 10) not in cells
+
+    def should_narrow_candidates_with_bearings_from_different_positions(self):
+        triangulator = AudioTriangulator(30, 30)
+        enemy = (25, 20)
+        counts = []
+
+        for turn_number, origin in enumerate([(2, 2), (2, 8), (2, 14)], 1):
+            triangulator.update(turn_number, Coordinates(*origin), _audio_cell(origin, enemy))
+            counts.append(triangulator.candidate_mask.bit_count())
+
+        assert triangulator.get_probability(*enemy) > 0
+        assert counts[-1] < counts[0]
+        estimate = triangulator.get_estimate()
+        assert abs(estimate.x - enemy[0]) <= 5 and abs(estimate.y - enemy[1]) <= 5
+
+    def should_grow_candidates_by_enemy_movement_between_ticks(self):
+        triangulator = AudioTriangulator(10, 10)
+        triangulator.observe_enemy(1, Coordinates(5, 5))
+
+        triangulator.update(2, Coordinates(0, 0), None)
+
+        assert _cells(triangulator.candidate_mask, 10) == {(x, y) for x in range(2, 9) for y in range(2, 9)}
+        assert triangulator.get_probability(5, 5) == 1 / 49
+
+    def should_restart_from_bearing_if_it_contradicts_candidates(self):
+        triangulator = AudioTriangulator(30, 30)
+        triangulator.observe_enemy(1, Coordinates(2, 25))
+
+        triangulator.update(2, Coordinates(5, 5), Coordinates(15, 5))
+
+        assert triangulator.get_probability(25, 5) > 0
+        assert triangulator.get_probability(2, 25) == 0
+
+
+# noinspection PyMethodMayBeStatic
+class GetAudioTriangulatorFeatures:
+
+    def should_follow_the_world_model_of_the_context(self):
+        context = ClientContext(100, 1)
+        game_map = [[{"type": "empty", "data": {}} for _ in range(8)] for _ in range(8)]
+        game_map[0][0] = {"type": "ship", "data": {"id": "own", "position": {"x": 0, "y": 0}, "direction": "e",
+                                                   "health": 10, "heat": 0}}
+        game_map[6][7] = {"type": "ship", "data": {"id": "enemy", "position": {"x": 7, "y": 6}, "direction": "e",
+                                                   "health": 10, "heat": 0}}
+        world_model = get_world_model(context, deserialize_game_state({"turnNumber": 1, "gameMap": game_map}), "own")
+
+        triangulator = get_audio_triangulator(context, world_model)
+
+        assert get_audio_triangulator(context, world_model) is triangulator
+        assert triangulator.get_estimate() == Coordinates(7, 6)
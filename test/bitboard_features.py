@@ -0,0 +1,73 @@
+from apiwrapper.models import Cell, CellType, CompassDirection, Coordinates, HitBoxData
+from bitboard import BitboardMap, get_board_geometry, to_coordinates
+
+
+def _create_map(entities: list[tuple[int, int, Cell]], size: int = 10) -> list[list[Cell]]:
+    game_map = [[Cell(CellType.Empty, {}) for _ in range(size)] for _ in range(size)]
+    for x, y, cell in entities:
+        game_map[y][x] = cell
+    return game_map
+
+
+# noinspection PyMethodMayBeStatic
+class BoardGeometryFeatures:
+
+    def should_give_ray_cells_from_start_to_map_edge_excluding_start(self):
+        geometry = get_board_geometry(5, 5)
+
+        actual = to_coordinates(geometry.ray_mask(1, 1, CompassDirection.SouthEast), 5)
+
+        assert actual == [Coordinates(2, 2), Coordinates(3, 3), Coordinates(4, 4)]
+
+    def should_give_cells_within_radius_for_vision_mask(self):
+        geometry = get_board_geometry(30, 30)
+
+        mask = geometry.vision_mask(15, 15)
+
+        assert mask & geometry.bit(25, 15)
+        assert mask & geometry.bit(22, 22)
+        assert not mask & geometry.bit(23, 23)
+
+    def should_only_reach_forward_and_own_cell_in_one_tick(self):
+        geometry = get_board_geometry(10, 10)
+
+        actual = to_coordinates(geometry.reach_mask(5, 2, CompassDirection.East, 1, 2), 10)
+
+        assert actual == [Coordinates(5, 2), Coordinates(5, 3), Coordinates(5, 4), Coordinates(5, 5)]
+
+    def should_reach_turned_directions_in_two_ticks(self):
+        geometry = get_board_geometry(10, 10)
+
+        mask = geometry.reach_mask(5, 2, CompassDirection.East, 2, 2)
+
+        assert mask & geometry.bit(6, 2)
+        assert not mask & geometry.bit(6, 4)
+
+    def should_share_geometry_between_calls_for_same_size(self):
+        assert get_board_geometry(10, 12) is get_board_geometry(10, 12)
+
+
+# noinspection PyMethodMayBeStatic
+class BitboardMapFeatures:
+
+    def should_encode_each_cell_type_as_bitset(self):
+        hit_box = Cell(CellType.HitBox, HitBoxData("entity"))
+        bitboard = BitboardMap.from_game_map(_create_map([(3, 4, hit_box)]))
+
+        assert to_coordinates(bitboard.get_mask(CellType.HitBox), 10) == [Coordinates(3, 4)]
+        assert bin(bitboard.get_mask(CellType.Empty)).count("1") == 99
+
+    def should_find_hit_box_along_ray(self):
+        hit_box = Cell(CellType.HitBox, HitBoxData("entity"))
+        bitboard = BitboardMap.from_game_map(_create_map([(3, 4, hit_box)]))
+
+        assert bitboard.any_along_ray(3, 0, CompassDirection.East, CellType.HitBox)
+        assert not bitboard.any_along_ray(3, 0, CompassDirection.South, CellType.HitBox)
+
+    def should_give_nearest_cell_along_ray_in_both_index_directions(self):
+        hit_box = Cell(CellType.HitBox, HitBoxData("entity"))
+        bitboard = BitboardMap.from_game_map(_create_map([(3, 4, hit_box), (3, 7, hit_box), (3, 1, hit_box)]))
+
+        assert bitboard.first_along_ray(3, 5, CompassDirection.East, CellType.HitBox) == Coordinates(3, 7)
+        assert bitboard.first_along_ray(3, 5, CompassDirection.West, CellType.HitBox) == Coordinates(3, 4)
+        assert bitboard.first_along_ray(5, 5, CompassDirection.West, CellType.HitBox) is None
@@ -0,0 +1,93 @@
+import pytest
+from websockets.extensions.permessage_deflate import PerMessageDeflate
+from websockets.frames import Frame, Opcode
+
+from apiwrapper.compression import CompressionStats, InstrumentedDeflateFactory, InstrumentedExtension, \
+    get_connect_options
+
+_PAYLOAD = b'{"type":"empty","data":{}},' * 100
+
+
+def _deflate_pair(stats: CompressionStats) -> tuple[InstrumentedExtension, PerMessageDeflate]:
+    client = InstrumentedExtension(PerMessageDeflate(False, False, 15, 15), stats)
+    server = PerMessageDeflate(False, False, 15, 15)
+    return client, server
+
+
+# noinspection PyMethodMayBeStatic
+class CompressionFeatures:
+
+    def should_record_compressed_and_raw_bytes_of_received_frames(self):
+        stats = CompressionStats()
+        client, server = _deflate_pair(stats)
+        compressed = server.encode(Frame(Opcode.TEXT, _PAYLOAD))
+
+        decoded = client.decode(compressed)
+
+        assert decoded.data == _PAYLOAD
+        assert stats.frames_in == 1
+        assert stats.raw_bytes_in == len(_PAYLOAD)
+        assert stats.wire_bytes_in == len(compressed.data) < len(_PAYLOAD)
+
+    def should_record_raw_and_compressed_bytes_of_sent_frames(self):
+        stats = CompressionStats()
+        client, server = _deflate_pair(stats)
+
+        encoded = client.encode(Frame(Opcode.TEXT, _PAYLOAD))
+
+        assert server.decode(encoded).data == _PAYLOAD
+        assert stats.frames_out == 1
+        assert stats.raw_bytes_out == len(_PAYLOAD)
+        assert stats.wire_bytes_out == len(encoded.data)
+
+    def should_not_record_control_frames(self):
+        stats = CompressionStats()
+        client, _ = _deflate_pair(stats)
+
+        client.encode(Frame(Opcode.PING, b"ping"))
+
+        assert stats == CompressionStats()
+
+    def should_reset_stats_in_place(self):
+        stats = CompressionStats(ticks=3, frames_in=2, decompress_ms=1.5)
+
+        stats.reset()
+
+        assert stats == CompressionStats()
+
+    def should_use_instrumented_deflate_by_default(self, monkeypatch):
+        monkeypatch.setenv("websocket_compression", "")
+        stats = CompressionStats()
+
+        options = get_connect_options(stats)
+
+        assert options["compression"] is None
+        assert isinstance(options["extensions"][0], InstrumentedDeflateFactory)
+        assert options["extensions"][0].stats is stats
+
+    def should_not_compress_if_compression_is_none(self, monkeypatch):
+        monkeypatch.setenv("websocket_compression", "none")
+
+        assert "extensions" not in get_connect_options(CompressionStats())
+
+    def should_pass_configured_window_bits_and_sizes(self, monkeypatch):
+        monkeypatch.setenv("websocket_max_window_bits", "10")
+        monkeypatch.setenv("websocket_max_size", "4096")
+        monkeypatch.setenv("websocket_read_limit", "1024")
+
+        options = get_connect_options(CompressionStats(), True)
+
+        assert options["extensions"][0].client_max_window_bits == 10
+        assert options["max_size"] == 4096
+        assert options["read_limit"] == 1024
+
+    def should_not_pass_buffer_sizes_to_sync_client(self, monkeypatch):
+        monkeypatch.setenv("websocket_read_limit", "1024")
+
+        assert "read_limit" not in get_connect_options(CompressionStats())
+
+    def should_raise_error_on_unknown_compression(self, monkeypatch):
+        monkeypatch.setenv("websocket_compression", "brotli")
+
+        with pytest.raises(ValueError):
+            get_connect_options(CompressionStats())
@@ -0,0 +1,68 @@
+import pytest
+
+from apiwrapper.models import Cell, CellType, CompassDirection, Coordinates, GameState, ShipData
+from apiwrapper.serialization import deserialize_game_state
+
+np = pytest.importorskip("numpy")
+
+from feature_planes import stack_game_states  # noqa: E402
+
+
+def _raw_state(turn_number: int) -> dict:
+    return {
+        "turnNumber": turn_number,
+        "gameMap": [
+            [{"type": "empty", "data": {}}, {"type": "outOfVision", "data": {}}],
+            [{"type": "ship", "data": {"id": "s", "position": {"x": 0, "y": 1}, "direction": "se", "health": 20,
+                                       "heat": 7}},
+             {"type": "projectile", "data": {"id": "p", "position": {"x": 1, "y": 1}, "direction": "w", "speed": 3,
+                                             "mass": 2}}]
+        ]
+    }
+
+
+# noinspection PyMethodMayBeStatic
+class FeaturePlanesFeatures:
+
+    def should_one_hot_encode_cell_types(self):
+        planes = deserialize_game_state(_raw_state(1)).to_planes()
+
+        assert planes.cell_types.dtype == np.uint8
+        assert planes.cell_types.shape == (6, 2, 2)
+        assert planes.cell_types[:, 0, 1].tolist() == [0, 1, 0, 0, 0, 0]
+        assert planes.cell_types.sum() == 4
+
+    def should_set_entity_values_at_entity_cells(self):
+        planes = deserialize_game_state(_raw_state(1)).to_planes()
+
+        assert planes.ship_health.tolist() == [[0, 0], [20, 0]]
+        assert planes.ship_heat.tolist() == [[0, 0], [7, 0]]
+        assert planes.direction.tolist() == [[-1, -1], [3, 6]]
+        assert planes.projectile_speed.tolist() == [[0, 0], [0, 3]]
+        assert planes.projectile_mass.tolist() == [[0, 0], [0, 2]]
+
+    def should_give_same_planes_from_cells_as_from_raw_map(self):
+        state = deserialize_game_state(_raw_state(1))
+        from_cells = GameState(state.turn_number, state.game_map)
+
+        raw_planes = state.to_planes()
+        cell_planes = from_cells.to_planes()
+
+        assert np.array_equal(raw_planes.cell_types, cell_planes.cell_types)
+        assert np.array_equal(raw_planes.direction, cell_planes.direction)
+
+    def should_mark_unknown_ship_values_as_negative(self):
+        ship = Cell(CellType.Ship, ShipData("s", Coordinates(0, 0), CompassDirection.North, None, None))
+
+        planes = GameState(1, [[ship]]).to_planes()
+
+        assert planes.ship_health.tolist() == [[-1]]
+        assert planes.ship_heat.tolist() == [[-1]]
+
+    def should_stack_states_along_leading_batch_dimension(self):
+        states = [deserialize_game_state(_raw_state(turn)) for turn in range(3)]
+
+        planes = stack_game_states(states)
+
+        assert planes.cell_types.shape == (3, 6, 2, 2)
+        assert planes.ship_health[:, 1, 0].tolist() == [20, 20, 20]
@@ -0,0 +1,166 @@
+from time import perf_counter
+
+from apiwrapper.models import ActionType, Cell, CellType, ClientContext, CompassDirection, Coordinates, GameState, \
+    ProjectileData, ShipData
+from game_search import GameSearch, ZobristKeys, apply_actions, get_game_search, to_search_state
+from move_planner import ACTION_MOVE, ACTION_SHOOT, ACTION_TURN
+
+_WAIT = (ACTION_MOVE, 0, 0)
+
+
+# noinspection PyMethodMayBeStatic
+class ApplyActionsFeatures:
+
+    def should_stop_move_at_map_edge_and_dissipate_heat_for_cells_moved(self):
+        state = ((0, 1, CompassDirection.North.value, 10, 20), (5, 5, 0, 0, 20), ())
+
+        own, _, _ = apply_actions(state, (ACTION_MOVE, 3, 0), _WAIT, 10, 10)
+
+        assert own == (0, 1, CompassDirection.North.value, 10, 20)
+
+    def should_damage_ship_moving_into_other_ship(self):
+        state = ((5, 4, CompassDirection.East.value, 0, 20), (5, 5, 0, 0, 20), ())
+
+        own, enemy, _ = apply_actions(state, (ACTION_MOVE, 1, 0), _WAIT, 10, 10)
+
+        assert own[:2] == (5, 4)
+        assert own[4] == 17
+        assert enemy[4] == 20
+
+    def should_turn_by_relative_offset(self):
+        state = ((5, 4, CompassDirection.NorthWest.value, 0, 20), (5, 5, 0, 0, 20), ())
+
+        own, _, _ = apply_actions(state, (ACTION_TURN, 2, 0), _WAIT, 10, 10)
+
+        assert own[2] == CompassDirection.NorthEast.value
+
+    def should_add_heat_and_overheat_damage_and_spawn_projectile_on_shot(self):
+        state = ((5, 2, CompassDirection.East.value, 20, 20), (8, 8, 0, 0, 20), ())
+
+        own, _, projectiles = apply_actions(state, (ACTION_SHOOT, 4, 2), _WAIT, 10, 10)
+
+        assert own[3:] == (25, 17)
+        assert projectiles == ((5, 3, CompassDirection.East.value, 2, 4),)
+
+    def should_damage_ship_hit_by_projectile_and_remove_projectile(self):
+        state = ((5, 2, 0, 0, 20), (5, 6, 0, 0, 20), ((5, 4, CompassDirection.East.value, 3, 2),))
+
+        _, enemy, projectiles = apply_actions(state, _WAIT, _WAIT, 10, 10)
+
+        assert enemy[4] == 13
+        assert projectiles == ()
+
+
+# noinspection PyMethodMayBeStatic
+class ZobristKeysFeatures:
+
+    def should_give_same_hash_for_equal_states_and_different_hash_for_different_states(self):
+        keys = ZobristKeys(10, 10)
+        state = ((5, 2, 0, 0, 20), (5, 6, 0, 0, 20), ((5, 4, 2, 3, 2),))
+        other = ((5, 2, 0, 0, 20), (5, 6, 0, 0, 20), ((5, 4, 2, 3, 1),))
+
+        assert keys.hash(state) == keys.hash(tuple(state))
+        assert keys.hash(state) != keys.hash(other)
+
+    def should_update_hash_incrementally_to_hash_of_child_state(self):
+        keys = ZobristKeys(10, 10)
+        state = ((5, 2, CompassDirection.East.value, 0, 20), (5, 6, 0, 0, 20), ((5, 4, 2, 3, 2),))
+        child = apply_actions(state, (ACTION_SHOOT, 4, 2), (ACTION_MOVE, 1, 0), 10, 10)
+
+        assert keys.update(keys.hash(state), state, child) == keys.hash(child)
+
+
+# noinspection PyMethodMayBeStatic
+class GameSearchFeatures:
+
+    def should_shoot_enemy_directly_in_front(self):
+        search = GameSearch(10, 10, 1)
+        state = ((5, 2, CompassDirection.East.value, 0, 20), (5, 3, CompassDirection.West.value, 0, 20), ())
+
+        result = search.search(state, max_depth=1)
+
+        assert result.command.action == ActionType.Shoot
+
+    def should_reuse_earlier_search_when_observed_state_was_predicted(self):
+        search = GameSearch(10, 10, 1)
+        state = ((5, 2, CompassDirection.East.value, 0, 20), (5, 8, CompassDirection.West.value, 0, 20), ())
+        search.search(state, max_depth=2)
+        child = apply_actions(state, (ACTION_MOVE, 1, 0), _WAIT, 10, 10)
+
+        result = search.search(child, max_depth=2)
+
+        assert result.reused_depth == 1
+        assert result.depth == 2
+
+    def should_return_no_command_if_deadline_passes_before_first_iteration(self):
+        search = GameSearch(10, 10, 1)
+        state = ((5, 2, CompassDirection.East.value, 0, 20), (5, 8, CompassDirection.West.value, 0, 20), ())
+
+        result = search.search(state, deadline=perf_counter())
+
+        assert result.command is None
+        assert result.depth == 0
+
+    def should_return_within_deadline(self):
+        search = GameSearch(30, 30, 2)
+        state = ((5, 2, CompassDirection.East.value, 0, 20), (20, 25, CompassDirection.West.value, 0, 20), ())
+        start_time = perf_counter()
+
+        result = search.search(state, deadline=start_time + 0.02, max_depth=4)
+
+        # The search stops within one action of the deadline, the margin is for a slow machine
+        assert perf_counter() - start_time < 0.025
+        assert result.depth < 4
+
+    def should_publish_best_command_of_each_finished_iteration(self):
+        search = GameSearch(10, 10, 1)
+        context = ClientContext(1000, 1)
+        state = ((5, 2, CompassDirection.East.value, 0, 20), (5, 3, CompassDirection.West.value, 0, 20), ())
+
+        result = search.search(state, max_depth=1, context=context)
+
+        assert context.provisional_command == result.command
+
+    def should_keep_search_engine_in_context_between_ticks(self):
+        context = ClientContext(1000, 1)
+
+        assert get_game_search(context, 10, 10) is get_game_search(context, 10, 10)
+
+    def should_create_search_engine_again_if_turn_rate_changes(self):
+        context = ClientContext(1000, 1)
+        search = get_game_search(context, 10, 10)
+        context.turn_rate = 2
+
+        assert get_game_search(context, 10, 10) is not search
+        assert get_game_search(context, 10, 10).turn_rate == 2
+
+    def should_not_grow_transposition_table_past_its_size_during_search(self):
+        search = GameSearch(10, 10, 1, max_table_size=50)
+        state = ((5, 2, CompassDirection.East.value, 0, 20), (5, 8, CompassDirection.West.value, 0, 20), ())
+
+        result = search.search(state, max_depth=3)
+
+        assert len(search._table) <= 50
+        assert result.command is not None
+        assert result.depth == 3
+
+
+# noinspection PyMethodMayBeStatic
+class ToSearchStateFeatures:
+
+    def should_convert_ships_and_projectiles_to_compact_state(self):
+        game_map = [[Cell(CellType.Empty, {}) for _ in range(5)] for _ in range(5)]
+        game_map[1][2] = Cell(CellType.Ship, ShipData("own", Coordinates(2, 1), CompassDirection.East, 30, 4))
+        game_map[3][4] = Cell(CellType.Ship, ShipData("enemy", Coordinates(4, 3), CompassDirection.West, 25, 0))
+        game_map[2][2] = Cell(CellType.Projectile,
+                              ProjectileData("p", Coordinates(2, 2), CompassDirection.South, 2, 3))
+
+        state = to_search_state(GameState(1, game_map), "own")
+
+        assert state == ((2, 1, 2, 4, 30), (4, 3, 6, 0, 25), ((2, 2, 4, 2, 3),))
+
+    def should_give_none_if_enemy_is_not_visible_or_given(self):
+        game_map = [[Cell(CellType.Empty, {})]]
+        game_map[0][0] = Cell(CellType.Ship, ShipData("own", Coordinates(0, 0), CompassDirection.East, 30, 4))
+
+        assert to_search_state(GameState(1, game_map), "own") is None
@@ -1,7 +1,8 @@
 import pytest
 
 from apiwrapper.models import Coordinates, CompassDirection, Cell, CellType, HitBoxData, ProjectileData
-from helpers import get_coordinate_difference, get_approximate_direction, get_entity_coordinates, get_partial_turn
+from helpers import get_coordinate_difference, get_approximate_direction, get_entity_coordinates, get_partial_turn, \
+    get_approximate_directions, get_chebyshev_distance, get_euclidean_distances, LOOKUP_TABLE_RANGE
 
 
 # noinspection PyMethodMayBeStatic
@@ -55,6 +56,25 @@ class GetApproximateDirectionFeatures:
         actual_direction = get_approximate_direction(Coordinates(x, y))
         assert actual_direction == expected_direction
 
+    def should_give_closest_compass_direction_for_vectors_outside_lookup_table(self):
+        actual_direction = get_approximate_direction(Coordinates(LOOKUP_TABLE_RANGE + 5, 1))
+        assert actual_direction == CompassDirection.South
+
+    def should_give_compass_direction_for_each_vector_in_batch(self):
+        actual_directions = get_approximate_directions([Coordinates(-1, 0), Coordinates(5, 4),
+                                                        Coordinates(-2 * LOOKUP_TABLE_RANGE, 0)])
+        assert actual_directions == [CompassDirection.North, CompassDirection.SouthEast, CompassDirection.North]
+
+
+# noinspection PyMethodMayBeStatic
+class GetDistanceFeatures:
+
+    def should_give_larger_absolute_component_as_chebyshev_distance(self):
+        assert get_chebyshev_distance(Coordinates(-7, 3)) == 7
+
+    def should_give_euclidean_distance_for_each_vector_in_batch(self):
+        assert get_euclidean_distances([Coordinates(3, -4), Coordinates(0, 2)]) == [5.0, 2.0]
+
 
 # noinspection PyMethodMayBeStatic
 class GetEntityCoordinatesFeatures:
@@ -102,3 +122,7 @@ class GetPartialTurnFeatures:
     def should_function_correctly_for_counterclockwise_turns(self):
         actual_direction = get_partial_turn(CompassDirection.NorthEast, CompassDirection.West, 1)
         assert actual_direction == CompassDirection.North
+
+    def should_turn_straight_to_target_if_turn_rate_is_above_half_circle(self):
+        actual_direction = get_partial_turn(CompassDirection.NorthEast, CompassDirection.SouthWest, 7)
+        assert actual_direction == CompassDirection.SouthWest
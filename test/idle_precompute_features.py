@@ -0,0 +1,88 @@
+from concurrent.futures import ThreadPoolExecutor
+from threading import Event, current_thread
+from time import perf_counter
+from unittest.mock import Mock
+
+from apiwrapper.idle_precompute import IdlePrecompute
+from apiwrapper.models import ClientContext, Command, GameState, MoveActionData, ActionType
+
+
+# noinspection PyMethodMayBeStatic
+class IdlePrecomputeFeatures:
+
+    def should_run_function_in_background_with_state_and_command(self):
+        finished = Event()
+        function = Mock(side_effect=lambda *_: finished.set())
+        precompute = IdlePrecompute(function)
+        context = ClientContext(100, 1)
+        state = GameState(1, [])
+        command = Command(ActionType.Move, MoveActionData(1))
+
+        precompute.start(context, state, command)
+
+        assert finished.wait(1)
+        assert function.call_args.args[:3] == (context, state, command)
+        assert precompute.runs == 1
+
+    def should_signal_running_function_to_stop_on_cancel(self):
+        started = Event()
+        stopped = Event()
+
+        def function(_context, _state, _command, cancel: Event):
+            started.set()
+            cancel.wait(1)
+            stopped.set()
+
+        precompute = IdlePrecompute(function)
+        precompute.start(ClientContext(100, 1), GameState(1, []), None)
+        assert started.wait(1)
+
+        precompute.cancel()
+
+        assert stopped.wait(1)
+        assert precompute.cancelled_runs == 1
+
+    def should_not_wait_for_running_function_on_cancel(self):
+        started = Event()
+        release = Event()
+
+        def function(*_):
+            started.set()
+            release.wait(1)
+
+        precompute = IdlePrecompute(function)
+        precompute.start(ClientContext(100, 1), GameState(1, []), None)
+        assert started.wait(1)
+        start_time = perf_counter()
+
+        precompute.cancel()
+
+        assert perf_counter() - start_time < 0.001
+        release.set()
+
+    def should_not_count_finished_run_as_cancelled(self):
+        finished = Event()
+        precompute = IdlePrecompute(lambda *_: finished.set())
+        precompute.start(ClientContext(100, 1), GameState(1, []), None)
+        assert finished.wait(1)
+        precompute._running.join(1)
+
+        precompute.cancel()
+
+        assert precompute.cancelled_runs == 0
+
+    def should_run_function_on_given_executor(self):
+        finished = Event()
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="shared")
+        thread_names = []
+
+        def function(*_):
+            thread_names.append(current_thread().name)
+            finished.set()
+
+        precompute = IdlePrecompute(function, executor)
+        precompute.start(ClientContext(100, 1), GameState(1, []), None)
+
+        assert finished.wait(1)
+        assert thread_names[0].startswith("shared")
+        executor.shutdown()
@@ -0,0 +1,38 @@
+import pytest
+
+from apiwrapper.json_codec import get_available_codecs, get_codec
+
+_MESSAGE = {"eventType": "gameTick", "data": {"turnNumber": 3, "gameMap": [[{"type": "empty", "data": {}}]]}}
+
+
+# noinspection PyMethodMayBeStatic
+class JsonCodecFeatures:
+
+    @pytest.mark.parametrize("name", get_available_codecs())
+    def should_decode_what_it_encodes(self, name: str):
+        codec = get_codec(name)
+
+        assert codec.decode(codec.encode(_MESSAGE)) == _MESSAGE
+        assert codec.decode(codec.encode_text(_MESSAGE)) == _MESSAGE
+        assert codec.decode(memoryview(codec.encode(_MESSAGE))) == _MESSAGE
+
+    @pytest.mark.parametrize("name", get_available_codecs())
+    def should_encode_compact_json(self, name: str):
+        assert get_codec(name).encode_text({"a": [1, 2]}) == '{"a":[1,2]}'
+
+    def should_always_have_stdlib_codec_available(self):
+        assert get_available_codecs()[-1] == "stdlib"
+
+    def should_use_configured_codec(self, monkeypatch):
+        monkeypatch.setenv("json_codec", "stdlib")
+
+        assert get_codec().name == "stdlib"
+
+    def should_use_fastest_installed_codec_by_default(self, monkeypatch):
+        monkeypatch.setenv("json_codec", "")
+
+        assert get_codec().name == get_available_codecs()[0]
+
+    def should_raise_error_on_unknown_codec(self):
+        with pytest.raises(ValueError):
+            get_codec("yaml")
@@ -0,0 +1,52 @@
+import pytest
+
+from apiwrapper import latency
+from apiwrapper.latency import LatencyTracker, get_percentile
+
+
+def _tracker_with_round_trips(round_trips_ms: list[float]) -> LatencyTracker:
+    tracker = LatencyTracker()
+    for round_trip_ms in round_trips_ms:
+        tracker.record_round_trip(round_trip_ms)
+    return tracker
+
+
+# noinspection PyMethodMayBeStatic
+class LatencyFeatures:
+
+    @pytest.mark.parametrize("percentile, expected", [(50, 5), (95, 10), (100, 10), (0, 1)])
+    def should_get_nearest_rank_percentile(self, percentile: float, expected: float):
+        assert get_percentile([float(value) for value in range(10, 0, -1)], percentile) == expected
+
+    def should_use_default_margin_until_enough_round_trips_are_measured(self):
+        tracker = _tracker_with_round_trips([1.0] * (latency.MIN_ROUND_TRIPS - 1))
+
+        assert tracker.get_budget_ms(500) == 500 - latency.DEFAULT_MARGIN_MS
+
+    def should_reserve_high_percentile_of_round_trips_send_overheads_and_tick_jitter(self):
+        tracker = _tracker_with_round_trips([10.0] * 19 + [30.0])
+        tracker.record_send_overhead(2.0)
+        tracker.record_tick_arrival(1, 100, 0.0)
+        tracker.record_tick_arrival(2, 100, 0.104)
+
+        assert tracker.get_margin_ms() == pytest.approx(16.0)
+        assert tracker.get_budget_ms(100) == pytest.approx(84.0)
+
+    def should_reserve_minimum_margin_on_very_fast_network(self):
+        tracker = _tracker_with_round_trips([0.1] * 10)
+
+        assert tracker.get_margin_ms() == latency.MIN_MARGIN_MS
+
+    def should_not_measure_jitter_between_ticks_of_different_matches(self):
+        tracker = LatencyTracker()
+        tracker.record_tick_arrival(30, 100, 0.0)
+
+        tracker.reset_ticks()
+        tracker.record_tick_arrival(1, 100, 10.0)
+
+        assert len(tracker.tick_jitters_ms) == 0
+
+    def should_not_give_negative_budget_on_slow_network(self):
+        tracker = _tracker_with_round_trips([400.0] * 10)
+
+        assert tracker.get_budget_ms(100) == 0
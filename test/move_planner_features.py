@@ -0,0 +1,96 @@
+from threading import Event
+from time import perf_counter
+
+from apiwrapper.models import ActionType, Cell, CellType, ClientContext, Command, CompassDirection, Coordinates, \
+    GameState, MoveActionData, ProjectileData, ShipData, ShootActionData, TickDeadline, TurnActionData
+from move_planner import plan_moves, get_planning_deadline
+from projectile_prediction import DangerMap
+
+
+def _create_state(size: int = 10) -> GameState:
+    return GameState(1, [[Cell(CellType.Empty, {}) for _ in range(size)] for _ in range(size)])
+
+
+def _ship(x: int, y: int, direction: CompassDirection, heat: int = 0) -> ShipData:
+    return ShipData("ship", Coordinates(x, y), direction, 10, heat)
+
+
+# noinspection PyMethodMayBeStatic
+class PlanMovesFeatures:
+
+    def should_shoot_strongest_shot_immediately_if_aimed_at_target(self):
+        plan = plan_moves(ClientContext(1000, 2), _create_state(), _ship(5, 2, CompassDirection.East),
+                          Coordinates(5, 8))
+
+        assert plan.complete
+        assert plan.commands == [Command(ActionType.Shoot, ShootActionData(4, 4))]
+
+    def should_avoid_overheating_when_choosing_shot(self):
+        plan = plan_moves(ClientContext(1000, 2), _create_state(), _ship(5, 2, CompassDirection.East, heat=20),
+                          Coordinates(5, 8))
+
+        shot = plan.commands[-1].payload
+        assert isinstance(shot, ShootActionData)
+        assert shot.mass * shot.speed <= 5
+
+    def should_turn_towards_target_before_shooting(self):
+        plan = plan_moves(ClientContext(1000, 2), _create_state(), _ship(5, 2, CompassDirection.North),
+                          Coordinates(5, 8))
+
+        assert plan.complete
+        assert plan.commands[0] == Command(ActionType.Turn, TurnActionData(CompassDirection.East))
+        assert plan.commands[1].action == ActionType.Shoot
+
+    def should_move_onto_target_line_if_not_aligned(self):
+        plan = plan_moves(ClientContext(1000, 1), _create_state(), _ship(2, 5, CompassDirection.East),
+                          Coordinates(4, 9))
+
+        assert plan.complete
+        assert len(plan.commands) == 3
+
+    def should_avoid_cells_with_predicted_projectile_danger(self):
+        state = _create_state()
+        state.game_map[2][3] = Cell(CellType.Projectile,
+                                    ProjectileData("p", Coordinates(3, 2), CompassDirection.South, 2, 3))
+        danger_map = DangerMap(10, 10)
+        danger_map.update(state)
+
+        plan = plan_moves(ClientContext(1000, 1), state, _ship(5, 2, CompassDirection.East), Coordinates(5, 8),
+                          danger_map)
+
+        assert plan.complete
+        assert plan.commands[0] == Command(ActionType.Move, MoveActionData(1))
+        assert plan.commands[1].action == ActionType.Shoot
+
+    def should_return_partial_plan_when_deadline_has_passed(self):
+        plan = plan_moves(ClientContext(1000, 1), _create_state(), _ship(2, 5, CompassDirection.East),
+                          Coordinates(4, 9), deadline=perf_counter())
+
+        assert not plan.complete
+        assert plan.commands == []
+
+    def should_return_partial_plan_when_cancelled(self):
+        cancel = Event()
+        cancel.set()
+
+        plan = plan_moves(ClientContext(1000, 1), _create_state(), _ship(2, 5, CompassDirection.East),
+                          Coordinates(4, 9), cancel=cancel)
+
+        assert not plan.complete
+        assert plan.expanded_nodes == 0
+
+    def should_not_give_deadline_if_game_has_no_tick_limit(self):
+        assert get_planning_deadline(ClientContext(0, 1)) is None
+
+    def should_reserve_safety_margin_from_tick_for_deadline(self):
+        deadline = get_planning_deadline(ClientContext(1000, 1), start_time=10.0)
+
+        assert 10.0 < deadline < 11.0
+
+    def should_use_wrapper_tick_deadline_for_planning_deadline_if_set(self):
+        context = ClientContext(1000, 1)
+        context.begin_tick(TickDeadline(20.0))
+
+        deadline = get_planning_deadline(context)
+
+        assert 19.9 < deadline < 20.0
@@ -0,0 +1,132 @@
+import pytest
+
+import opening_book
+import team_ai
+from apiwrapper.models import ActionType, ClientContext, Command, CompassDirection, Coordinates, ShipData, \
+    TurnActionData
+from apiwrapper.serialization import deserialize_game_state
+from game_search import GameSearch
+from opening_book import ENEMY_ROW_BUCKETS, OpeningBook, generate_book, get_enemy_bucket, get_opening_command
+from world_model import get_world_model
+
+_SIZE = 8
+_TURNS = 2
+_FACING_EAST_SIDE = CompassDirection.South
+_FACING_WEST_SIDE = CompassDirection.North
+
+
+@pytest.fixture(scope="module")
+def book_path(tmp_path_factory) -> str:
+    path = str(tmp_path_factory.mktemp("book") / "opening.book")
+    generate_book(path, _SIZE, _SIZE, _TURNS, depth=1)
+    return path
+
+
+@pytest.fixture
+def book(book_path: str) -> OpeningBook:
+    book = OpeningBook(book_path)
+    yield book
+    book.close()
+
+
+def _ship(x: int, y: int, direction: CompassDirection, heat: int = 0) -> ShipData:
+    return ShipData("own", Coordinates(x, y), direction, 100, heat)
+
+
+def _search_first_command(own_row: int, enemy_row: int) -> Command:
+    state = ((0, own_row, _FACING_EAST_SIDE.value, 0, 100), (_SIZE - 1, enemy_row, _FACING_WEST_SIDE.value, 0, 100), ())
+    return GameSearch(_SIZE, _SIZE, 2).search(state, max_depth=1).command
+
+
+# noinspection PyMethodMayBeStatic
+class OpeningBookFeatures:
+
+    def should_give_self_play_search_command_on_first_turn(self, book: OpeningBook):
+        line = book.start_line(1, _SIZE, _SIZE, _ship(0, 3, _FACING_EAST_SIDE), None)
+
+        command = book.get_command(line, 1, 2, _ship(0, 3, _FACING_EAST_SIDE))
+
+        assert command == _search_first_command(3, _SIZE // 2)
+
+    def should_mirror_line_of_ship_starting_at_high_x_side(self, book: OpeningBook):
+        left = book.start_line(1, _SIZE, _SIZE, _ship(0, 3, _FACING_EAST_SIDE), None)
+        right = book.start_line(1, _SIZE, _SIZE, _ship(_SIZE - 1, 3, _FACING_WEST_SIDE), None)
+
+        left_command = book.get_command(left, 1, 2, _ship(0, 3, _FACING_EAST_SIDE))
+        right_command = book.get_command(right, 1, 2, _ship(_SIZE - 1, 3, _FACING_WEST_SIDE))
+
+        assert right.mirrored
+        if left_command.action == ActionType.Turn:
+            dx, dy = opening_book._DIRECTION_VECTORS[left_command.payload.direction.value]
+            mirrored = CompassDirection(opening_book._DIRECTION_VECTORS.index((-dx, dy)))
+            assert right_command == Command(ActionType.Turn, TurnActionData(mirrored))
+        else:
+            assert right_command == left_command
+
+    def should_not_give_command_if_own_ship_is_not_in_expected_state(self, book: OpeningBook):
+        line = book.start_line(1, _SIZE, _SIZE, _ship(0, 3, _FACING_EAST_SIDE), None)
+
+        assert book.get_command(line, 1, 2, _ship(0, 3, _FACING_EAST_SIDE, heat=5)) is None
+
+    def should_not_give_command_after_book_turns(self, book: OpeningBook):
+        line = book.start_line(1, _SIZE, _SIZE, _ship(0, 3, _FACING_EAST_SIDE), None)
+
+        assert book.get_command(line, 1 + _TURNS, 2, _ship(0, 3, _FACING_EAST_SIDE)) is None
+
+    def should_not_start_line_outside_book_positions(self, book: OpeningBook):
+        assert book.start_line(1, _SIZE, _SIZE, _ship(3, 3, _FACING_EAST_SIDE), None) is None
+        assert book.start_line(1, _SIZE, _SIZE, _ship(0, 3, _FACING_WEST_SIDE), None) is None
+        assert book.start_line(1, _SIZE + 1, _SIZE, _ship(0, 3, _FACING_EAST_SIDE), None) is None
+
+    def should_bucket_unknown_enemy_row_separately(self):
+        assert get_enemy_bucket(None, _SIZE) == ENEMY_ROW_BUCKETS
+        assert get_enemy_bucket(0, _SIZE) == 0
+        assert get_enemy_bucket(_SIZE - 1, _SIZE) == ENEMY_ROW_BUCKETS - 1
+
+    def should_raise_error_on_file_that_is_not_a_book(self, tmp_path):
+        path = tmp_path / "not.book"
+        path.write_bytes(b"not a book at all, just some bytes")
+
+        with pytest.raises(ValueError):
+            OpeningBook(str(path))
+
+    def should_give_book_command_from_configured_book(self, book_path: str, monkeypatch):
+        monkeypatch.setenv("opening_book", book_path)
+        context = ClientContext(100, 2)
+        game_map = [[{"type": "empty", "data": {}} for _ in range(_SIZE)] for _ in range(_SIZE)]
+        game_map[3][0] = {"type": "ship", "data": {"id": "own", "position": {"x": 0, "y": 3}, "direction": "s",
+                                                   "health": 100, "heat": 0}}
+        world_model = get_world_model(context, deserialize_game_state({"turnNumber": 1, "gameMap": game_map}), "own")
+
+        assert get_opening_command(context, world_model) == _search_first_command(3, _SIZE // 2)
+
+    def should_play_book_command_in_team_ai_on_first_turns(self, book_path: str, monkeypatch):
+        monkeypatch.setenv("opening_book", book_path)
+        context = ClientContext(100, 2)
+        context.own_ship_id = "own"
+        game_map = [[{"type": "empty", "data": {}} for _ in range(_SIZE)] for _ in range(_SIZE)]
+        game_map[3][0] = {"type": "ship", "data": {"id": "own", "position": {"x": 0, "y": 3}, "direction": "s",
+                                                   "health": 100, "heat": 0}}
+
+        command = team_ai.process_tick(context, deserialize_game_state({"turnNumber": 1, "gameMap": game_map}))
+
+        assert command == _search_first_command(3, _SIZE // 2)
+
+    @pytest.mark.parametrize("contents", [None, b"not a book at all, just some bytes"])
+    def should_try_opening_missing_or_corrupt_book_only_once(self, contents: bytes | None, tmp_path, monkeypatch,
+                                                             caplog):
+        path = tmp_path / "broken.book"
+        if contents is not None:
+            path.write_bytes(contents)
+        monkeypatch.setenv("opening_book", str(path))
+        monkeypatch.setattr(opening_book, "_books", {})
+        context = ClientContext(100, 2)
+        game_map = [[{"type": "empty", "data": {}} for _ in range(_SIZE)] for _ in range(_SIZE)]
+        game_map[3][0] = {"type": "ship", "data": {"id": "own", "position": {"x": 0, "y": 3}, "direction": "s",
+                                                   "health": 100, "heat": 0}}
+        world_model = get_world_model(context, deserialize_game_state({"turnNumber": 1, "gameMap": game_map}), "own")
+
+        commands = [get_opening_command(context, world_model) for _ in range(3)]
+
+        assert commands == [None, None, None]
+        assert len([record for record in caplog.records if record.name == "opening_book"]) == 1
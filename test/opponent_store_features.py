@@ -0,0 +1,137 @@
+import os
+from unittest.mock import Mock
+
+import pytest
+
+from apiwrapper import opponent_store
+from apiwrapper.models import ClientContext, GameState
+from apiwrapper.opponent_store import OpponentStore, flush_in_background
+from apiwrapper.portfolio import Portfolio
+from apiwrapper.websocket_wrapper import Client, ClientState, handle_game_end, handle_game_start, handle_game_tick
+
+
+def _reopen(store: OpponentStore) -> OpponentStore:
+    store.close()
+    return OpponentStore(store.path)
+
+
+# noinspection PyMethodMayBeStatic
+class OpponentStoreFeatures:
+
+    def should_be_empty_if_file_does_not_exist(self, tmp_path):
+        store = OpponentStore(str(tmp_path / "opponents.log"))
+
+        assert len(store) == 0
+        assert store.get("ship:enemy", {}) == {}
+        store.close()
+
+    def should_keep_flushed_values_over_reopening(self, tmp_path):
+        store = OpponentStore(str(tmp_path / "opponents.log"))
+        store.put("ship:enemy", {"shots": 3})
+        store.flush()
+
+        store = _reopen(store)
+
+        assert store.get("ship:enemy") == {"shots": 3}
+        assert "ship:enemy" in store
+        store.close()
+
+    def should_not_write_values_before_flush(self, tmp_path):
+        store = OpponentStore(str(tmp_path / "opponents.log"))
+        store.put("ship:enemy", 1)
+
+        assert store.get("ship:enemy") == 1
+        assert not os.path.exists(store.path)
+        store.close()
+
+    def should_read_latest_value_of_key(self, tmp_path):
+        store = OpponentStore(str(tmp_path / "opponents.log"))
+        for shots in range(3):
+            store.put("ship:enemy", {"shots": shots})
+            store.flush()
+
+        store = _reopen(store)
+
+        assert store.get("ship:enemy") == {"shots": 2}
+        assert len(store) == 1
+        store.close()
+
+    def should_compact_log_to_one_line_per_key(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(opponent_store, "MIN_COMPACTION_RECORDS", 4)
+        store = OpponentStore(str(tmp_path / "opponents.log"))
+        for shots in range(5):
+            store.put("ship:first", shots)
+            store.put("ship:second", -shots)
+            store.flush()
+
+        with open(store.path, "rb") as store_file:
+            lines = store_file.read().splitlines()
+        store = _reopen(store)
+
+        assert len(lines) <= 2 * opponent_store.COMPACTION_RATIO
+        assert store.get("ship:first") == 4
+        assert store.get("ship:second") == -4
+        store.close()
+
+    def should_skip_line_cut_short_by_crash(self, tmp_path):
+        path = str(tmp_path / "opponents.log")
+        with open(path, "wb") as store_file:
+            store_file.write(b'ship:first\t1\nship:second\t{"sho')
+        store = OpponentStore(path)
+        store.put("ship:third", 3)
+        store.flush()
+
+        store = _reopen(store)
+
+        assert store.keys() == {"ship:first", "ship:third"}
+        assert store.get("ship:third") == 3
+        store.close()
+
+    def should_raise_error_on_key_with_tab(self, tmp_path):
+        store = OpponentStore(str(tmp_path / "opponents.log"))
+
+        with pytest.raises(ValueError):
+            store.put("ship\tenemy", 1)
+        store.close()
+
+    def should_flush_and_close_in_background(self, tmp_path):
+        store = OpponentStore(str(tmp_path / "opponents.log"))
+        store.put("ship:enemy", 1)
+
+        flush_in_background(store).join()
+        store = OpponentStore(store.path)
+
+        assert store.get("ship:enemy") == 1
+        store.close()
+
+    def should_give_stored_values_to_next_match(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("opponent_store", str(tmp_path / "opponents.log"))
+        client = Client(ClientState.Idle)
+        client.precompute = None
+
+        handle_game_start(client, {"tickLength": 100, "turnRate": 2}, Mock())
+        client.context.opponent_store.put("ship:enemy", {"wins": 1})
+        handle_game_end(client, {}, Mock())
+        handle_game_start(client, {"tickLength": 100, "turnRate": 2}, Mock())
+
+        assert client.context.opponent_store.get("ship:enemy") == {"wins": 1}
+        client.context.opponent_store.close()
+
+    def should_give_values_stored_by_strategy_to_next_match(self, tmp_path, monkeypatch):
+        def remember(context: ClientContext, _: GameState):
+            context.opponent_store.put("ship:enemy", {"wins": 1})
+
+        monkeypatch.setenv("opponent_store", str(tmp_path / "opponents.log"))
+        monkeypatch.setenv("strategies", "team_ai.process_tick")
+        client = Client(ClientState.Idle)
+        client.precompute = None
+        client.portfolio = Portfolio([("remember", remember)])
+
+        handle_game_start(client, {"tickLength": 100, "turnRate": 2}, Mock())
+        handle_game_tick(client, {"turnNumber": 1, "gameMap": [[{"type": "empty", "data": {}}]]}, Mock())
+        handle_game_end(client, {}, Mock())
+        handle_game_start(client, {"tickLength": 100, "turnRate": 2}, Mock())
+
+        assert client.context.opponent_store.get("ship:enemy") == {"wins": 1}
+        client.context.opponent_store.close()
+        client.portfolio.shutdown()
@@ -0,0 +1,120 @@
+from threading import Event
+from time import perf_counter
+
+import pytest
+
+from apiwrapper.models import ActionType, ClientContext, Command, GameState, MoveActionData, TickDeadline
+from apiwrapper.portfolio import Portfolio, load_strategies
+from team_ai import process_tick
+
+
+def _command(distance: int) -> Command:
+    return Command(ActionType.Move, MoveActionData(distance))
+
+
+def _deadline(milliseconds: float) -> TickDeadline:
+    return TickDeadline(perf_counter() + milliseconds / 1000)
+
+
+# noinspection PyMethodMayBeStatic
+class PortfolioFeatures:
+
+    def should_send_result_of_highest_priority_strategy(self):
+        portfolio = Portfolio([("first", lambda *_: _command(1)), ("second", lambda *_: _command(2))])
+
+        command = portfolio.run(ClientContext(100, 1), GameState(1, []), _deadline(500))
+
+        assert command == _command(1)
+        assert portfolio.stats["first"].selections == 1
+        assert portfolio.stats["second"].selections == 0
+        portfolio.shutdown()
+
+    def should_skip_strategies_returning_nothing(self):
+        portfolio = Portfolio([("first", lambda *_: None), ("second", lambda *_: _command(2))])
+
+        command = portfolio.run(ClientContext(100, 1), GameState(1, []), _deadline(500))
+
+        assert command == _command(2)
+        portfolio.shutdown()
+
+    def should_send_lower_priority_result_if_higher_priority_strategy_misses_deadline(self):
+        release = Event()
+        portfolio = Portfolio([("slow", lambda *_: release.wait(1) and _command(1)), ("fast", lambda *_: _command(2))])
+
+        command = portfolio.run(ClientContext(100, 1), GameState(1, []), _deadline(30))
+        release.set()
+
+        assert command == _command(2)
+        assert portfolio.stats["fast"].finished == 1
+        portfolio.shutdown()
+
+    def should_give_strategies_tick_budget_of_each_tick(self):
+        budgets = []
+        portfolio = Portfolio([("first", lambda context, _: budgets.append(context.tick_budget_ms))])
+        context = ClientContext(100, 1)
+        portfolio.run(context, GameState(1, []), _deadline(500))
+
+        context.tick_budget_ms = 62.5
+        portfolio.run(context, GameState(2, []), _deadline(500))
+
+        assert budgets == [100, 62.5]
+        portfolio.shutdown()
+
+    def should_fall_back_to_command_published_by_unfinished_strategy(self):
+        release = Event()
+
+        def slow(context: ClientContext, _):
+            context.publish_command(_command(3))
+            release.wait(1)
+
+        portfolio = Portfolio([("slow", slow)])
+
+        command = portfolio.run(ClientContext(100, 1), GameState(1, []), _deadline(30))
+        release.set()
+
+        assert command == _command(3)
+        portfolio.shutdown()
+
+    def should_not_start_strategy_whose_previous_run_is_still_going(self):
+        release = Event()
+        portfolio = Portfolio([("slow", lambda *_: release.wait(1) and None)])
+        portfolio.run(ClientContext(100, 1), GameState(1, []), _deadline(10))
+
+        portfolio.run(ClientContext(100, 1), GameState(2, []), _deadline(10))
+        release.set()
+
+        assert portfolio.stats["slow"].runs == 1
+        assert portfolio.stats["slow"].skipped == 1
+        portfolio.shutdown()
+
+    def should_give_each_strategy_its_own_copy_of_the_context(self):
+        seen = {}
+
+        def first(context: ClientContext, _):
+            context.counter = getattr(context, "counter", 0) + 1
+            seen["first"] = context.counter
+
+        def second(context: ClientContext, _):
+            seen["second"] = getattr(context, "counter", None)
+
+        context = ClientContext(100, 1)
+        portfolio = Portfolio([("first", first), ("second", second)])
+        portfolio.start_match(context)
+
+        portfolio.run(context, GameState(1, []), _deadline(500))
+        portfolio.run(context, GameState(2, []), _deadline(500))
+
+        assert seen == {"first": 2, "second": None}
+        assert not hasattr(context, "counter")
+        portfolio.shutdown()
+
+
+# noinspection PyMethodMayBeStatic
+class LoadStrategiesFeatures:
+
+    def should_load_functions_by_module_and_function_name(self):
+        assert load_strategies("team_ai.process_tick, ") == [("team_ai.process_tick", process_tick)]
+
+    def should_raise_error_if_name_has_no_module(self):
+        with pytest.raises(ValueError):
+            load_strategies("process_tick")
@@ -0,0 +1,87 @@
+from apiwrapper.models import Cell, CellType, Coordinates, CompassDirection, GameState, HitBoxData, ProjectileData
+from projectile_prediction import DangerMap, predict_projectile_positions
+
+
+def _create_state(turn_number: int, entities: list[tuple[int, int, Cell]], size: int = 10,
+                  fill: CellType = CellType.Empty) -> GameState:
+    game_map = [[Cell(fill, {}) for _ in range(size)] for _ in range(size)]
+    for x, y, cell in entities:
+        game_map[y][x] = cell
+    return GameState(turn_number, game_map)
+
+
+def _projectile(x: int, y: int, direction: CompassDirection, speed: int = 1, mass: int = 1,
+                projectile_id: str = "projectile") -> tuple[int, int, Cell]:
+    return x, y, Cell(CellType.Projectile, ProjectileData(projectile_id, Coordinates(x, y), direction, speed, mass))
+
+
+# noinspection PyMethodMayBeStatic
+class PredictProjectilePositionsFeatures:
+
+    def should_advance_projectiles_by_speed_each_tick(self):
+        projectile = ProjectileData("a", Coordinates(5, 5), CompassDirection.East, 2, 1)
+
+        actual = predict_projectile_positions([projectile], 2)
+
+        assert actual["a"] == [Coordinates(5, 5), Coordinates(5, 7), Coordinates(5, 9)]
+
+
+# noinspection PyMethodMayBeStatic
+class DangerMapFeatures:
+
+    def should_mark_current_projectile_cell_as_dangerous_with_projectile_damage(self):
+        danger_map = DangerMap(10, 10)
+
+        danger_map.update(_create_state(1, [_projectile(2, 3, CompassDirection.East, speed=2, mass=3)]))
+
+        assert danger_map.get_danger(2, 3, 0) == 8
+        assert danger_map.is_safe(3, 3, 0)
+
+    def should_mark_all_cells_swept_during_a_tick(self):
+        danger_map = DangerMap(10, 10)
+
+        danger_map.update(_create_state(1, [_projectile(2, 3, CompassDirection.East, speed=2)]))
+
+        assert not danger_map.is_safe(2, 4, 1)
+        assert not danger_map.is_safe(2, 5, 1)
+        assert danger_map.is_safe(2, 5, 2)
+        assert not danger_map.is_safe(2, 7, 2)
+
+    def should_include_projectile_hit_box_in_danger(self):
+        danger_map = DangerMap(10, 10)
+        hit_box = Cell(CellType.HitBox, HitBoxData("projectile"))
+
+        danger_map.update(_create_state(1, [_projectile(5, 5, CompassDirection.East), (6, 5, hit_box)]))
+
+        assert not danger_map.is_safe(6, 6, 1)
+
+    def should_give_same_result_when_updated_incrementally_as_when_built_from_scratch(self):
+        incremental = DangerMap(10, 10, horizon=4)
+        incremental.update(_create_state(1, [_projectile(0, 0, CompassDirection.SouthEast)]))
+        state = _create_state(2, [_projectile(1, 1, CompassDirection.SouthEast),
+                                  _projectile(9, 2, CompassDirection.West, projectile_id="other")])
+        from_scratch = DangerMap(10, 10, horizon=4)
+
+        incremental.update(state)
+        from_scratch.update(state)
+
+        for ticks_ahead in range(4):
+            for y in range(10):
+                for x in range(10):
+                    assert incremental.get_danger(x, y, ticks_ahead) == from_scratch.get_danger(x, y, ticks_ahead)
+
+    def should_remove_projectile_that_disappears_within_vision(self):
+        danger_map = DangerMap(10, 10)
+        danger_map.update(_create_state(1, [_projectile(2, 3, CompassDirection.East)]))
+
+        danger_map.update(_create_state(2, []))
+
+        assert all(danger_map.is_safe(2, y, ticks_ahead) for y in range(10) for ticks_ahead in range(4))
+
+    def should_keep_predicting_projectile_that_flies_out_of_vision(self):
+        danger_map = DangerMap(10, 10)
+        danger_map.update(_create_state(1, [_projectile(2, 3, CompassDirection.East)]))
+
+        danger_map.update(_create_state(2, [], fill=CellType.OutOfVision))
+
+        assert not danger_map.is_safe(2, 5, 1)
@@ -0,0 +1,81 @@
+import pytest
+
+import replay_export
+from apiwrapper.json_codec import get_codec
+from apiwrapper.replay import ReplayRecorder, OUTCOME_WIN
+from replay_export import export_replays, load_shard, iter_replay_records, iter_replay_rows, TICK_COLUMNS
+
+
+def _ship_cell(ship_id: str, x: int, health: int) -> dict:
+    return {"type": "ship", "data": {"id": ship_id, "position": {"x": x, "y": 0}, "direction": "e", "health": health,
+                                     "heat": 4}}
+
+
+def _record_match(path: str, ticks: int, final_enemy_health: int = 0) -> str:
+    recorder = ReplayRecorder(path, {"tickLength": 100, "turnRate": 2}, "own")
+    for turn in range(1, ticks + 1):
+        enemy_health = final_enemy_health if turn == ticks else 10
+        projectile = {"type": "projectile", "data": {"id": "p", "position": {"x": 2, "y": 0}, "direction": "w",
+                                                     "speed": 2, "mass": 3}}
+        state = {"turnNumber": turn, "gameMap": [[_ship_cell("own", 0, 10), _ship_cell("enemy", 1, enemy_health),
+                                                  projectile]]}
+        recorder.record_tick(state, {"action": "shoot", "payload": {"mass": 4, "speed": 1}})
+    recorder.close()
+    return path
+
+
+# noinspection PyMethodMayBeStatic
+class ReplayExportFeatures:
+
+    def should_convert_each_tick_to_a_row_with_match_outcome(self, tmp_path):
+        path = _record_match(str(tmp_path / "match.jsonl"), 2)
+
+        rows = list(iter_replay_rows(path, 7))
+
+        values = dict(zip(TICK_COLUMNS, rows[0][0]))
+        assert values["match_id"] == 7
+        assert values["own_x"] == 0 and values["own_direction"] == 2 and values["own_heat"] == 4
+        assert values["enemy_visible"] == 1 and values["enemy_x"] == 1
+        assert (values["command_action"], values["command_first"], values["command_second"]) == (2, 4, 1)
+        assert values["outcome"] == OUTCOME_WIN
+        assert rows[0][1] == [(2, 0, 6, 2, 3)]
+
+    def should_read_replay_records_with_configured_json_codec(self, tmp_path, monkeypatch):
+        path = _record_match(str(tmp_path / "match.jsonl"), 1)
+        decoded = []
+        codec = get_codec()
+        monkeypatch.setattr(replay_export, "_CODEC", codec)
+        monkeypatch.setattr(codec, "_decode", lambda data: decoded.append(data) or get_codec("stdlib").decode(data))
+
+        records = list(iter_replay_records(path))
+
+        assert len(decoded) == len(records) == 3
+        assert records[1]["command"] == {"action": "shoot", "payload": {"mass": 4, "speed": 1}}
+
+    def should_split_rows_into_shards_of_chunk_size(self, tmp_path):
+        paths = [_record_match(str(tmp_path / f"match-{index}.jsonl"), 3) for index in range(2)]
+
+        rows = export_replays(paths, str(tmp_path / "out"), chunk_rows=4)
+
+        assert rows == 6
+        shards = [load_shard(str(tmp_path / "out" / f"shard-{index:05d}.npz")) for index in range(2)]
+        assert list(shards[0]["match_id"]) == [0, 0, 0, 1]
+        assert list(shards[1]["turn_number"]) == [2, 3]
+        assert list(shards[1]["projectile_row"]) == [0, 1]
+
+    def should_write_shards_per_match_with_multiple_workers(self, tmp_path):
+        paths = [_record_match(str(tmp_path / f"match-{index}.jsonl"), 3) for index in range(3)]
+
+        rows = export_replays(paths, str(tmp_path / "out"), workers=2)
+
+        assert rows == 9
+        assert list(load_shard(str(tmp_path / "out" / "match-000002-00000.npz"))["match_id"]) == [2, 2, 2]
+
+    def should_write_shards_readable_with_numpy(self, tmp_path):
+        np = pytest.importorskip("numpy")
+        path = _record_match(str(tmp_path / "match.jsonl"), 3)
+        export_replays([path], str(tmp_path / "out"))
+
+        with np.load(str(tmp_path / "out" / "shard-00000.npz")) as shard:
+            assert shard["turn_number"].dtype == np.int32
+            assert shard["turn_number"].tolist() == [1, 2, 3]
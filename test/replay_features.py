@@ -0,0 +1,101 @@
+import json
+import os
+
+from apiwrapper.models import CellType
+from apiwrapper.replay import ReplayRecorder, ReplayReader, get_outcome, INDEX_SUFFIX, OUTCOME_WIN, OUTCOME_LOSS, \
+    OUTCOME_UNKNOWN
+
+
+def _ship_cell(ship_id: str, health: int | None) -> dict:
+    return {"type": "ship", "data": {"id": ship_id, "position": {"x": 0, "y": 0}, "direction": "n", "health": health,
+                                     "heat": 0}}
+
+
+# noinspection PyMethodMayBeStatic
+class ReplayRecorderFeatures:
+
+    def should_write_start_tick_and_end_records_as_json_lines(self, tmp_path):
+        path = str(tmp_path / "replay.jsonl")
+        state = {"turnNumber": 1, "gameMap": [[_ship_cell("own", 10), _ship_cell("enemy", 0)]]}
+        recorder = ReplayRecorder(path, {"tickLength": 100, "turnRate": 2}, "own")
+
+        recorder.record_tick(state, {"action": "move", "payload": {"distance": 1}})
+        recorder.close()
+
+        with open(path, encoding="utf-8") as replay_file:
+            records = [json.loads(line) for line in replay_file]
+        assert [record["eventType"] for record in records] == ["startGame", "gameTick", "endGame"]
+        assert records[0]["shipId"] == "own"
+        assert records[1]["data"] == state
+        assert records[2]["outcome"] == OUTCOME_WIN
+
+
+def _record_replay(path: str, turns: int):
+    recorder = ReplayRecorder(path, {"tickLength": 100, "turnRate": 2}, "own")
+    for turn_number in range(1, turns + 1):
+        recorder.record_tick({"turnNumber": turn_number, "gameMap": [[_ship_cell("own", turn_number)] + [
+            {"type": "empty", "data": {}}] * turn_number]}, None)
+    recorder.close()
+
+
+# noinspection PyMethodMayBeStatic
+class ReplayReaderFeatures:
+
+    def should_decode_any_single_tick_from_the_write_time_index(self, tmp_path):
+        path = str(tmp_path / "replay.jsonl")
+        _record_replay(path, 5)
+
+        with ReplayReader(path) as reader:
+            assert len(reader) == 5
+            assert list(reader.turn_numbers) == [1, 2, 3, 4, 5]
+            game_state = reader.read_turn(4)
+            assert reader.read_tick(1).turn_number == 2
+
+        assert game_state.turn_number == 4
+        assert len(game_state.game_map[0]) == 5
+        assert game_state.game_map[0][0].cell_type == CellType.Ship
+        assert game_state.game_map[0][0].data.health == 4
+
+    def should_build_and_save_a_missing_index_on_open(self, tmp_path):
+        path = str(tmp_path / "replay.jsonl")
+        _record_replay(path, 3)
+        os.remove(path + INDEX_SUFFIX)
+
+        with ReplayReader(path) as reader:
+            assert list(reader.turn_numbers) == [1, 2, 3]
+            assert reader.read_raw_tick(2)["data"]["turnNumber"] == 3
+
+        assert os.path.exists(path + INDEX_SUFFIX)
+        with ReplayReader(path) as reader:
+            assert len(reader) == 3
+
+    def should_index_ticks_written_after_the_last_index_entry(self, tmp_path):
+        path = str(tmp_path / "replay.jsonl")
+        _record_replay(path, 3)
+        with open(path + INDEX_SUFFIX, "rb") as index_file:
+            index = index_file.read()
+        with open(path + INDEX_SUFFIX, "wb") as index_file:
+            index_file.write(index[:-24])
+
+        with ReplayReader(path) as reader:
+            assert list(reader.turn_numbers) == [1, 2, 3]
+
+    def should_iterate_all_ticks_in_order(self, tmp_path):
+        path = str(tmp_path / "replay.jsonl")
+        _record_replay(path, 4)
+
+        with ReplayReader(path) as reader:
+            turn_numbers = [game_state.turn_number for game_state in reader.iter_ticks(read_ahead_bytes=64)]
+
+        assert turn_numbers == [1, 2, 3, 4]
+
+
+# noinspection PyMethodMayBeStatic
+class GetOutcomeFeatures:
+
+    def should_give_loss_if_own_ship_is_destroyed_or_missing(self):
+        assert get_outcome({"gameMap": [[_ship_cell("own", 0), _ship_cell("enemy", 5)]]}, "own") == OUTCOME_LOSS
+        assert get_outcome({"gameMap": [[_ship_cell("enemy", 5)]]}, "own") == OUTCOME_LOSS
+
+    def should_give_unknown_if_both_ships_are_alive(self):
+        assert get_outcome({"gameMap": [[_ship_cell("own", 3), _ship_cell("enemy", 5)]]}, "own") == OUTCOME_UNKNOWN
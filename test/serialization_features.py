@@ -106,6 +106,54 @@ class SerializationFeatures:
         assert result.turn_number == 82
         assert result.game_map == [[Cell(CellType.Empty, {})]]
 
+    def should_not_compute_delta_without_previous_state(self):
+        result = deserialize_game_state({"gameMap": [[{"type": "empty", "data": {}}]], "turnNumber": 1})
+
+        assert result.delta is None
+
+    def should_compute_changed_cells_and_entity_changes_against_previous_state(self):
+        empty = {"type": "empty", "data": {}}
+
+        def ship(x: int, heat: int) -> dict:
+            return {"type": "ship", "data": {"id": "ship", "position": {"x": x, "y": 0}, "direction": "e",
+                                             "health": 10, "heat": heat}}
+
+        def projectile(projectile_id: str, x: int) -> dict:
+            return {"type": "projectile", "data": {"id": projectile_id, "position": {"x": x, "y": 1},
+                                                   "direction": "e", "speed": 1, "mass": 1}}
+
+        previous = deserialize_game_state({"turnNumber": 1, "gameMap": [
+            [ship(0, 0), empty, empty],
+            [projectile("old", 0), projectile("moving", 1), empty],
+            [empty, empty, empty]
+        ]})
+
+        result = deserialize_game_state({"turnNumber": 2, "gameMap": [
+            [ship(0, 3), empty, empty],
+            [empty, empty, projectile("moving", 2)],
+            [empty, empty, empty]
+        ]}, previous)
+
+        assert result.delta.changed_cells == [Coordinates(0, 0), Coordinates(0, 1), Coordinates(1, 1),
+                                              Coordinates(2, 1)]
+        assert [entity.id for entity in result.delta.appeared] == []
+        assert [entity.id for entity in result.delta.disappeared] == ["old"]
+        assert [(before.position, after.position) for before, after in result.delta.moved] == \
+            [(Coordinates(1, 1), Coordinates(2, 1))]
+        assert [(before.heat, after.heat) for before, after in result.delta.updated] == [(0, 3)]
+
+    def should_report_new_entities_as_appeared(self):
+        empty = {"type": "empty", "data": {}}
+        projectile = {"type": "projectile", "data": {"id": "new", "position": {"x": 1, "y": 0}, "direction": "e",
+                                                     "speed": 1, "mass": 1}}
+        previous = deserialize_game_state({"turnNumber": 1, "gameMap": [[empty, empty]]})
+
+        result = deserialize_game_state({"turnNumber": 2, "gameMap": [[empty, projectile]]}, previous)
+
+        assert result.delta.changed_cells == [Coordinates(1, 0)]
+        assert [entity.id for entity in result.delta.appeared] == ["new"]
+        assert result.delta.disappeared == [] and result.delta.moved == [] and result.delta.updated == []
+
     def should_include_distance_on_move_action_serialization(self):
         action = Command(ActionType.Move, MoveActionData(3))
 
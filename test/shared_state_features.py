@@ -0,0 +1,110 @@
+import multiprocessing
+import os
+import subprocess
+import sys
+
+import pytest
+
+import apiwrapper
+from apiwrapper import shared_state
+from apiwrapper.models import GameState
+from apiwrapper.serialization import deserialize_game_state
+from apiwrapper.shared_state import SharedGameState, SharedStateRing
+
+
+def _raw_state(turn_number: int) -> dict:
+    return {"turnNumber": turn_number, "gameMap": [
+        [{"type": "empty", "data": {}}, {"type": "outOfVision", "data": {}}, {"type": "audioSignature", "data": {}}],
+        [{"type": "hitBox", "data": {"entityId": "ship:a"}},
+         {"type": "ship", "data": {"id": "ship:a", "position": {"x": 1, "y": 1}, "direction": "se", "health": 20,
+                                   "heat": None}},
+         {"type": "projectile", "data": {"id": "projectile:1", "position": {"x": 2, "y": 1}, "direction": "w",
+                                         "speed": 3, "mass": 2}}]]}
+
+
+def _read_turn_number_in_worker(name: str, slot: int, turn_number: int, results: multiprocessing.Queue):
+    ring = SharedStateRing.attach(name, 2, 4096)
+    view = ring.read(slot, turn_number)
+    results.put((view.turn_number, view.game_map[1][1].data.id))
+    view.release()
+    ring.close()
+
+
+# noinspection PyMethodMayBeStatic
+class SharedStateFeatures:
+
+    @pytest.mark.parametrize("use_raw_map", [True, False])
+    def should_read_same_map_that_was_written(self, use_raw_map: bool):
+        state = deserialize_game_state(_raw_state(7))
+        if not use_raw_map:
+            state = GameState(state.turn_number, state.game_map)
+        with SharedStateRing(2, 4096) as ring:
+            view = ring.read(ring.write(state), 7)
+
+            assert isinstance(view, GameState)
+            assert view.turn_number == 7
+            assert [list(row) for row in view.game_map] == state.game_map
+            view.release()
+
+    def should_raise_error_on_reading_overwritten_slot(self):
+        with SharedStateRing(2, 4096) as ring:
+            slot = ring.write(deserialize_game_state(_raw_state(1)))
+            ring.write(deserialize_game_state(_raw_state(2)))
+            ring.write(deserialize_game_state(_raw_state(3)))
+
+            with pytest.raises(ValueError):
+                ring.read(slot, 1)
+
+    def should_detect_view_of_overwritten_slot_as_stale(self):
+        with SharedStateRing(1, 4096) as ring:
+            view = ring.read(ring.write(deserialize_game_state(_raw_state(1))), 1)
+            assert not view.is_stale()
+
+            ring.write(deserialize_game_state(_raw_state(2)))
+
+            assert view.is_stale()
+            view.release()
+
+    def should_raise_error_on_slot_overwritten_while_being_read(self, monkeypatch):
+        decode_ids = shared_state._decode_ids
+        with SharedStateRing(1, 4096) as ring:
+            slot = ring.write(deserialize_game_state(_raw_state(1)))
+
+            def overwrite_then_decode_ids(buffer):
+                ring.write(deserialize_game_state(_raw_state(2)))
+                return decode_ids(buffer)
+
+            monkeypatch.setattr(shared_state, "_decode_ids", overwrite_then_decode_ids)
+
+            with pytest.raises(ValueError):
+                ring.read(slot, 1)
+
+    def should_raise_error_on_state_too_large_for_slot(self):
+        with SharedStateRing(1, 64) as ring:
+            with pytest.raises(ValueError):
+                ring.write(deserialize_game_state(_raw_state(1)))
+
+    def should_hand_state_to_other_process_by_slot_and_turn_number(self):
+        results = multiprocessing.Queue()
+        with SharedStateRing(2, 4096) as ring:
+            slot = ring.write(deserialize_game_state(_raw_state(5)))
+            worker = multiprocessing.Process(target=_read_turn_number_in_worker, args=(ring.name, slot, 5, results))
+            worker.start()
+            worker.join(10)
+
+            assert results.get(timeout=1) == (5, "ship:a")
+
+    def should_keep_ring_when_attached_process_exits(self):
+        with SharedStateRing(2, 4096) as ring:
+            slot = ring.write(deserialize_game_state(_raw_state(5)))
+            source_path = os.path.dirname(os.path.dirname(apiwrapper.__file__))
+            # A fresh interpreter has a resource tracker of its own, which unlinks what it tracks when the process exits
+            worker = subprocess.run([sys.executable, "-c", "from apiwrapper.shared_state import SharedStateRing; "
+                                     f"SharedStateRing.attach({ring.name!r}, 2, 4096).close()"],
+                                    cwd=source_path, capture_output=True, timeout=30)
+
+            assert worker.returncode == 0
+            with SharedStateRing.attach(ring.name, 2, 4096) as attached:
+                view = attached.read(slot, 5)
+                assert view.turn_number == 5
+                view.release()
@@ -0,0 +1,58 @@
+from apiwrapper.models import CompassDirection, Coordinates
+from bitboard import get_board_geometry
+from shot_evaluator import evaluate_shots, choose_shot, SHOT_OPTIONS
+
+
+# noinspection PyMethodMayBeStatic
+class EvaluateShotsFeatures:
+
+    def should_score_all_sixteen_options_with_damage_and_heat(self):
+        geometry = get_board_geometry(30, 30)
+
+        evaluations = evaluate_shots(geometry, Coordinates(5, 10), CompassDirection.East, geometry.bit(5, 17),
+                                     CompassDirection.North, 1, heat=20)
+
+        assert [(evaluation.mass, evaluation.speed) for evaluation in evaluations] == list(SHOT_OPTIONS)
+        strongest = evaluations[-1]
+        assert (strongest.damage, strongest.heat, strongest.overheat_damage) == (12, 16, 11)
+        assert strongest.expected_damage == strongest.hit_probability * strongest.damage
+
+    def should_share_hit_probability_between_masses_of_same_speed(self):
+        geometry = get_board_geometry(30, 30)
+
+        evaluations = evaluate_shots(geometry, Coordinates(5, 10), CompassDirection.East, geometry.bit(5, 17),
+                                     CompassDirection.North, 1)
+
+        by_option = {(evaluation.mass, evaluation.speed): evaluation for evaluation in evaluations}
+        assert by_option[(1, 3)].hit_probability == by_option[(4, 3)].hit_probability
+        assert by_option[(1, 3)].hit_probability > 0
+
+    def should_give_zero_probability_if_enemy_cannot_reach_the_projectile_path(self):
+        geometry = get_board_geometry(30, 30)
+
+        evaluations = evaluate_shots(geometry, Coordinates(5, 10), CompassDirection.East, geometry.bit(25, 25),
+                                     CompassDirection.South, 1, horizon=2)
+
+        assert all(evaluation.hit_probability == 0 for evaluation in evaluations)
+
+    def should_certainly_hit_enemy_that_cannot_leave_the_cell_in_front(self):
+        geometry = get_board_geometry(3, 1)
+
+        evaluations = evaluate_shots(geometry, Coordinates(0, 0), CompassDirection.South, geometry.bit(1, 0),
+                                     CompassDirection.East, 0, horizon=0)
+
+        assert all(evaluation.hit_probability == 1 for evaluation in evaluations)
+
+
+# noinspection PyMethodMayBeStatic
+class ChooseShotFeatures:
+
+    def should_prefer_expected_damage_without_overheating(self):
+        geometry = get_board_geometry(30, 30)
+        evaluations = evaluate_shots(geometry, Coordinates(5, 10), CompassDirection.East, geometry.bit(5, 12),
+                                     CompassDirection.North, 1, heat=20)
+
+        best = choose_shot(evaluations)
+
+        assert best.overheat_damage == 0
+        assert best.heat <= 5
@@ -0,0 +1,101 @@
+from threading import Event
+
+from apiwrapper.models import ActionType, Cell, CellType, ClientContext, Command, CompassDirection, Coordinates, \
+    GameState, MoveActionData, ShipData, ShootActionData, TurnActionData
+from speculation import SpeculationCache, get_speculation_cache, get_speculative_plan, predict_own_ship, \
+    speculate_plans
+
+
+def _game_state(turn_number: int, own: ShipData, enemy: ShipData) -> GameState:
+    game_map = [[Cell(CellType.Empty, {}) for _ in range(8)] for _ in range(8)]
+    for ship in (own, enemy):
+        game_map[ship.position.y][ship.position.x] = Cell(CellType.Ship, ship)
+    return GameState(turn_number, game_map)
+
+
+# noinspection PyMethodMayBeStatic
+class SpeculationCacheFeatures:
+
+    def should_give_result_stored_for_the_turn(self):
+        cache = SpeculationCache()
+
+        cache.put(5, ("plan", 1, 2), "result")
+
+        assert cache.get(5, ("plan", 1, 2)) == "result"
+        assert cache.get(5, ("plan", 2, 2)) is None
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    def should_drop_results_of_earlier_turns(self):
+        cache = SpeculationCache()
+        cache.put(5, "key", "old")
+
+        cache.put(6, "other", "new")
+        cache.put(4, "key", "stale")
+
+        assert cache.get(5, "key") is None
+        assert cache.get(6, "other") == "new"
+        assert cache.get(4, "key") is None
+
+    def should_keep_one_cache_per_context(self):
+        context = ClientContext(100, 1)
+
+        assert get_speculation_cache(context) is get_speculation_cache(context)
+
+
+# noinspection PyMethodMayBeStatic
+class PredictOwnShipFeatures:
+
+    def should_move_ship_forward_until_map_edge_and_cool_down(self):
+        ship = ShipData("own", Coordinates(1, 1), CompassDirection.North, 10, 5)
+
+        predicted = predict_own_ship(ship, Command(ActionType.Move, MoveActionData(3)), 5, 5)
+
+        assert predicted.position == Coordinates(0, 1)
+        assert predicted.heat == 3
+        assert ship.position == Coordinates(1, 1)
+
+    def should_turn_ship_and_heat_it_up_on_shot(self):
+        ship = ShipData("own", Coordinates(1, 1), CompassDirection.North, 10, 5)
+
+        turned = predict_own_ship(ship, Command(ActionType.Turn, TurnActionData(CompassDirection.East)), 5, 5)
+        shot = predict_own_ship(ship, Command(ActionType.Shoot, ShootActionData(2, 3)), 5, 5)
+
+        assert turned.direction == CompassDirection.East
+        assert shot.heat == 11
+        assert predict_own_ship(ship, None, 5, 5) is ship
+
+
+# noinspection PyMethodMayBeStatic
+class SpeculativePlanFeatures:
+
+    def should_find_plan_made_for_predicted_state_on_next_turn(self):
+        context = ClientContext(0, 2)
+        own = ShipData("own", Coordinates(1, 1), CompassDirection.South, 10, 0)
+        enemy = ShipData("enemy", Coordinates(5, 6), CompassDirection.West, 10, 0)
+        command = Command(ActionType.Move, MoveActionData(1))
+
+        planned = speculate_plans(context, _game_state(3, own, enemy), command, Event(), "own")
+        moved = predict_own_ship(own, command, 8, 8)
+        plan = get_speculative_plan(context, _game_state(4, moved, enemy), "own")
+
+        assert planned >= 1
+        assert plan is not None and plan.complete
+        assert plan.commands[-1].action == ActionType.Shoot
+
+    def should_not_find_plan_if_own_ship_is_not_where_it_was_predicted(self):
+        context = ClientContext(0, 2)
+        own = ShipData("own", Coordinates(1, 1), CompassDirection.South, 10, 0)
+        enemy = ShipData("enemy", Coordinates(5, 6), CompassDirection.West, 10, 0)
+        speculate_plans(context, _game_state(3, own, enemy), Command(ActionType.Move, MoveActionData(1)), Event(),
+                        "own")
+
+        assert get_speculative_plan(context, _game_state(4, own, enemy), "own") is None
+
+    def should_not_plan_once_cancelled(self):
+        context = ClientContext(0, 2)
+        cancel = Event()
+        cancel.set()
+        own = ShipData("own", Coordinates(1, 1), CompassDirection.South, 10, 0)
+        enemy = ShipData("enemy", Coordinates(5, 6), CompassDirection.West, 10, 0)
+
+        assert speculate_plans(context, _game_state(3, own, enemy), None, cancel, "own") == 0
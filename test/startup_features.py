@@ -0,0 +1,56 @@
+import os
+import subprocess
+import sys
+
+import team_ai
+from apiwrapper.startup import StartupTimer
+
+
+# noinspection PyMethodMayBeStatic
+class StartupFeatures:
+
+    def should_record_import_time_of_module(self):
+        startup = StartupTimer()
+
+        module = startup.import_module("json")
+
+        assert module.__name__ == "json"
+        assert startup.imports_ms["json"] >= 0
+
+    def should_record_milestones_in_order_from_start(self):
+        startup = StartupTimer()
+
+        startup.mark("first")
+        startup.mark("second")
+
+        assert list(startup.milestones_ms) == ["first", "second"]
+        assert 0 <= startup.milestones_ms["first"] <= startup.milestones_ms["second"]
+
+    def should_only_record_first_time_milestone_is_reached(self):
+        startup = StartupTimer(0.0)
+        startup.mark("milestone")
+        first_ms = startup.milestones_ms["milestone"]
+
+        startup.mark("milestone")
+
+        assert startup.milestones_ms["milestone"] == first_ms
+
+    def should_not_import_game_search_on_importing_team_ai(self):
+        source_path = os.path.dirname(team_ai.__file__)
+        # A fresh interpreter, as the modules may already have been imported by other tests
+        result = subprocess.run([sys.executable, "-c", "import sys, team_ai; "
+                                 "print(sorted({'game_search', 'move_planner', 'projectile_prediction'} & "
+                                 "set(sys.modules)))"], cwd=source_path, capture_output=True, text=True, timeout=30)
+
+        assert result.returncode == 0
+        assert result.stdout.strip() == "[]"
+
+    def should_not_import_subsystems_without_config_on_importing_wrapper(self):
+        source_path = os.path.dirname(team_ai.__file__)
+        modules = "{'apiwrapper.json_codec', 'apiwrapper.opponent_store', 'apiwrapper.portfolio', 'apiwrapper.replay'}"
+        result = subprocess.run([sys.executable, "-c", "import sys, apiwrapper.websocket_wrapper; "
+                                 f"print(sorted({modules} & set(sys.modules)))"], cwd=source_path,
+                                capture_output=True, text=True, timeout=30)
+
+        assert result.returncode == 0
+        assert result.stdout.strip() == "[]"
@@ -0,0 +1,86 @@
+import asyncio
+from time import monotonic
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+
+import supervisor
+from apiwrapper.async_runner import BotRunner, BotStats
+from apiwrapper.models import ActionType, Command, MoveActionData
+from apiwrapper.websocket_wrapper import ClientState
+from supervisor import Supervisor, combine_stats, get_restart_delay, get_stats_snapshot, get_worker_cpus, shard_bots
+
+
+# noinspection PyMethodMayBeStatic
+class SupervisorFeatures:
+
+    def should_shard_bots_evenly_across_workers(self):
+        bots = [(f"token{index}", f"bot{index}") for index in range(5)]
+
+        shards = shard_bots(bots, 2)
+
+        assert shards == [[bots[0], bots[2], bots[4]], [bots[1], bots[3]]]
+
+    def should_not_create_empty_shards(self):
+        assert shard_bots([("token", "bot")], 4) == [[("token", "bot")]]
+
+    def should_raise_error_on_shard_count_below_one(self):
+        with pytest.raises(ValueError):
+            shard_bots([("token", "bot")], 0)
+
+    def should_pin_each_worker_to_own_core_and_share_cores_in_turns(self):
+        assert [get_worker_cpus(index, [2, 5]) for index in range(3)] == [{2}, {5}, {2}]
+
+    def should_double_restart_delay_up_to_maximum(self):
+        assert get_restart_delay(1) == supervisor.RESTART_BACKOFF_S
+        assert get_restart_delay(3) == supervisor.RESTART_BACKOFF_S * 4
+        assert get_restart_delay(100) == supervisor.MAX_RESTART_BACKOFF_S
+
+    def should_sum_counts_and_keep_larger_maximum_when_combining_stats(self):
+        combined = combine_stats(BotStats(ticks=3, timeouts=1, max_processing_ms=5.0),
+                                 BotStats(ticks=2, timeouts=1, max_processing_ms=9.0))
+
+        assert combined.ticks == 5
+        assert combined.timeouts == 2
+        assert combined.max_processing_ms == 9.0
+
+    def should_schedule_restart_and_keep_stats_of_crashed_worker(self):
+        bot_supervisor = Supervisor("ws://localhost", [("token1", "first"), ("token2", "second")], 2)
+        worker = bot_supervisor._workers[0]
+        worker.process = Mock(exitcode=1)
+        worker.process.is_alive.return_value = False
+        worker.started_at = monotonic()
+        bot_supervisor._current_stats["first"] = BotStats(ticks=10, timeouts=2)
+
+        bot_supervisor._check_worker(worker)
+        bot_supervisor._current_stats["first"] = BotStats(ticks=4)
+
+        assert worker.crashes_in_row == 1
+        assert worker.restart_at is not None
+        assert bot_supervisor.get_report()["first"].ticks == 14
+        assert bot_supervisor.get_report()["first"].timeouts == 2
+
+    @patch("apiwrapper.websocket_wrapper.process_tick")
+    def should_report_stats_of_every_match_of_running_worker(self, mock_tick_handler):
+        mock_tick_handler.return_value = Command(ActionType.Move, MoveActionData(1))
+        bot_supervisor = Supervisor("ws://localhost", [("token", "bot")], 1)
+        runner = BotRunner("ws://localhost", [("token", "bot")], 1)
+        bot = runner.bots[0]
+        bot.client.state = ClientState.Idle
+        bot.client.precompute = None
+        tick = {"eventType": "gameTick", "data": {"turnNumber": 1, "gameMap": [[{"type": "empty", "data": {}}]]}}
+
+        async def play_match(ticks: int):
+            await runner.handle_message(bot, {"eventType": "startGame", "data": {"tickLength": 500, "turnRate": 2}},
+                                        AsyncMock())
+            for _ in range(ticks):
+                await runner.handle_message(bot, tick, AsyncMock())
+            await runner.handle_message(bot, {"eventType": "endGame", "data": {}}, AsyncMock())
+
+        asyncio.run(play_match(3))
+        asyncio.run(play_match(2))
+        bot_supervisor._queue.put(get_stats_snapshot(runner))
+        bot_supervisor._receive_stats(timeout=1.0)
+
+        assert bot_supervisor.get_report()["bot"].ticks == 5
+        runner.shutdown()
@@ -1,13 +1,20 @@
 import json
+from threading import Event, current_thread
 from time import sleep
 from unittest.mock import Mock, patch
 
 import pytest
 
 from apiwrapper import websocket_wrapper
-from apiwrapper.models import GameState, Cell, CellType, Command, MoveActionData
+from apiwrapper.startup import StartupTimer
+from apiwrapper.models import GameState, Cell, CellType, Command, MoveActionData, ActionType
 from apiwrapper.websocket_wrapper import Client, handle_auth_ack, ClientState, handle_game_start, ClientContext, \
-    handle_game_tick, handle_game_end, authorize_client, handle_loop
+    handle_game_tick, handle_game_end, authorize_client, handle_loop, handle_disconnect, get_reconnect_delay, \
+    begin_tick_deadline, shutdown_client
+
+
+def _sent_message(websocket) -> dict:
+    return json.loads(websocket.send.call_args.args[0])
 
 
 # noinspection PyMethodMayBeStatic
@@ -28,6 +35,30 @@ class WebsocketFeatures:
 
         assert client.state == state
 
+    def should_warm_up_team_ai_once_per_process_on_auth_ack(self, monkeypatch):
+        warm_up = Mock()
+        monkeypatch.setattr(websocket_wrapper, "_team_ai_warm_up", warm_up)
+        monkeypatch.setattr(websocket_wrapper, "_warmed_up", False)
+
+        handle_auth_ack(Client(ClientState.Unauthorized), {}, Mock())
+        handle_auth_ack(Client(ClientState.Unauthorized), {}, Mock())
+
+        warm_up.assert_called_once()
+
+    def should_mark_startup_milestones_until_first_game_action(self):
+        client = Client(ClientState.Unauthorized)
+        client.precompute = None
+        startup = StartupTimer()
+        client.startup = startup
+        tick = {"turnNumber": 1, "gameMap": [[{"type": "empty", "data": {}}]]}
+
+        handle_auth_ack(client, {}, Mock())
+        handle_game_start(client, {"tickLength": 0, "turnRate": 2}, Mock())
+        handle_game_tick(client, tick, Mock())
+
+        assert list(startup.milestones_ms) == ["authAck", "warm up", "startGame", "first gameAction"]
+        assert client.startup is None
+
     def should_set_state_to_in_game_on_game_start(self):
         client = Client(ClientState.Idle)
         handle_game_start(client, {"tickLength": 100, "turnRate": 2}, Mock())
@@ -50,7 +81,146 @@ class WebsocketFeatures:
 
         handle_game_start(client, {"tickLength": 100, "turnRate": 2}, websocket)
 
-        websocket.send.assert_called_with(json.dumps({"eventType": "startAck", "data": {}}))
+        assert _sent_message(websocket) == {"eventType": "startAck", "data": {}}
+
+    @patch("apiwrapper.websocket_wrapper.process_tick")
+    def should_record_replay_of_match_if_replay_directory_is_configured(self, mock_tick_handler, tmp_path,
+                                                                        monkeypatch):
+        monkeypatch.setenv("replay_directory", str(tmp_path))
+        mock_tick_handler.return_value = Command(ActionType.Move, MoveActionData(1))
+        client = Client(ClientState.Idle)
+
+        handle_game_start(client, {"tickLength": 0, "turnRate": 2}, Mock())
+        handle_game_tick(client, {"turnNumber": 1, "gameMap": [[{"type": "empty", "data": {}}]]}, Mock())
+        handle_game_end(client, {}, Mock())
+
+        replay_files = list(tmp_path.glob("*.jsonl"))
+        assert len(replay_files) == 1
+        assert [json.loads(line)["eventType"] for line in replay_files[0].read_text().splitlines()] == \
+               ["startGame", "gameTick", "endGame"]
+        assert client.replay is None
+
+    @patch("apiwrapper.websocket_wrapper.process_tick")
+    def should_start_precompute_with_state_and_command_after_sending_command(self, mock_tick_handler):
+        command = Command(ActionType.Move, MoveActionData(1))
+        mock_tick_handler.return_value = command
+        client = Client(ClientState.InGame, ClientContext(0, 2))
+        client.precompute = Mock()
+        websocket = Mock()
+
+        handle_game_tick(client, {"turnNumber": 1, "gameMap": [[{"type": "empty", "data": {}}]]}, websocket)
+
+        websocket.send.assert_called_once()
+        client.precompute.start.assert_called_once()
+        context, state, sent_command = client.precompute.start.call_args.args
+        assert context is client.context
+        assert state.turn_number == 1
+        assert sent_command == command
+
+    def should_send_portfolio_result_if_strategies_are_configured(self):
+        command = Command(ActionType.Move, MoveActionData(2))
+        client = Client(ClientState.InGame, ClientContext(500, 2))
+        client.portfolio = Mock()
+        client.portfolio.run.return_value = command
+        client.precompute = None
+        websocket = Mock()
+
+        handle_game_tick(client, {"turnNumber": 1, "gameMap": [[{"type": "empty", "data": {}}]]}, websocket)
+
+        context, state, deadline = client.portfolio.run.call_args.args
+        assert context is client.context
+        assert deadline is client.context.deadline
+        assert _sent_message(websocket) == {"eventType": "gameAction",
+                                            "data": {"action": "move", "payload": {"distance": 2}}}
+
+    @patch("apiwrapper.websocket_wrapper.process_tick")
+    def should_give_team_ai_tick_budget_based_on_measured_latency(self, mock_tick_handler):
+        budgets = []
+        mock_tick_handler.side_effect = lambda context, _: budgets.append(context.tick_budget_ms)
+        client = Client(ClientState.InGame, ClientContext(500, 2))
+        client.precompute = None
+        for _ in range(10):
+            client.latency.record_round_trip(20.0)
+
+        handle_game_tick(client, {"turnNumber": 1, "gameMap": [[{"type": "empty", "data": {}}]]}, Mock())
+
+        assert budgets == [480.0]
+        assert len(client.latency.send_overheads_ms) == 1
+
+    def should_cancel_precompute_when_next_message_arrives(self):
+        websocket_wrapper._EVENT_HANDLERS = {}
+        client = Client(ClientState.InGame)
+        client.precompute = Mock()
+        websocket = Mock()
+        websocket.recv.return_value = json.dumps({"eventType": "gameTick", "data": {}})
+
+        handle_loop(client, websocket)
+
+        client.precompute.cancel.assert_called_once()
+
+    def should_resume_match_in_progress_after_reconnect(self):
+        client = Client(ClientState.Idle)
+        client.precompute = None
+        tick = {"turnNumber": 1, "gameMap": [[{"type": "empty", "data": {}}]]}
+        handle_game_start(client, {"tickLength": 0, "turnRate": 2}, Mock())
+        handle_game_tick(client, tick, Mock())
+        context = client.context
+
+        handle_disconnect(client)
+        handle_auth_ack(client, {}, Mock())
+        handle_game_tick(client, {**tick, "turnNumber": 4}, Mock())
+
+        assert client.state == ClientState.InGame
+        assert client.context is context
+        assert client.reconnect_stats.reconnects == 1
+        assert client.reconnect_stats.missed_ticks == 2
+
+    def should_start_new_match_if_match_in_progress_ended_while_reconnecting(self):
+        client = Client(ClientState.InGame, ClientContext(0, 2))
+        client.precompute = None
+
+        handle_disconnect(client)
+        handle_auth_ack(client, {}, Mock())
+        handle_game_start(client, {"tickLength": 100, "turnRate": 2}, Mock())
+
+        assert client.state == ClientState.InGame
+        assert client.context.tick_length_ms == 100
+        assert not client.resuming_match
+
+    def should_go_idle_after_reconnect_if_no_match_was_in_progress(self):
+        client = Client(ClientState.Idle)
+
+        handle_disconnect(client)
+        handle_auth_ack(client, {}, Mock())
+
+        assert client.state == ClientState.Idle
+        assert client.reconnect_stats.reconnects == 1
+
+    def should_keep_backing_off_if_server_drops_connection_before_authorizing(self):
+        client = Client(ClientState.Unauthorized)
+        client.precompute = None
+
+        delays = [handle_disconnect(client) for _ in range(4)]
+
+        assert client.failed_connects == 4
+        assert delays[3] >= websocket_wrapper._RECONNECT_BACKOFF_S * 2 ** 3 / 2
+
+    def should_reset_reconnect_backoff_once_authorized(self):
+        client = Client(ClientState.Unauthorized)
+        client.precompute = None
+        for _ in range(4):
+            handle_disconnect(client)
+
+        handle_auth_ack(client, {}, Mock())
+
+        assert client.failed_connects == 0
+        assert handle_disconnect(client) <= websocket_wrapper._RECONNECT_BACKOFF_S
+
+    @pytest.mark.parametrize("attempt", [0, 3, 20])
+    def should_jitter_reconnect_delay_within_exponential_backoff(self, attempt: int):
+        backoff = min(websocket_wrapper._RECONNECT_BACKOFF_S * 2 ** attempt, websocket_wrapper._MAX_RECONNECT_BACKOFF_S)
+
+        assert backoff / 2 <= get_reconnect_delay(attempt) <= backoff
 
     @pytest.mark.parametrize("state", [ClientState.Unauthorized, ClientState.InGame, ClientState.Unconnected])
     def should_raise_exception_on_game_start_if_state_is_not_idle(self, state: ClientState):
@@ -79,7 +249,7 @@ class WebsocketFeatures:
         mock_tick_handler.return_value = Command("move", MoveActionData(3))
         mock_command_serialization.return_value = move_command_dict
         handle_game_tick(client, Mock(), websocket)
-        websocket.send.assert_called_with(json.dumps({"eventType": "gameAction", "data": move_command_dict}))
+        assert _sent_message(websocket) == {"eventType": "gameAction", "data": move_command_dict}
 
     @patch("apiwrapper.websocket_wrapper.serialize_command")
     @patch("apiwrapper.websocket_wrapper.deserialize_game_state")
@@ -124,6 +294,127 @@ class WebsocketFeatures:
         handle_game_tick(client, Mock(), websocket)
         mock_command_serialization.assert_called_with(Command("move", MoveActionData(0)))
 
+    @patch("apiwrapper.websocket_wrapper.serialize_command")
+    @patch("apiwrapper.websocket_wrapper.deserialize_game_state")
+    @patch("apiwrapper.websocket_wrapper.process_tick")
+    def should_send_latest_provisional_command_if_game_tick_processing_times_out(self, mock_tick_handler,
+                                                                                 mock_state_deserialization,
+                                                                                 mock_command_serialization):
+        def delayed_processing(context, _):
+            context.publish_command(Command(ActionType.Move, MoveActionData(1)))
+            context.publish_command(Command(ActionType.Move, MoveActionData(2)))
+            sleep(0.1)
+            return Command(ActionType.Move, MoveActionData(3))
+
+        client = Client(ClientState.InGame)
+        client.context = ClientContext(100, 2)
+        mock_state_deserialization.return_value = GameState(1, [[Cell(CellType.Empty, {})]])
+        mock_tick_handler.side_effect = delayed_processing
+        mock_command_serialization.return_value = {}
+        handle_game_tick(client, Mock(), Mock())
+        mock_command_serialization.assert_called_with(Command(ActionType.Move, MoveActionData(2)))
+
+    @patch("apiwrapper.websocket_wrapper.serialize_command")
+    @patch("apiwrapper.websocket_wrapper.deserialize_game_state")
+    @patch("apiwrapper.websocket_wrapper.process_tick")
+    def should_ignore_command_published_by_timed_out_tick_after_next_tick_began(self, mock_tick_handler,
+                                                                                 mock_state_deserialization,
+                                                                                 mock_command_serialization):
+        next_tick_began = Event()
+        published = Event()
+
+        def late_processing(context, _):
+            next_tick_began.wait(1)
+            context.publish_command(Command(ActionType.Move, MoveActionData(1)))
+            published.set()
+
+        client = Client(ClientState.InGame)
+        client.context = ClientContext(50, 2)
+        mock_state_deserialization.return_value = GameState(1, [[Cell(CellType.Empty, {})]])
+        mock_tick_handler.side_effect = late_processing
+        mock_command_serialization.return_value = {}
+        handle_game_tick(client, Mock(), Mock())
+        begin_tick_deadline(client)
+        next_tick_began.set()
+        published.wait(1)
+
+        assert client.context.provisional_command is None
+
+    @patch("apiwrapper.websocket_wrapper.serialize_command")
+    @patch("apiwrapper.websocket_wrapper.deserialize_game_state")
+    @patch("apiwrapper.websocket_wrapper.process_tick")
+    def should_process_every_game_tick_on_same_worker_thread(self, mock_tick_handler, mock_state_deserialization,
+                                                              mock_command_serialization):
+        threads = []
+        mock_tick_handler.side_effect = lambda *_: threads.append(current_thread())
+        client = Client(ClientState.InGame)
+        client.context = ClientContext(500, 2)
+        mock_state_deserialization.return_value = GameState(1, [[Cell(CellType.Empty, {})]])
+        mock_command_serialization.return_value = {}
+        handle_game_tick(client, Mock(), Mock())
+        handle_game_tick(client, Mock(), Mock())
+
+        assert len(threads) == 2
+        assert threads[0] is threads[1]
+        assert threads[0] is not current_thread()
+
+    @patch("apiwrapper.websocket_wrapper.serialize_command")
+    @patch("apiwrapper.websocket_wrapper.deserialize_game_state")
+    @patch("apiwrapper.websocket_wrapper.process_tick")
+    def should_skip_game_tick_if_previous_tick_is_still_being_processed(self, mock_tick_handler,
+                                                                        mock_state_deserialization,
+                                                                        mock_command_serialization):
+        release = Event()
+        mock_tick_handler.side_effect = lambda *_: release.wait(1)
+        client = Client(ClientState.InGame)
+        client.context = ClientContext(20, 2)
+        mock_state_deserialization.return_value = GameState(1, [[Cell(CellType.Empty, {})]])
+        mock_command_serialization.return_value = {}
+        handle_game_tick(client, Mock(), Mock())
+        handle_game_tick(client, Mock(), Mock())
+        release.set()
+
+        assert mock_tick_handler.call_count == 1
+
+    def should_keep_tick_processing_worker_over_reconnect(self):
+        client = Client(ClientState.Unauthorized)
+        handle_auth_ack(client, {}, Mock())
+        executor = client.tick_executor
+
+        handle_disconnect(client)
+        handle_auth_ack(client, {}, Mock())
+
+        assert executor is not None
+        assert client.tick_executor is executor
+        assert not executor._shutdown
+
+    def should_shut_down_tick_processing_worker_when_bot_exits(self):
+        client = Client(ClientState.Unauthorized)
+        handle_auth_ack(client, {}, Mock())
+        executor = client.tick_executor
+
+        shutdown_client(client)
+
+        assert executor._shutdown
+        assert client.tick_executor is None
+
+    @patch("apiwrapper.websocket_wrapper.serialize_command")
+    @patch("apiwrapper.websocket_wrapper.deserialize_game_state")
+    @patch("apiwrapper.websocket_wrapper.process_tick")
+    def should_clear_provisional_command_and_set_deadline_before_processing_game_tick(self, mock_tick_handler,
+                                                                                      mock_state_deserialization,
+                                                                                      mock_command_serialization):
+        remaining_times = []
+        mock_tick_handler.side_effect = lambda context, _: remaining_times.append(context.deadline.remaining_ms())
+        client = Client(ClientState.InGame)
+        client.context = ClientContext(500, 2)
+        client.context.publish_command(Command(ActionType.Move, MoveActionData(3)))
+        mock_state_deserialization.return_value = GameState(1, [[Cell(CellType.Empty, {})]])
+        mock_command_serialization.return_value = {}
+        handle_game_tick(client, Mock(), Mock())
+        assert client.context.provisional_command is None
+        assert 0 < remaining_times[0] <= 450
+
     @patch("apiwrapper.websocket_wrapper.serialize_command")
     @patch("apiwrapper.websocket_wrapper.deserialize_game_state")
     @patch("apiwrapper.websocket_wrapper.process_tick")
@@ -147,7 +438,7 @@ class WebsocketFeatures:
         mock_tick_handler.return_value = Command("move", MoveActionData(3))
         mock_command_serialization.return_value = move_command_dict
         handle_game_tick(client, Mock(), websocket)
-        websocket.send.assert_called_with(json.dumps({"eventType": "gameAction", "data": move_command_dict}))
+        assert _sent_message(websocket) == {"eventType": "gameAction", "data": move_command_dict}
 
     @patch("apiwrapper.websocket_wrapper.serialize_command")
     @patch("apiwrapper.websocket_wrapper.deserialize_game_state")
@@ -233,7 +524,7 @@ class WebsocketFeatures:
 
         handle_game_end(client, Mock(), websocket)
 
-        websocket.send.assert_called_with(json.dumps({"eventType": "endAck", "data": {}}))
+        assert _sent_message(websocket) == {"eventType": "endAck", "data": {}}
 
     @pytest.mark.parametrize("state", [ClientState.Unauthorized, ClientState.Idle, ClientState.Unconnected])
     def should_raise_exception_on_game_end_if_state_is_not_idle(self, state: ClientState):
@@ -251,8 +542,8 @@ class WebsocketFeatures:
 
         authorize_client(websocket, actual_token, actual_name)
 
-        websocket.send.assert_called_with(
-            json.dumps({"eventType": "auth", "data": {"token": actual_token, "botName": actual_name}}))
+        assert _sent_message(websocket) == {"eventType": "auth",
+                                            "data": {"token": actual_token, "botName": actual_name}}
 
     def should_call_correct_event_handler_on_event(self):
         event_name = "myTestEvent"
@@ -0,0 +1,97 @@
+from apiwrapper.models import ClientContext, Coordinates
+from apiwrapper.serialization import deserialize_game_state
+from world_model import get_world_model, WorldModel
+
+
+def _raw_state(turn_number: int, ships: dict[str, tuple[int, int]], unseen: set[tuple[int, int]] = frozenset(),
+               audio: tuple[int, int] | None = None, size: int = 6) -> dict:
+    game_map = []
+    for y in range(size):
+        row = []
+        for x in range(size):
+            cell = {"type": "outOfVision" if (x, y) in unseen else "empty", "data": {}}
+            if (x, y) == audio:
+                cell = {"type": "audioSignature", "data": {}}
+            for ship_id, position in ships.items():
+                if position == (x, y):
+                    cell = {"type": "ship", "data": {"id": ship_id, "position": {"x": x, "y": y}, "direction": "e",
+                                                     "health": 10, "heat": 0}}
+            row.append(cell)
+        game_map.append(row)
+    return {"turnNumber": turn_number, "gameMap": game_map}
+
+
+# noinspection PyMethodMayBeStatic
+class WorldModelFeatures:
+
+    def should_track_own_ship_and_enemy_from_tick_deltas(self):
+        model = WorldModel("own", 1)
+        first = deserialize_game_state(_raw_state(1, {"own": (0, 0), "enemy": (4, 4)}))
+        second = deserialize_game_state(_raw_state(2, {"own": (1, 0), "enemy": (4, 3)}), first)
+
+        model.update(first)
+        model.update(second)
+
+        assert model.own_ship.position == Coordinates(1, 0)
+        assert model.enemy.position == Coordinates(4, 3)
+        assert model.enemy_visible
+        assert model.enemy_seen_turn == 2
+
+    def should_keep_enemy_last_known_state_after_it_leaves_vision(self):
+        model = WorldModel("own", 1)
+        unseen = {(x, y) for x in range(3, 6) for y in range(6)}
+        first = deserialize_game_state(_raw_state(1, {"own": (0, 0), "enemy": (2, 2)}))
+        second = deserialize_game_state(_raw_state(2, {"own": (0, 0)}, unseen, audio=(2, 0)), first)
+
+        model.update(first)
+        model.update(second)
+
+        assert not model.enemy_visible
+        assert model.enemy.position == Coordinates(2, 2)
+        assert model.enemy_seen_turn == 1
+        assert model.get_latest_bearing().cell == Coordinates(2, 0)
+        assert model.get_latest_bearing().origin == Coordinates(0, 0)
+
+    def should_estimate_enemy_region_as_unseen_cells_within_reach_of_last_known_position(self):
+        model = WorldModel("own", 1)
+        unseen = {(x, y) for x in range(3, 6) for y in range(6)}
+        first = deserialize_game_state(_raw_state(1, {"own": (0, 0), "enemy": (2, 2)}))
+        second = deserialize_game_state(_raw_state(2, {"own": (0, 0)}, unseen), first)
+        model.update(first)
+        model.update(second)
+
+        region = model.estimate_enemy_region()
+
+        expected = {(x, y) for x in range(3, 6) for y in range(0, 6)}
+        assert {(index % 6, index // 6) for index in range(36) if region >> index & 1} == expected
+
+    def should_estimate_visible_enemy_region_as_its_cell(self):
+        model = WorldModel("own", 1)
+        model.update(deserialize_game_state(_raw_state(1, {"own": (0, 0), "enemy": (4, 1)})))
+
+        assert model.estimate_enemy_region() == 1 << (1 * 6 + 4)
+
+    def should_rescan_map_if_a_tick_was_skipped(self):
+        model = WorldModel("own", 1)
+        first = deserialize_game_state(_raw_state(1, {"own": (0, 0)}))
+        second = deserialize_game_state(_raw_state(2, {"own": (1, 0)}), first)
+        third = deserialize_game_state(_raw_state(3, {"own": (2, 0), "enemy": (5, 5)}), second)
+
+        model.update(first)
+        model.update(third)
+
+        assert model.own_ship.position == Coordinates(2, 0)
+        assert model.enemy.position == Coordinates(5, 5)
+
+
+# noinspection PyMethodMayBeStatic
+class GetWorldModelFeatures:
+
+    def should_keep_one_model_per_context_and_update_it_once_per_tick(self):
+        context = ClientContext(100, 1)
+        game_state = deserialize_game_state(_raw_state(1, {"own": (0, 0)}))
+
+        model = get_world_model(context, game_state, "own")
+
+        assert get_world_model(context, game_state) is model
+        assert model.own_ship.position == Coordinates(0, 0)